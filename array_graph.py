@@ -0,0 +1,289 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Array-backed storage for generated networks.
+
+The ArrayGraph class stores an undirected simple network as a flat int32 edge
+list together with CSR (compressed sparse row) adjacency offsets, so that large
+networks can be generated and examined without building a NetworkX graph.
+
+Networks are saved in a compact binary format, either as a single .npz file or as
+a directory holding the raw int32 edge array (edges.npy, which can be loaded
+memory-mapped) and a JSON metadata file (meta.json).
+"""
+import json
+import os
+import numpy as np
+
+class ArrayGraph:
+    """
+    Undirected simple network stored as flat arrays.
+
+    Nodes are labelled consecutively 0, 1, ..., N-1. Each edge is stored once
+    in the edge list, with the smaller node label first. The CSR adjacency
+    (indptr, indices) lists both directions of every edge and is built on
+    first use. Views of the network in other formats (NetworkX, igraph,
+    graph-tool) and derived quantities (see structure.py) are built on request
+    and cached, see view(). Assigning a new edge array to G.edges discards the
+    cached views; after modifying the edge array in place, call invalidate().
+
+    Parameters
+    ----------
+    N : the number of nodes
+    edges : an integer array of shape (E, 2) giving the edges of the network
+        The edges are assumed to contain no self loops or parallel edges
+        (use canonical_edges() to remove them first, if required).
+    """
+    def __init__(self, N, edges):
+        self.N = int(N)
+        self.edges = edges
+
+    @property
+    def edges(self):
+        """
+        The int32 edge array of shape (E, 2).
+        """
+        return(self._edges)
+
+    @edges.setter
+    def edges(self, edges):
+        self._edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discards the CSR adjacency and all cached views, which are rebuilt on next use
+        (call this after modifying the edge array in place).
+        """
+        self._indptr = None
+        self._indices = None
+        self._views = dict()
+
+    def number_of_nodes(self):
+        """
+        Return the number of nodes in the network.
+        """
+        return(self.N)
+
+    def number_of_edges(self):
+        """
+        Return the number of edges in the network.
+        """
+        return(len(self.edges))
+
+    def degrees(self):
+        """
+        Return the degree of each node as an integer array.
+        """
+        return(np.diff(self.indptr))
+
+    @property
+    def indptr(self):
+        """
+        CSR offsets: the neighbours of node i are indices[indptr[i]:indptr[i+1]].
+        """
+        if self._indptr is None:
+            self._build_csr()
+        return(self._indptr)
+
+    @property
+    def indices(self):
+        """
+        CSR neighbour lists, sorted within each node.
+        """
+        if self._indices is None:
+            self._build_csr()
+        return(self._indices)
+
+    def neighbors(self, node):
+        """
+        Return the neighbours of the given node as an integer array.
+
+        Parameters
+        ----------
+        node : the node label (integer between 0 and N-1)
+        """
+        return(self.indices[self.indptr[node]:self.indptr[node+1]])
+
+    def _build_csr(self):
+        src = np.concatenate([self.edges[:,0], self.edges[:,1]])
+        dst = np.concatenate([self.edges[:,1], self.edges[:,0]])
+        order = np.argsort(src.astype(np.int64)*self.N + dst, kind='stable') # by source, then target
+        counts = np.bincount(src, minlength=self.N)
+        indptr = np.zeros(self.N+1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        self._indptr = indptr
+        self._indices = dst[order].astype(np.int32, copy=False)
+
+    def view(self, name, build):
+        """
+        Return a cached view of the network in another format.
+
+        The view is built by calling build() the first time a given name is requested,
+        and the same object is returned on later calls.
+
+        Parameters
+        ----------
+        name : the name of the view (e.g. 'networkx', 'igraph', 'graph_tool')
+        build : a function with no arguments that builds the view
+        """
+        if name not in self._views:
+            self._views[name] = build()
+        return(self._views[name])
+
+    def to_networkx(self):
+        """
+        Return an equivalent NetworkX graph object.
+        """
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(range(self.N))
+        G.add_edges_from(self.edges.tolist())
+        return(G)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Return an ArrayGraph for a NetworkX graph (or multigraph).
+
+        Nodes are relabelled consecutively in the order of G.nodes(), as in
+        fix_graph(), and any self loops or parallel edges are removed.
+
+        Parameters
+        ----------
+        G : NetworkX-formatted network
+        """
+        nodes, edges = relabel_edges(G)
+        N = len(nodes)
+        return(cls(N, canonical_edges(edges[:,0], edges[:,1], N)))
+
+    def __repr__(self):
+        return('ArrayGraph(N={}, E={})'.format(self.N, self.number_of_edges()))
+
+def as_array_graph(G):
+    """
+    Returns the given network as an ArrayGraph.
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network or ArrayGraph
+    """
+    if isinstance(G, ArrayGraph):
+        return(G)
+    return(ArrayGraph.from_networkx(G))
+
+def relabel_edges(G):
+    """
+    Returns the nodes of a NetworkX graph and its edges relabelled consecutively,
+    i.e. as a tuple (nodes, edges) where edges is an (E, 2) int32 array and
+    node nodes[i] is given the label i.
+
+    Labels are looked up in a permutation index array (if every label is a small
+    non-negative integer) or a dictionary (otherwise, e.g. for float or string labels),
+    so relabelling takes O(N + E) time.
+    If the nodes are already labelled 0, 1, ..., N-1 in order, the lookup is skipped.
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network
+    """
+    nodes = list(G.nodes())
+    N = len(nodes)
+    E = G.number_of_edges()
+    flat = (x for edge in G.edges() for x in edge[:2])
+    integer_labels = all(isinstance(node, (int, np.integer)) and not isinstance(node, (bool, np.bool_)) for node in nodes)
+    if integer_labels:
+        try:
+            labels = np.asarray(nodes, dtype=np.int64).reshape(N)
+            integer_labels = N == 0 or (labels.min() >= 0 and labels.max() < 4*N + 1024)
+        except OverflowError:
+            integer_labels = False
+    if integer_labels:
+        # small non-negative integer labels: use a permutation index array
+        edges = np.fromiter(flat, dtype=np.int64, count=2*E)
+        if not np.array_equal(labels, np.arange(N)):
+            index = np.full(labels.max()+1 if N else 0, -1, dtype=np.int32)
+            index[labels] = np.arange(N, dtype=np.int32)
+            edges = index[edges]
+        edges = edges.astype(np.int32, copy=False)
+    else:
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.fromiter((index[x] for x in flat), dtype=np.int32, count=2*E)
+    return(nodes, edges.reshape(-1,2))
+
+def canonical_edges(src, dst, N):
+    """
+    Returns the edges given by the arrays src and dst as an (E, 2) int32 array
+    with self loops and parallel edges removed.
+
+    Each edge is stored with the smaller node label first, and the edges are
+    sorted. This is the array equivalent of copying a multigraph into nx.Graph
+    and removing self loops.
+
+    Parameters
+    ----------
+    src : integer array of edge sources
+    dst : integer array of edge targets
+    N : the number of nodes
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    u = np.minimum(src[keep], dst[keep])
+    v = np.maximum(src[keep], dst[keep])
+    keys = np.unique(u*N + v)
+    edges = np.empty((len(keys), 2), dtype=np.int32)
+    edges[:,0] = keys // N
+    edges[:,1] = keys % N
+    return(edges)
+
+def save_array_graph(filename, graph, **meta):
+    """
+    Saves an ArrayGraph and its metadata in a binary format.
+
+    If the filename ends in '.npz', the network is saved as a single NumPy .npz file.
+    Otherwise, filename is a directory, and the network is saved in it as a raw int32
+    edge array (edges.npy) and a JSON metadata file (meta.json), so that the edges can
+    later be loaded memory-mapped.
+
+    Parameters
+    ----------
+    filename : the .npz file or directory name
+    graph : the ArrayGraph
+    meta : further metadata saved with the network (e.g. model, N, t, seed),
+        given as JSON serialisable values or NumPy numbers and arrays
+    """
+    meta = dict(meta, N=graph.N)
+    edges = np.ascontiguousarray(graph.edges, dtype=np.int32)
+    if filename.endswith('.npz'):
+        np.savez(filename, edges=edges, meta=np.array(json.dumps(meta, default=_json_value)))
+    else:
+        os.makedirs(filename, exist_ok=True)
+        np.save(os.path.join(filename, 'edges.npy'), edges)
+        with open(os.path.join(filename, 'meta.json'), 'w') as meta_file: # written last, marks the network as complete
+            json.dump(meta, meta_file, default=_json_value)
+
+def load_array_graph(filename, mmap=True):
+    """
+    Returns a network saved by save_array_graph() as a tuple (ArrayGraph, metadata dictionary),
+    or raises FileNotFoundError if no complete network is saved under this name.
+
+    Parameters
+    ----------
+    filename : the .npz file or directory name
+    mmap : if True, the edges saved in a directory are memory-mapped (read-only) rather than read into memory
+    """
+    if filename.endswith('.npz'):
+        with np.load(filename) as data:
+            meta = json.loads(str(data['meta']))
+            edges = data['edges']
+    else:
+        with open(os.path.join(filename, 'meta.json')) as meta_file:
+            meta = json.load(meta_file)
+        edges = np.load(os.path.join(filename, 'edges.npy'), mmap_mode='r' if mmap else None)
+    return((ArrayGraph(meta['N'], edges), meta))
+
+def _json_value(value):
+    # converts NumPy numbers and arrays in the metadata to Python values
+    return(np.asarray(value).tolist())
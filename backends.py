@@ -0,0 +1,157 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Lazy loading of the community detection backends (igraph, graph-tool, SciPy, infomap and MATLAB).
+
+Each backend is only imported the first time a method that needs it is run, and the
+MATLAB engine is only started (or connected to) the first time it is used, so that
+importing the package is fast when networks are only being generated.
+
+A MATLAB engine can be shared between processes: call share_matlab_engine() in one
+process (or set the MMM_MATLAB_ENGINE environment variable to the name of a shared
+MATLAB session) and worker processes will connect to it rather than starting their own.
+"""
+import importlib
+import os
+import random
+import tracing
+
+# backend name: (module to import, where to get it)
+BACKENDS = {
+    'igraph': ('igraph', 'http://igraph.org/python/'),
+    'graph_tool': ('graph_tool.inference', 'https://graph-tool.skewed.de/'),
+    'scipy': ('scipy.sparse.linalg', 'https://scipy.org/'),
+    'infomap': ('infomap', 'https://mapequation.org/infomap/'),
+    'matlab': ('matlab.engine', 'https://au.mathworks.com/help/matlab/matlab-engine-for-python.html')
+}
+
+# community detection method: backends it requires
+METHOD_BACKENDS = {
+    'modularity': ['igraph'],
+    'leiden': ['igraph'],
+    'multilevel': ['igraph'],
+    'infomap': ['igraph'],
+    'spectral': ['scipy'],
+    'sbm': ['graph_tool'],
+    'spectral_matlab': ['matlab']
+}
+
+MATLAB_ENGINE_VARIABLE = 'MMM_MATLAB_ENGINE' # name of a shared MATLAB session to connect to
+MATLAB_PATHS = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matlab'),
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matlab', 'spectral_subroutines')]
+
+_modules = dict()
+_unavailable = dict()
+_matlab_engine = None
+
+class BackendUnavailable(ImportError):
+    """
+    Raised when a community detection backend is not installed.
+    """
+
+def load(backend):
+    """
+    Imports (on first use) and returns the module for a given backend.
+
+    Raises BackendUnavailable if the backend is not installed.
+
+    Parameters
+    ----------
+    backend : the backend name (one of the keys of BACKENDS)
+    """
+    if backend in _modules:
+        return(_modules[backend])
+    if backend not in BACKENDS:
+        raise ValueError("Invalid backend. Expected one of: {}".format(list(BACKENDS.keys())))
+    if backend in _unavailable:
+        raise _unavailable[backend]
+    module, url = BACKENDS[backend]
+    try:
+        _modules[backend] = importlib.import_module(module)
+    except ImportError as error:
+        _unavailable[backend] = BackendUnavailable("The {} backend is not installed (see {}): {}".format(backend, url, error))
+        raise _unavailable[backend]
+    return(_modules[backend])
+
+def is_available(backend):
+    """
+    Returns True if the given backend can be imported.
+
+    Parameters
+    ----------
+    backend : the backend name (one of the keys of BACKENDS)
+    """
+    try:
+        load(backend)
+    except BackendUnavailable:
+        return(False)
+    return(True)
+
+def available_methods():
+    """
+    Returns a dictionary giving, for each community detection method, whether
+    all of the backends it needs are installed.
+
+    Note: this imports the backends (but does not start MATLAB).
+    """
+    return({method: all(is_available(backend) for backend in backends) for method, backends in METHOD_BACKENDS.items()})
+
+class igraph_seed:
+    """
+    Context manager that seeds igraph's random number generator for the enclosed code,
+    so that igraph methods (e.g. community_leiden, layout_drl) give reproducible results.
+    igraph's default generator (Python's random module) is restored afterwards.
+
+    Parameters
+    ----------
+    seed : the seed (if None, igraph's generator is left unchanged)
+    """
+    def __init__(self, seed):
+        self.seed = seed
+
+    def __enter__(self):
+        if self.seed is not None:
+            load('igraph').set_random_number_generator(random.Random(self.seed))
+
+    def __exit__(self, *exception):
+        if self.seed is not None:
+            load('igraph').set_random_number_generator(random)
+        return(False)
+
+def matlab_engine():
+    """
+    Returns the MATLAB engine, starting it (or connecting to a shared session) on first use.
+
+    If the MMM_MATLAB_ENGINE environment variable is set, the engine connects to the
+    shared MATLAB session with that name instead of starting a new MATLAB process.
+    """
+    global _matlab_engine
+    if _matlab_engine is None:
+        engine = load('matlab')
+        session = os.environ.get(MATLAB_ENGINE_VARIABLE)
+        with tracing.span('matlab.start', shared=bool(session)):
+            if session:
+                _matlab_engine = engine.connect_matlab(session)
+            else:
+                _matlab_engine = engine.start_matlab()
+            for path in MATLAB_PATHS:
+                _matlab_engine.addpath(path)
+    return(_matlab_engine)
+
+def share_matlab_engine(name='micro_meso_macro'):
+    """
+    Shares this process's MATLAB engine as a named session, so that other processes
+    (e.g. workers in a process pool) can connect to it instead of starting MATLAB.
+
+    Sets the MMM_MATLAB_ENGINE environment variable, which is inherited by worker
+    processes started afterwards. Returns the session name.
+
+    Parameters
+    ----------
+    name : the name of the shared MATLAB session
+    """
+    if os.environ.get(MATLAB_ENGINE_VARIABLE) is None:
+        matlab_engine().eval("matlab.engine.shareEngine('{}')".format(name), nargout=0)
+        os.environ[MATLAB_ENGINE_VARIABLE] = name
+    return(os.environ[MATLAB_ENGINE_VARIABLE])
@@ -0,0 +1,56 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Benchmark for relabelling networks with fix_graph() and relabel_edges().
+
+Compares the original list-scan relabelling (O(N*E), only run for small N)
+with the dictionary lookup used by relabel_edges() (O(N + E)) on networks with
+shuffled node labels, as produced by the configuration model.
+
+Usage: python benchmarks/bench_fix_graph.py
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import networkx as nx
+import numpy as np
+from network_generators import configuration_fast, fix_graph
+from array_graph import relabel_edges
+
+def quadratic_fix_graph(G):
+    """
+    The original fix_graph() implementation, kept for comparison.
+    """
+    gfix = nx.Graph()
+    edges = G.edges()
+    nodes = list(G.nodes())
+    num_nodes = len(nodes)
+    gfix.add_nodes_from(range(num_nodes))
+    for edge in edges:
+        gfix.add_edge(nodes.index(edge[0]), nodes.index(edge[1]))
+    return(gfix)
+
+def shuffled_network(N, seed=0):
+    """
+    Returns a configuration model network (c=0.1) with its nodes inserted in a random order.
+    """
+    rng = np.random.default_rng(seed)
+    edges = configuration_fast(0.1, N, seed=seed).edges
+    G = nx.Graph()
+    G.add_nodes_from(rng.permutation(N).tolist())
+    G.add_edges_from(edges.tolist())
+    return(G)
+
+def timed(function, G):
+    start = time.perf_counter()
+    function(G)
+    return(time.perf_counter()-start)
+
+if __name__ == '__main__':
+    print('{:>9} {:>12} {:>14} {:>12}'.format('N', 'quadratic', 'relabel_edges', 'fix_graph'))
+    for N in [10**3, 10**4, 10**5, 10**6]:
+        G = shuffled_network(N)
+        quadratic = '{:.3f}s'.format(timed(quadratic_fix_graph, G)) if N <= 10**4 else '-'
+        print('{:>9} {:>12} {:>13.3f}s {:>11.3f}s'.format(N, quadratic, timed(relabel_edges, G), timed(fix_graph, G)))
@@ -0,0 +1,287 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Benchmark suite for the network generators, format converters, metrics and
+community detection methods.
+
+Each case is run for both models over a grid of clustering parameters and network
+sizes (10^2 to 10^6 by default). Every measurement runs in a fresh subprocess, so
+that its peak resident memory (RSS) is not affected by earlier measurements, and
+records the wall time (the fastest of a number of repeats) and the peak RSS. The
+backends are loaded and the case is run once on a small network before the timed
+runs, so the times do not include importing the backend. A
+scaling exponent b (time ~ N^b) is fitted for each case, model and clustering
+parameter. Cases whose backend is not installed are recorded as skipped, and larger
+sizes of a case are skipped once it takes longer than --max-time.
+
+The results are written to a JSON file, and can be compared against a stored baseline
+(e.g. the results for the previous version of a dependency): measurements that are
+slower than the baseline by more than --tolerance are reported, and the exit status
+is 1 if there are any, so the suite can be used to gate upgrades.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --cases generate spectral --sizes 1000 100000
+    python benchmarks/run_benchmarks.py --output new.json --baseline results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from backends import BACKENDS, is_available, load
+
+SIZES = [10**2, 10**3, 10**4, 10**5, 10**6]
+WARMUP_SIZE = 100 # network size of the untimed warm-up run of each measurement
+MODEL_TS = {'triadic_closure': [0, 0.5, 1], 'configuration': [0, 0.1, 0.2]}
+
+def generate_setup(model, N, t, seed):
+    from network_generators import array_generator, triadic_closure, configuration
+    generator = array_generator({'triadic_closure': triadic_closure, 'configuration': configuration}[model])
+    return(lambda: generator(t, N, seed=seed))
+
+def generate_original_setup(model, N, t, seed):
+    import network_generators
+    np.random.seed(seed)
+    return(lambda: getattr(network_generators, model)(t, N))
+
+def fix_graph_case(G):
+    from network_generators import fix_graph
+    H = G.to_networkx()
+    return(lambda: fix_graph(H))
+
+def converter_case(name):
+    def case(G):
+        import community_detection
+        return(lambda: getattr(community_detection, name)(G))
+    return(case)
+
+def method_case(method):
+    def case(G):
+        from network import community_methods
+        return(lambda: community_methods()[method](G))
+    return(case)
+
+def transitivity_case(G):
+    import metrics
+    return(lambda: metrics.transitivity(G))
+
+def similarity_case(G):
+    from community_detection import get_similarity
+    rng = np.random.default_rng(0)
+    communities1 = rng.integers(int(np.sqrt(G.N)), size=G.N)
+    communities2 = rng.integers(int(np.sqrt(G.N)), size=G.N)
+    return(lambda: get_similarity(communities1, communities2))
+
+def case_setup(case):
+    # network cases build their (untimed) inputs from the network, then time the returned function
+    def setup(model, N, t, seed):
+        G = generate_setup(model, N, t, seed)()
+        return(case(G))
+    return(setup)
+
+# case name: (setup function, backends it requires, largest network size)
+CASES = {
+    'generate': (generate_setup, [], None),
+    'generate_original': (generate_original_setup, [], 10**4),
+    'fix_graph': (case_setup(fix_graph_case), [], None),
+    'convert_to_igraph': (case_setup(converter_case('convert_to_igraph')), ['igraph'], None),
+    'convert_to_gt': (case_setup(converter_case('convert_to_gt')), ['graph_tool'], None),
+    'transitivity': (case_setup(transitivity_case), [], None),
+    'modularity': (case_setup(method_case('modularity')), ['igraph'], None),
+    'leiden': (case_setup(method_case('leiden')), ['igraph'], None),
+    'multilevel': (case_setup(method_case('multilevel')), ['igraph'], None),
+    'infomap': (case_setup(method_case('infomap')), ['igraph'], 10**5),
+    'spectral': (case_setup(method_case('spectral')), ['scipy'], None),
+    'sbm': (case_setup(method_case('sbm')), ['graph_tool'], 10**5),
+    'spectral_matlab': (case_setup(method_case('spectral_matlab')), ['matlab'], 10**4),
+    'similarity': (case_setup(similarity_case), [], None)
+}
+
+def run_benchmarks(cases, sizes, models, repeats=1, seed=0, timeout=3600, max_time=600):
+    """
+    Runs the benchmark cases and returns the results as a dictionary with the
+    environment, one entry per measurement and the fitted scaling exponents.
+
+    Parameters
+    ----------
+    cases : list of case names (keys of CASES)
+    sizes : list of network sizes
+    models : dictionary giving the clustering parameters for each model name
+    repeats : the number of timed runs per measurement (the fastest is reported)
+    seed : seed for the generated networks
+    timeout : the maximum time (in seconds) for one measurement subprocess
+    max_time : larger sizes of a case are skipped once a measurement takes longer than this
+    """
+    results = []
+    for case in cases:
+        setup, backends, max_N = CASES[case]
+        missing = [backend for backend in backends if not is_available(backend)]
+        for model, ts in models.items():
+            for t in ts:
+                too_slow = False
+                for N in sorted(sizes):
+                    result = {'case': case, 'model': model, 't': t, 'N': N}
+                    if missing:
+                        result['status'] = 'skipped: {} not installed'.format(', '.join(missing))
+                    elif max_N is not None and N > max_N:
+                        result['status'] = 'skipped: N > {}'.format(max_N)
+                    elif too_slow:
+                        result['status'] = 'skipped: smaller N took longer than {}s'.format(max_time)
+                    else:
+                        result.update(measure(case, model, N, t, seed, repeats, timeout))
+                        too_slow = result['status'] != 'ok' or result['wall_time'] > max_time
+                    print(format_result(result), flush=True)
+                    results.append(result)
+    return({'environment': environment(), 'results': results, 'scaling': scaling_exponents(results)})
+
+def measure(case, model, N, t, seed, repeats, timeout):
+    """
+    Runs one measurement in a subprocess and returns a dictionary with its status,
+    wall time (in seconds) and peak RSS (in MB).
+    """
+    task = json.dumps({'case': case, 'model': model, 'N': N, 't': t, 'seed': seed, 'repeats': repeats})
+    try:
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', task],
+                                 capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return({'status': 'timeout after {}s'.format(timeout)})
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()
+        return({'status': 'error: ' + (error[-1] if error else 'exit status {}'.format(process.returncode))})
+    return(json.loads(process.stdout.strip().splitlines()[-1]))
+
+def worker(task):
+    """
+    Runs one measurement in this process and prints the result as JSON.
+    """
+    task = json.loads(task)
+    setup, backends, max_N = CASES[task['case']]
+    # load the backends and run the case once on a small network before timing, so that
+    # imports and other one-off start-up costs are not included in the times
+    for backend in backends:
+        load(backend)
+    setup(task['model'], min(task['N'], WARMUP_SIZE), task['t'], task['seed'])()
+    times = []
+    for repeat in range(task['repeats']):
+        # set up again for each repeat, so that views and results cached on the network are not reused
+        function = setup(task['model'], task['N'], task['t'], task['seed'])
+        baseline_memory = peak_memory()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    print(json.dumps({'status': 'ok', 'wall_time': min(times), 'peak_memory': peak_memory(),
+                      'setup_memory': baseline_memory}))
+
+def peak_memory():
+    # peak resident memory of this process in MB
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(peak/1024**2 if sys.platform == 'darwin' else peak/1024)
+
+def scaling_exponents(results, min_time=0.01):
+    """
+    Returns the scaling exponent b (wall time ~ N^b) for each case, model and clustering
+    parameter, fitted by least squares on a log-log scale to the sizes that took at least
+    min_time seconds (or to all sizes, if fewer than two did).
+    """
+    groups = dict()
+    for result in results:
+        if result.get('status') == 'ok':
+            groups.setdefault((result['case'], result['model'], result['t']), []).append((result['N'], result['wall_time']))
+    exponents = []
+    for (case, model, t), points in groups.items():
+        slow = [point for point in points if point[1] >= min_time]
+        points = slow if len(slow) >= 2 else points
+        if len(points) >= 2:
+            N, wall_time = np.log(np.array(points)).T
+            exponents.append({'case': case, 'model': model, 't': t, 'exponent': float(np.polyfit(N, wall_time, 1)[0]),
+                              'sizes': [int(round(np.exp(n))) for n in N]})
+    return(exponents)
+
+def compare(results, baseline, tolerance=1.5, min_time=0.01):
+    """
+    Returns the list of measurements that are slower (or use more memory) than in the baseline
+    by more than the given factor, ignoring measurements faster than min_time seconds.
+    """
+    key = lambda result: (result['case'], result['model'], result['t'], result['N'])
+    previous = {key(result): result for result in baseline['results'] if result.get('status') == 'ok'}
+    regressions = []
+    for result in results['results']:
+        old = previous.get(key(result))
+        if result.get('status') != 'ok' or old is None:
+            continue
+        for measure in ['wall_time', 'peak_memory']:
+            if measure == 'wall_time' and max(result[measure], old[measure]) < min_time:
+                continue
+            ratio = result[measure]/old[measure] if old[measure] > 0 else float('inf')
+            if ratio > tolerance:
+                regressions.append(dict(result, measure=measure, baseline=old[measure], ratio=ratio))
+    return(regressions)
+
+def environment():
+    """
+    Returns a dictionary describing the machine and the installed package versions.
+    """
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for backend in ['igraph', 'graph_tool', 'scipy']:
+        if is_available(backend):
+            module = sys.modules[BACKENDS[backend][0].split('.')[0]]
+            versions[backend] = getattr(module, '__version__', 'unknown')
+    import networkx
+    versions['networkx'] = networkx.__version__
+    return({'platform': platform.platform(), 'processor': platform.processor(),
+            'cpus': multiprocessing.cpu_count(), 'versions': versions,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')})
+
+def result_name(result):
+    return('{:<18} {:<16} t={:<5} N={:<8}'.format(result['case'], result['model'], result['t'], result['N']))
+
+def format_result(result):
+    name = result_name(result)
+    if result['status'] != 'ok':
+        return('{} {}'.format(name, result['status']))
+    return('{} {:>10.4f}s {:>9.1f}MB'.format(name, result['wall_time'], result['peak_memory']))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the network generators, converters and community detection methods.')
+    parser.add_argument('--cases', nargs='+', default=list(CASES.keys()), choices=list(CASES.keys()))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--models', nargs='+', default=list(MODEL_TS.keys()), choices=list(MODEL_TS.keys()))
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per measurement (the fastest is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=3600, help='maximum time for one measurement (s)')
+    parser.add_argument('--max-time', type=float, default=600, help='skip larger sizes once a measurement takes longer (s)')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file for the results')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='slowdown factor reported as a regression')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker)
+        sys.exit(0)
+
+    results = run_benchmarks(args.cases, args.sizes, {model: MODEL_TS[model] for model in args.models},
+                             args.repeats, args.seed, args.timeout, args.max_time)
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=1)
+    print('\nScaling exponents (wall time ~ N^b):')
+    for fit in results['scaling']:
+        print('{:<18} {:<16} t={:<5} b={:.2f}'.format(fit['case'], fit['model'], fit['t'], fit['exponent']))
+    print('Results saved as {}'.format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        print('\n{} regressions against {} (tolerance {}x)'.format(len(regressions), args.baseline, args.tolerance))
+        for regression in regressions:
+            print('{} {}: {:.4g} -> {:.4g} ({:.2f}x)'.format(result_name(regression), regression['measure'],
+                                                    regression['baseline'], regression[regression['measure']], regression['ratio']))
+        sys.exit(1 if regressions else 0)
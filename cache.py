@@ -0,0 +1,214 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Content-addressed cache for generated networks and detected community partitions.
+
+Networks are identified by (model, N, t, seed, code version), and partitions additionally
+by the detection method and its options, so that re-running an analysis over the same
+networks loads them from the cache instead of regenerating the networks and re-running
+the community detection methods.
+
+Each network is stored in its own directory with save_array_graph() (a raw int32 edge
+array, loaded memory-mapped, and a small JSON metadata file), and each partition as an int32 array
+in the same directory. Recently used networks and partitions are also kept in memory.
+"""
+import collections
+import functools
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from array_graph import load_array_graph, save_array_graph
+
+@functools.lru_cache(maxsize=None)
+def code_version(*modules):
+    """
+    Returns a short hash of the source files of the given modules, so that cached
+    results are not reused after the code that produced them has changed.
+
+    Parameters
+    ----------
+    modules : the module names (e.g. 'network_generators')
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        with open(os.path.join(directory, module + '.py'), 'rb') as source:
+            digest.update(source.read())
+    return(digest.hexdigest()[:12])
+
+def _hash(*parts):
+    return(hashlib.sha256(json.dumps(parts, sort_keys=True, default=_to_json).encode()).hexdigest()[:32])
+
+def _to_json(value):
+    return(np.asarray(value).tolist())
+
+class NetworkCache:
+    """
+    On-disk cache of generated networks and detected partitions, with an in-memory tier.
+
+    Parameters
+    ----------
+    directory : the directory where cached networks and partitions are stored
+    max_bytes : (optional) the maximum total size of the cache directory in bytes
+        When the cache grows larger, the least recently used networks (and their
+        partitions) are deleted.
+    memory_items : the number of networks and partitions kept in memory
+
+    Examples
+    ----------
+    >>> cache = NetworkCache('network_cache', max_bytes=10**10)
+    >>> network = Network(model=triadic_closure, N=100000, t=0.5, seed=1, cache=cache)
+    >>> sbm_communities = network.get_communities(method='sbm')
+
+    Creating the same network again (in this or a later session) loads it and its
+    SBM partition from the cache.
+    """
+    def __init__(self, directory, max_bytes=None, memory_items=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = collections.OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def network_key(self, model, N, t, seed):
+        """
+        Returns the cache key for a generated network.
+
+        Parameters
+        ----------
+        model : network generation model (triadic_closure or configuration)
+        N : network size
+        t : clustering parameter
+        seed : the seed used to generate the network
+        """
+        version = code_version('network_generators', 'array_graph')
+        return(_hash(model.__name__, int(N), float(t), seed, version))
+
+    def partition_key(self, network_key, method, options):
+        """
+        Returns the cache key for a partition found by a community detection method.
+
+        Parameters
+        ----------
+        network_key : the key of the network
+        method : the community detection method
+        options : dictionary of options passed to the method
+        """
+        version = code_version('community_detection', 'spectral')
+        return(_hash(network_key, method, options, version))
+
+    def load_network(self, key):
+        """
+        Returns the cached ArrayGraph for a network key (memory-mapped from disk),
+        or None if the network is not in the cache.
+        """
+        if ('network', key) in self._memory:
+            return(self._remember(('network', key)))
+        path = self._path(key)
+        try:
+            graph, meta = load_array_graph(path)
+        except FileNotFoundError:
+            return(None)
+        self._touch(path)
+        return(self._remember(('network', key), graph))
+
+    def save_network(self, key, graph, **meta):
+        """
+        Stores a network in the cache.
+
+        Parameters
+        ----------
+        key : the network key
+        graph : the ArrayGraph
+        meta : further metadata saved with the network (e.g. model, N, t, seed)
+        """
+        save_array_graph(self._path(key), graph, **meta)
+        self._remember(('network', key), graph)
+        self._evict()
+
+    def load_partition(self, network_key, method, options):
+        """
+        Returns the cached partition (as an int32 array) for a network, method and options,
+        or None if the partition is not in the cache.
+        """
+        key = self.partition_key(network_key, method, options)
+        if ('partition', key) in self._memory:
+            return(self._remember(('partition', key)))
+        filename = os.path.join(self._path(network_key), 'partition_{}_{}.npy'.format(method, key))
+        if not os.path.exists(filename):
+            return(None)
+        self._touch(self._path(network_key))
+        return(self._remember(('partition', key), np.load(filename, mmap_mode='r')))
+
+    def save_partition(self, network_key, method, options, communities):
+        """
+        Stores a partition in the cache (the network must already be cached).
+
+        Parameters
+        ----------
+        network_key : the key of the network
+        method : the community detection method
+        options : dictionary of options passed to the method
+        communities : the community partition (as a list or array)
+        """
+        key = self.partition_key(network_key, method, options)
+        communities = np.asarray(communities, dtype=np.int32)
+        path = self._path(network_key)
+        if os.path.isdir(path):
+            filename = os.path.join(path, 'partition_{}_{}.npy'.format(method, key))
+            np.save(filename + '.tmp.npy', communities)
+            os.replace(filename + '.tmp.npy', filename)
+        self._remember(('partition', key), communities)
+        self._evict()
+
+    def clear(self):
+        """
+        Deletes all cached networks and partitions.
+        """
+        self._memory.clear()
+        for entry in os.listdir(self.directory):
+            shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    def _path(self, key):
+        return(os.path.join(self.directory, key))
+
+    def _touch(self, path):
+        # record the access time used for least recently used eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _remember(self, key, value=None):
+        # adds (or looks up) an entry in the in-memory least recently used tier
+        if value is None:
+            self._memory.move_to_end(key)
+            return(self._memory[key])
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+        return(value)
+
+    def _evict(self):
+        # deletes the least recently used networks until the cache fits in max_bytes
+        if self.max_bytes is None:
+            return
+        entries = []
+        total = 0
+        for entry in os.listdir(self.directory):
+            path = self._path(entry)
+            if not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, entry))
+            total += size
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._path(entry), ignore_errors=True)
+            self._memory.pop(('network', entry), None)
+            total -= size
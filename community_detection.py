@@ -2,27 +2,34 @@
 # Sophie Wharrie <sophie_wharrie@outlook.com>
 # The University of Sydney, School of Mathematics and Statistics
 """
-Implements the four community detection methods (Modularity, Infomap, Spectral and SBM).
+Implements the four community detection methods (Modularity, Infomap, Spectral and SBM),
+and the faster multilevel (Louvain) and Leiden modularity methods.
 
 Due to the methods originating from various authors and programming languages,
 the purpose of this file is to provide a single cohesive Python interface to the four methods.
+
+The igraph, graph-tool, SciPy and MATLAB backends are loaded on first use (see backends.py),
+so only the backends needed by the methods that are actually run have to be installed.
+
+Each method returns a Partition (see partition.py), an int32 array of the community
+assignment of each node that can be used like a list.
 """
-import networkx as nx
-import igraph as ig
-from graph_tool import Graph
-import graph_tool.inference as gt
-import graph_tool.generation as gen
-import matlab.engine
-eng = matlab.engine.start_matlab()
-eng.addpath('matlab')
-eng.addpath('matlab/spectral_subroutines')
-import random
-import string
+import numpy as np
+import multiprocessing
+import os
+import tempfile
+import time
+from array_graph import ArrayGraph, as_array_graph
+from partition import Partition
+from structure import StructuralIndex
+from backends import load, matlab_engine, igraph_seed
+from similarity import adjusted_mutual_information, adjusted_mutual_information_many
+import tracing
 
 def get_modularity_communities(G):
     """
     Returns the community partition identified by the Modularity method,
-    i.e. a list containing the community assignment of each node.
+    i.e. a Partition containing the community assignment of each node.
 
     Reference for Modularity method: A. Clauset, M.E.J. Newman, C. Moore, 
     Finding community structure in very large networks, Physical Review E, 
@@ -30,7 +37,7 @@ def get_modularity_communities(G):
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
     """
     Gi = convert_to_igraph(G)
     n = Gi.vcount()
@@ -38,31 +45,239 @@ def get_modularity_communities(G):
     modularity_communities = reformat_igraph_output(modularity_communities,n)
     return(modularity_communities)
 
-def get_infomap_communities(G):
+def get_leiden_communities(G, resolution=1.0, iterations=2, seed=None):
+    """
+    Returns the community partition identified by the Leiden algorithm for modularity,
+    as a Partition containing the community assignment of each node.
+
+    This is a faster alternative to the Modularity method for large networks: the
+    igraph network is built directly from the edge array, and the partition is refined
+    in a few passes over the nodes instead of building the full fast-greedy dendrogram.
+
+    Reference for Leiden algorithm: V.A. Traag, L. Waltman, N.J. van Eck,
+    From Louvain to Leiden: guaranteeing well-connected communities,
+    Scientific Reports, 9, 5233 (2019).
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network or ArrayGraph
+    resolution : the resolution parameter of the modularity (higher values give smaller communities)
+    iterations : the number of iterations of the algorithm (if negative, iterate until
+        the partition no longer changes)
+    seed : (optional) seed for the random node order, for reproducible partitions
+    """
+    Gi = convert_to_igraph(G)
+    with igraph_seed(seed):
+        leiden_communities = Gi.community_leiden(objective_function='modularity', resolution=resolution, n_iterations=iterations)
+    return(Partition.from_igraph(leiden_communities))
+
+def get_multilevel_communities(G, resolution=1.0, seed=None):
+    """
+    Returns the community partition identified by the multilevel (Louvain) algorithm for
+    modularity, as a Partition containing the community assignment of each node.
+
+    Reference for multilevel algorithm: V.D. Blondel, J.-L. Guillaume, R. Lambiotte,
+    E. Lefebvre, Fast unfolding of communities in large networks, Journal of
+    Statistical Mechanics, P10008 (2008).
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network or ArrayGraph
+    resolution : the resolution parameter of the modularity (higher values give smaller communities)
+    seed : (optional) seed for the random node order, for reproducible partitions
+    """
+    Gi = convert_to_igraph(G)
+    with igraph_seed(seed):
+        multilevel_communities = Gi.community_multilevel(resolution=resolution)
+    return(Partition.from_igraph(multilevel_communities))
+
+def get_infomap_communities(G, trials=10, processes=1, seed=None, flow_model=None, consensus=False):
     """
     Returns the community partition identified by the Infomap method,
-    i.e. a list containing the community assignment of each node.
+    i.e. a Partition containing the community assignment of each node.
+
+    Note: the algorithm runs multiple trials and selects the partition with the
+    minimum codelength (see infomap_trials() for the codelength and timing of each
+    trial, and for the consensus partition).
 
     Reference for Infomap method: M. Rosvall, D. Axelsson, C.T. Bergstrom, 
     The map equation, EPJ Special Topics, 178, 13-23 (2009).
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
+    trials : the number of trials to run of the Infomap algorithm
+    processes : the number of trials to run concurrently in worker processes
+        (if 1, the trials run one after another in the current process)
+    seed : (optional) seed for the trials, for reproducible partitions
+    flow_model : (optional) the flow model of the infomap package (e.g. 'undirected',
+        'directed', 'undirdir'), which must be installed (see https://mapequation.org/infomap/)
+        If not given, the trials are run with igraph's Infomap implementation.
+    consensus : if True, returns the consensus partition of the trials instead of the
+        partition with the minimum codelength
     """
-    Gi = convert_to_igraph(G)
-    n = Gi.vcount()
-    infomap_communities = Gi.community_infomap()
-    infomap_communities = reformat_igraph_output(infomap_communities,n)
-    return(infomap_communities)
+    result = infomap_trials(G, trials=trials, processes=processes, seed=seed, flow_model=flow_model)
+    if consensus:
+        return(result.consensus())
+    return(result.partition)
+
+def infomap_trials(G, trials=10, processes=1, seed=None, flow_model=None):
+    """
+    Runs multiple trials of the Infomap method and returns an InfomapTrials object
+    with the partition, codelength and timing of each trial.
+
+    The network is converted once: with processes > 1, the converted igraph network is
+    shared with forked worker processes rather than rebuilt for each trial.
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network or ArrayGraph
+    trials : the number of trials
+    processes : the number of trials to run concurrently in worker processes
+        (if 1, the trials run one after another in the current process)
+    seed : (optional) seed for the trials, for reproducible partitions
+    flow_model : (optional) the flow model of the infomap package (see get_infomap_communities())
+
+    Examples
+    ----------
+    >>> result = infomap_trials(network.arrays, trials=50, processes=8, seed=1)
+    >>> result.codelengths.std()
+    >>> consensus_communities = result.consensus()
+    """
+    G = as_array_graph(G)
+    if flow_model is None:
+        graph = convert_to_igraph(G)
+    else:
+        load('infomap')
+        graph = G
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(trials)]
+    tasks = [(trial_seed, flow_model) for trial_seed in seeds]
+    if processes == 1:
+        results = [_infomap_trial(graph, task) for task in tasks]
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with context.Pool(min(processes, trials), initializer=_share_infomap_graph, initargs=(graph,)) as pool:
+            results = pool.map(_infomap_shared_trial, tasks, chunksize=1)
+    return(InfomapTrials(G, seeds, *zip(*results)))
 
-def get_spectral_communities(G):
+def _infomap_trial(graph, task):
+    # runs one Infomap trial and returns (partition, codelength, timings)
+    seed, flow_model = task
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    with tracing.span('infomap.trial', seed=seed):
+        if flow_model is None:
+            with igraph_seed(seed):
+                clustering = graph.community_infomap(trials=1)
+            partition, codelength = Partition.from_igraph(clustering), clustering.codelength
+        else:
+            infomap = load('infomap')
+            im = infomap.Infomap(two_level=True, num_trials=1, seed=seed % 2**31, flow_model=flow_model, silent=True)
+            im.add_nodes(range(graph.N))
+            im.add_links(graph.edges.tolist())
+            im.run()
+            modules = im.get_modules()
+            labels = np.zeros(graph.N, dtype=np.int32)
+            labels[np.fromiter(modules.keys(), dtype=np.int64, count=len(modules))] = np.fromiter(modules.values(), dtype=np.int32, count=len(modules))
+            partition, codelength = Partition(labels).relabel(), im.codelength
+    timings = {'wall_time': time.perf_counter() - wall_start, 'cpu_time': time.process_time() - cpu_start}
+    return((partition, codelength, timings))
+
+_shared_infomap_graph = None # the converted network shared with worker processes by infomap_trials()
+
+def _share_infomap_graph(graph):
+    global _shared_infomap_graph
+    _shared_infomap_graph = graph
+
+def _infomap_shared_trial(task):
+    return(_infomap_trial(_shared_infomap_graph, task))
+
+class InfomapTrials:
+    """
+    Results of infomap_trials().
+
+    Attributes
+    ----------
+    partitions : list of the partition found by each trial
+    codelengths : array of the codelength of each trial (in bits)
+    timings : list of dictionaries giving the wall time and CPU time (in seconds) of each trial
+    seeds : list of the seed of each trial
+    best : the trial with the minimum codelength
+    partition : the partition with the minimum codelength
+    """
+    def __init__(self, G, seeds, partitions, codelengths, timings):
+        self.G = G
+        self.seeds = list(seeds)
+        self.partitions = list(partitions)
+        self.codelengths = np.array(codelengths, dtype=np.float64)
+        self.timings = list(timings)
+        self.best = int(np.argmin(self.codelengths))
+        self.partition = self.partitions[self.best]
+
+    def co_assignment(self):
+        """
+        Returns an array giving, for each edge of the network (in the order of G.edges),
+        the fraction of trials that assign both of its endpoints to the same community.
+        """
+        u, v = self.G.edges[:,0], self.G.edges[:,1]
+        same = np.zeros(len(u), dtype=np.int64)
+        for partition in self.partitions:
+            labels = np.asarray(partition)
+            same += labels[u] == labels[v]
+        return(same/len(self.partitions))
+
+    def consensus(self, threshold=0.5):
+        """
+        Returns the consensus partition of the trials: the connected components of the
+        network after removing the edges whose endpoints are assigned to the same community
+        in at most the given fraction of the trials.
+
+        Parameters
+        ----------
+        threshold : the minimum fraction of trials (exclusive) that must co-assign the
+            endpoints of an edge for it to be kept
+        """
+        kept = ArrayGraph(self.G.N, self.G.edges[self.co_assignment() > threshold])
+        labels = StructuralIndex(kept).components[0]
+        return(Partition(labels).relabel())
+
+    def __repr__(self):
+        return('InfomapTrials(trials={}, best codelength={:.4f})'.format(len(self.partitions), self.codelengths[self.best]))
+
+def get_spectral_communities(G, seed=None, slp_iterations=0):
     """
     Returns the community partition identified by the Spectral method,
-    i.e. a list containing the community assignment of each node.
+    i.e. a Partition containing the community assignment of each node.
+
+    This is the native Python version of the method (see spectral.py), which uses
+    SciPy sparse matrices and only computes the negative eigenvalues of the
+    Bethe Hessian, so it does not need MATLAB. The original MATLAB version is
+    available as get_spectral_matlab_communities().
+
+    Reference for Spectral method: A. Saade, F. Krzakala, L. Zdeborová, 
+    Spectral clustering of graphs with the Bethe Hessian, Advances in Neural
+    Information Processing Systems, 406-414 (2014).
+
+    Parameters
+    ----------
+    G : NetworkX-formatted network or ArrayGraph
+    seed : (optional) seed for the eigensolver and k-means, for reproducible partitions
+    slp_iterations : (optional) if > 0, the regularising parameter used for clustering is
+        refined as in the MATLAB version (slow for large networks, see spectral_partition())
+    """
+    load('scipy')
+    from spectral import spectral_partition
+    spectral_communities = spectral_partition(as_array_graph(G), slp_iterations=slp_iterations, seed=seed)
+    return(Partition(spectral_communities))
 
-    Note: the MATLAB code for the Spectral method takes a GML file as input, 
-    so this function creates a file with the network saved in this format.
+def get_spectral_matlab_communities(G):
+    """
+    Returns the community partition identified by the MATLAB version of the Spectral method,
+    i.e. a Partition containing the community assignment of each node.
+
+    Note: the MATLAB code for the Spectral method takes a file as input, so this
+    function saves the network's edges to a unique temporary file as a binary int32
+    edge list (which MATLAB reads with fread), and deletes it afterwards.
 
     Reference for Spectral method: A. Saade, F. Krzakala, L. Zdeborová, 
     Spectral clustering of graphs with the Bethe Hessian, Advances in Neural
@@ -70,94 +285,172 @@ def get_spectral_communities(G):
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
     """
-    filename = 'temp.gml'
-    nx.write_gml(G, filename)
-    spectral_communities = eng.spectral_method(filename, nargout=1)
-    spectral_communities = [int(eng.single(x)) for x in spectral_communities] # convert to list format
+    eng = matlab_engine()
+    G = as_array_graph(G)
+    descriptor, filename = tempfile.mkstemp(suffix='.bin') # unique, so concurrent runs do not overwrite each other
+    try:
+        with tracing.span('matlab.write', N=G.N), os.fdopen(descriptor, 'wb') as edge_file:
+            G.edges.astype('<i4').tofile(edge_file)
+        with tracing.span('matlab.spectral_method', N=G.N):
+            spectral_communities = eng.spectral_method(filename, float(G.N), nargout=1)
+    finally:
+        os.remove(filename)
+    spectral_communities = Partition(np.asarray(spectral_communities)) # MATLAB arrays support the buffer protocol
     return(spectral_communities)
 
-def get_sbm_communities(G):
+def get_sbm_communities(G, trials=3, processes=1, tol=None, init=None, seed=None, omp_threads=None):
     """
     Returns the community partition identified by the SBM method,
-    i.e. a list containing the community assignment of each node.
+    i.e. a Partition containing the community assignment of each node
+    (the graph-tool block labels are relabelled canonically, so the communities
+    are numbered consecutively).
 
     Note: the algorithm runs multiple trials due to the stochastic nature of the method
     (selecting the partition with the minimum description length).
-    The number of trials can be varied in the code, if required. 
+    Only the best partition found so far is kept in memory.
 
     Reference for SBM method: T.P. Peixoto, Efficient Monte Carlo and greedy heuristic 
     for the inference of stochastic block models, Physical Review E, 89 (2014).
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
+    trials : the number of trials to run of the SBM algorithm
+    processes : the number of trials to run concurrently in worker processes
+        (if 1, the trials run one after another in the current process)
+    tol : (optional) early stopping tolerance for the description length
+        Once two trials have found description lengths within tol of the minimum,
+        the remaining trials are skipped. The trials are checked in the order of their
+        seeds (not the order in which the worker processes finish them), so the result
+        for a given seed does not depend on the number of processes.
+    init : (optional) a community partition (as a Partition or list) to start from
+        For example, the partition found for a network with a neighbouring clustering
+        parameter in a sweep. Each trial then refines this partition with MCMC sweeps
+        instead of running the full agglomerative heuristic.
+    seed : (optional) seed for the trials, for reproducible partitions
+    omp_threads : (optional) the number of OpenMP threads used by graph-tool in each trial
     """
-    trials = 3 # the number of trials to run of the SBM algorithm
-    Gto = convert_to_gt(G)
-    n = nx.number_of_nodes(G)
-    desc_len = [0]*trials
-    partitioning = [0]*trials
+    G = as_array_graph(G)
+    load('graph_tool')
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(trials)]
+    init = None if init is None else np.asarray(init, dtype=np.int64)
+    best = None # (description length, partition) of the best trial so far
+    desc_len = [] # description lengths of the finished trials
+
+    def converged():
+        return(tol is not None and sum(d <= best[0] + tol for d in desc_len) >= 2)
 
     # run multiple trials and select the partition with the minimum description length
-    for trial in range(trials):
-        partitioning_trial = gt.minimize_blockmodel_dl(Gto,B_min=1,B_max=n)
-        desc_len[trial] = partitioning_trial.entropy() # description length of a fit (negative log-likelihood)
-        partitioning[trial] = partitioning_trial
-    
-    mn,idx = min((desc_len[i],i) for i in range(0,len(desc_len)))
-    sbm_communities = partitioning[idx] # the partitioning with the min description length
-    sbm_communities = [x+1 for x in list(sbm_communities.get_blocks().get_array())] # convert to list format
+    if processes == 1:
+        Gto = convert_to_gt(G)
+        for trial in range(trials):
+            result = _sbm_trial(Gto, seeds[trial], init, omp_threads)
+            desc_len.append(result[0])
+            if best is None or result[0] < best[0]:
+                best = result
+            if converged():
+                break
+    else:
+        tasks = [(G.N, G.edges, trial_seed, init, omp_threads) for trial_seed in seeds]
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with context.Pool(min(processes, trials)) as pool:
+            for result in pool.imap(_sbm_trial_worker, tasks): # in seed order, for reproducible early stopping
+                desc_len.append(result[0])
+                if best is None or result[0] < best[0]:
+                    best = result
+                if converged():
+                    pool.terminate() # stop the trials that are still running
+                    break
+
+    sbm_communities = best[1] # the partitioning with the min description length
     return(sbm_communities)
 
+def _sbm_trial(Gto, seed, init, omp_threads):
+    """
+    Runs one trial of the SBM algorithm on a graph-tool network and returns a tuple
+    (description length, Partition) for the fitted partition.
+    """
+    gt = load('graph_tool')
+    import graph_tool
+    graph_tool.seed_rng(seed)
+    if omp_threads is not None:
+        previous_threads = graph_tool.openmp_get_num_threads()
+        graph_tool.openmp_set_num_threads(omp_threads)
+    try:
+        with tracing.span('sbm.trial', N=Gto.num_vertices(), seed=seed):
+            if init is None:
+                partitioning_trial = gt.minimize_blockmodel_dl(Gto,B_min=1,B_max=Gto.num_vertices())
+            else:
+                blocks = Gto.new_vertex_property('int')
+                blocks.a = init - 1
+                partitioning_trial = gt.BlockState(Gto, b=blocks)
+                gt.mcmc_equilibrate(partitioning_trial, wait=10, mcmc_args=dict(niter=10))
+            desc_len = partitioning_trial.entropy() # description length of a fit (negative log-likelihood)
+    finally:
+        if omp_threads is not None:
+            graph_tool.openmp_set_num_threads(previous_threads) # the thread count is global to graph-tool
+    return((desc_len, Partition.from_gt(partitioning_trial)))
+
+def _sbm_trial_worker(task):
+    # runs one SBM trial in a worker process, building the graph-tool network from the edge array
+    N, edges, seed, init, omp_threads = task
+    return(_sbm_trial(_build_gt(ArrayGraph(N, edges)), seed, init, omp_threads))
+
 def convert_to_igraph(G):
     """
-    Takes a NetworkX-formatted network and returns an equivalent igraph-formatted network.
+    Takes a network and returns an equivalent igraph-formatted network.
+
+    The igraph network is built in bulk from the edge array and cached on the
+    ArrayGraph, so repeated calls for the same network do not rebuild it.
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
     """
-    n = nx.number_of_nodes(G)
-    edges = G.edges()
-    Gi = ig.Graph()
-    Gi.add_vertices(n)
-    Gi.add_edges(edges)
-    return(Gi)
+    ig = load('igraph')
+    G = as_array_graph(G)
+    return(G.view('igraph', lambda: _build_igraph(ig, G)))
 
 def convert_to_gt(G):
     """
-    Takes a NetworkX-formatted network and returns an equivalent graphtool-formatted network.
+    Takes a network and returns an equivalent graphtool-formatted network.
+
+    The graph-tool network is built in bulk from the edge array and cached on the
+    ArrayGraph, so repeated calls for the same network do not rebuild it.
 
     Parameters
     ----------
-    G : NetworkX-formatted network
+    G : NetworkX-formatted network or ArrayGraph
     """
-    n = nx.number_of_nodes(G)
-    Gto = Graph(directed=False)
-    Gto.add_vertex(n)
-    edges = [edge for edge in G.edges()]
-    for edge in edges:
-        Gto.add_edge(Gto.vertex(edge[0]),Gto.vertex(edge[1]))
+    G = as_array_graph(G)
+    return(G.view('graph_tool', lambda: _build_gt(G)))
+
+def _build_igraph(ig, G):
+    with tracing.span('convert.igraph', N=G.N):
+        return(ig.Graph(n=G.N, edges=G.edges.tolist()))
+
+def _build_gt(G):
+    load('graph_tool')
+    from graph_tool import Graph
+    with tracing.span('convert.graph_tool', N=G.N):
+        Gto = Graph(directed=False)
+        Gto.add_vertex(G.N)
+        Gto.add_edge_list(G.edges)
     return(Gto)
 
 def reformat_igraph_output(igraph_output, n):
     """
-    Takes output from igraph community detection methods and returns the data reformatted in a Python list,
-    i.e. a list containing the community assignment of each node.
+    Takes output from igraph community detection methods and returns it as a Partition,
+    i.e. the community assignment of each node.
 
     Parameters
     ----------
     igraph_output: the community detection output from an igraph function
     n: number of nodes in the network
     """
-    numcom = len(igraph_output)
-    community_list = [0]*n
-    for community in range(numcom):
-        for entry in igraph_output[community]: 
-            community_list[entry] = community+1
-    return(community_list)
+    return(Partition.from_igraph(igraph_output))
 
 def get_number_communities(communities):
     """
@@ -165,14 +458,19 @@ def get_number_communities(communities):
 
     Parameters
     ----------
-    communities : the community partition (as a list)
+    communities : the community partition (as a Partition or list)
     """
-    return(int(max(communities)))
+    if isinstance(communities, Partition):
+        return(communities.number_of_communities())
+    return(int(np.max(communities)))
 
 def get_similarity(communities1, communities2):
     """
     Returns the adjusted mutual information (AMI) between two community partitions,
     indicating the degree of similarity between them.
+
+    The AMI is computed natively with NumPy (see similarity.py). The original MATLAB
+    version is available as get_similarity_matlab().
     
     Reference for AMI code: N.X. Vinh, J. Epps, J. Bailey, Information theoretic 
     measures for clusterings comparison: Variants, properties, normalization and 
@@ -180,13 +478,43 @@ def get_similarity(communities1, communities2):
 
     Parameters
     ----------
-    communities1 : the first set of communities (as a list)
-    communities2: the second set of communities to compare (as a list)
+    communities1 : the first set of communities (as a Partition or list)
+    communities2: the second set of communities to compare (as a Partition or list)
+    """
+    with tracing.span('similarity', N=len(communities1)):
+        return(float(adjusted_mutual_information(communities1, communities2)))
+
+def get_similarity_many(communities, others):
+    """
+    Returns a list with the adjusted mutual information (AMI) between one community
+    partition and each of several others, computed in a single batched call.
+
+    Parameters
+    ----------
+    communities : the set of communities to compare against (as a Partition or list)
+    others : a list of sets of communities (each as a Partition or list)
+    """
+    with tracing.span('similarity.many', N=len(communities), partitions=len(others)):
+        return(adjusted_mutual_information_many(communities, others).tolist())
+
+def get_similarity_matlab(communities1, communities2):
+    """
+    Returns the adjusted mutual information (AMI) between two community partitions,
+    computed by the MATLAB code in matlab/ami.m.
+
+    Parameters
+    ----------
+    communities1 : the first set of communities (as a Partition or list)
+    communities2: the second set of communities to compare (as a Partition or list)
     """
+    eng = matlab_engine()
+    import matlab
+
     # convert to MATLAB format
-    matlab_communities1 = matlab.double(communities1)
-    matlab_communities2 = matlab.double(communities2)
+    matlab_communities1 = matlab.double(np.asarray(communities1, dtype=np.float64).tolist())
+    matlab_communities2 = matlab.double(np.asarray(communities2, dtype=np.float64).tolist())
 
     # compute AMI
-    ami = eng.ami(matlab_communities1,matlab_communities2)
+    with tracing.span('similarity.matlab', N=len(communities1)):
+        ami = eng.ami(matlab_communities1,matlab_communities2)
     return(ami)
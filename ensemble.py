@@ -0,0 +1,198 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Ensembles of independently generated networks with the same parameters.
+
+Averaging a statistic over many replicate networks with the same model, size and
+clustering parameter is the main workload of the experiments. The generate_ensemble
+function generates all the replicates in one call, optionally split across worker
+processes, and stores them as a single concatenated int32 edge array with offsets,
+rather than as a list of Network objects.
+
+Each replicate has its own seed, spawned from the ensemble seed with
+numpy.random.SeedSequence, so the random number streams of the replicates are
+independent and replicate r is the same network as Network(model, N, t, seed=ensemble.seeds[r]).
+"""
+import multiprocessing
+import numpy as np
+from array_graph import ArrayGraph, save_array_graph, load_array_graph
+from network_generators import triadic_closure, configuration, array_generator
+from network import Network, check_parameters
+import tracing
+
+def generate_ensemble(model, N, t, R, seed=None, processes=1):
+    """
+    Generates R independent networks from the same model with the same size and
+    clustering parameter, and returns them as an Ensemble.
+
+    Parameters
+    ----------
+    model : network generation model (triadic_closure or configuration)
+    N : network size
+    t : clustering parameter (as for Network)
+    R : the number of replicate networks
+    seed : (optional) seed for the ensemble, from which the seed of each replicate is spawned
+        (if not given, a random seed is drawn and stored in ensemble.seed)
+    processes : the number of worker processes generating the replicates
+        (if 1, the replicates are generated in the current process)
+
+    Examples
+    ----------
+    >>> ensemble = generate_ensemble(triadic_closure, N=10000, t=0.5, R=500, seed=1, processes=8)
+    >>> clustering = ensemble.map(metrics.transitivity, processes=8)
+    """
+    check_parameters(model, N, t)
+    if not (type(R)==int and R > 0):
+        raise ValueError("Invalid R. Expected an integer greater than zero")
+    seed = seed if seed is not None else int(np.random.SeedSequence().generate_state(1)[0])
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(R)]
+
+    # each task generates a contiguous range of replicates
+    chunks = _split(seeds, 1 if processes == 1 else 4*processes)
+    tasks = [(model, N, t, chunk) for chunk in chunks]
+    with tracing.span('generate.ensemble', model=model.__name__, N=N, t=t, R=R, processes=processes):
+        if processes == 1 or len(chunks) <= 1:
+            results = [_generate_chunk(task) for task in tasks]
+        else:
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+            with context.Pool(processes) as pool:
+                results = pool.map(_generate_chunk, tasks, chunksize=1)
+    edges = np.concatenate([chunk_edges for chunk_edges, counts in results])
+    offsets = np.zeros(R+1, dtype=np.int64)
+    np.cumsum(np.concatenate([counts for chunk_edges, counts in results]), out=offsets[1:])
+    return(Ensemble(model, N, t, seed, seeds, edges, offsets))
+
+def _split(items, parts):
+    # splits a list into at most the given number of contiguous, nonempty parts
+    bounds = np.linspace(0, len(items), min(parts, len(items))+1).astype(int)
+    return([items[start:end] for start, end in zip(bounds[:-1], bounds[1:])])
+
+def _generate_chunk(task):
+    # generates the replicates with the given seeds, returning (concatenated edges, edge counts)
+    model, N, t, seeds = task
+    generator = array_generator(model)
+    edges = [generator(t, N, seed=seed).edges for seed in seeds]
+    return((np.concatenate(edges), np.array([len(e) for e in edges], dtype=np.int64)))
+
+class Ensemble:
+    """
+    Replicate networks with the same model, size and clustering parameter,
+    stored as one concatenated int32 edge array.
+
+    The edges of replicate r are edges[offsets[r]:offsets[r+1]], and ensemble[r]
+    returns replicate r as an ArrayGraph whose edge array is a view of the
+    concatenated array (no edges are copied).
+
+    Attributes
+    ----------
+    model : network generation model (triadic_closure or configuration)
+    N : network size
+    t : clustering parameter
+    seed : the ensemble seed
+    seeds : list of the seeds of the replicates (replicate r is the network
+        Network(model, N, t, seed=seeds[r]))
+    edges : int32 array of shape (E, 2) with the edges of all the replicates
+    offsets : int64 array of length R+1 giving the first edge of each replicate
+    """
+    def __init__(self, model, N, t, seed, seeds, edges, offsets):
+        self.model = model
+        self.N = N
+        self.t = t
+        self.seed = seed
+        self.seeds = list(seeds)
+        self.edges = edges
+        self.offsets = offsets
+
+    def __len__(self):
+        return(len(self.seeds))
+
+    def __getitem__(self, r):
+        if not -len(self) <= r < len(self):
+            raise IndexError("Invalid replicate. Expected an integer between 0 and {}".format(len(self)-1))
+        r = r % len(self)
+        return(ArrayGraph(self.N, self.edges[self.offsets[r]:self.offsets[r+1]]))
+
+    def __iter__(self):
+        for r in range(len(self)):
+            yield self[r]
+
+    def number_of_edges(self):
+        """
+        Return an integer array giving the number of edges of each replicate.
+        """
+        return(np.diff(self.offsets))
+
+    def network(self, r):
+        """
+        Return replicate r as a Network object (without generating it again).
+
+        Parameters
+        ----------
+        r : the replicate number
+        """
+        return(Network._from_arrays(self.model, self.N, self.t, self.seeds[r], self[r]))
+
+    def map(self, function, processes=1):
+        """
+        Applies a function to each replicate (as an ArrayGraph) and returns the list of results,
+        e.g. ensemble.map(metrics.transitivity) to average the clustering over the ensemble.
+
+        Parameters
+        ----------
+        function : a function taking an ArrayGraph (picklable if processes > 1)
+        processes : the number of worker processes
+            (if 1, the function is applied in the current process)
+        """
+        if processes == 1 or len(self) <= 1:
+            return([function(G) for G in self])
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        tasks = [(function, chunk) for chunk in _split(list(range(len(self))), 4*processes)]
+        with context.Pool(processes, initializer=_share_ensemble, initargs=(self,)) as pool:
+            results = pool.map(_apply_shared, tasks, chunksize=1)
+        return([result for chunk_results in results for result in chunk_results])
+
+    def save(self, filename):
+        """
+        Save the ensemble in a compact binary format (see save_array_graph()), so that
+        it can be loaded again with Ensemble.load().
+
+        Parameters
+        ----------
+        filename : the file or directory name (as a string)
+            If the filename ends in '.npz', the ensemble is saved as a single NumPy .npz file.
+            Otherwise, a directory is created with the raw int32 edge array (edges.npy) and
+            the parameters, seeds and offsets (meta.json), which can be loaded memory-mapped.
+        """
+        save_array_graph(filename, ArrayGraph(self.N, self.edges), model=self.model.__name__, t=self.t,
+                         seed=self.seed, seeds=self.seeds, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, filename, mmap=True):
+        """
+        Load an ensemble saved with save().
+
+        Parameters
+        ----------
+        filename : the file or directory name used with save()
+        mmap : (optional) if True, edges saved in a directory are memory-mapped (read-only)
+            rather than read into memory
+        """
+        arrays, meta = load_array_graph(filename, mmap)
+        models = {model.__name__: model for model in [triadic_closure, configuration]}
+        return(cls(models[meta['model']], meta['N'], meta['t'], meta['seed'], meta['seeds'],
+                   arrays.edges, np.asarray(meta['offsets'], dtype=np.int64)))
+
+    def __repr__(self):
+        return('Ensemble(model={}, N={}, t={}, R={})'.format(self.model.__name__, self.N, self.t, len(self)))
+
+_shared_ensemble = None # the ensemble shared with worker processes by Ensemble.map()
+
+def _share_ensemble(ensemble):
+    global _shared_ensemble
+    _shared_ensemble = ensemble
+
+def _apply_shared(task):
+    # applies the function to a range of replicates of the shared ensemble
+    function, replicates = task
+    return([function(_shared_ensemble[r]) for r in replicates])
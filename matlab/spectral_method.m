@@ -1,17 +1,24 @@
-function inferred_sigma = spectral_method(filename)
+function inferred_sigma = spectral_method(filename, N)
     % Spectral community detection method adapted from code written
     % by Alaa Saade (available at http://mode_net.krzakala.org/).
  	% INPUTS :
  	% name is a string containing the name of the network to load, e.g. 'dolphins.gml'.
+ 	% N (optional) is the number of nodes, if the network is given as a binary
+ 	% edge list of int32 node pairs numbered from 0 (see read_edges.m) instead.
     % OUTPUTS :
     % inferred_sigma is the community assignement inferred by the spectral clustering method 
     warning('off','all')
     path(path,'spectral_subroutines');
 
     % read in network
-    [E,sigma]=read_gml(filename);
+    if nargin < 2
+        [E,sigma]=read_gml(filename);
+        N=max(max(E));
+    else
+        E=read_edges(filename);
+        sigma=zeros(N,1);
+    end
 
-    N=max(max(E));
     q=N; % edit
     nnz=2*length(E)+N;
     si=nnz-N;
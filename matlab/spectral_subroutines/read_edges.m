@@ -0,0 +1,9 @@
+function [ E ] = read_edges( fname )
+%READ_EDGES read a binary edge list
+%   The file holds the edges as consecutive pairs of little-endian int32
+%   node labels numbered from 0 (as written by get_spectral_matlab_communities),
+%   and E is returned as an edge matrix with nodes numbered from 1.
+    inputfile = fopen(fname, 'r');
+    E = fread(inputfile, [2 Inf], 'int32=>double', 0, 'l')' + 1;
+    fclose(inputfile);
+end
@@ -0,0 +1,262 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Fast triangle counting and clustering metrics for generated networks.
+
+Triangles are listed by intersecting sorted adjacency arrays: each edge is directed
+from the endpoint of lower degree to the endpoint of higher degree, and every
+triangle is found exactly once as a directed path a -> b -> c closed by the edge
+a -> c. The work is split into chunks of candidate paths, which can be processed in
+parallel by worker processes. For very large networks, the clustering coefficients
+can instead be estimated by sampling wedges (paths of length two).
+
+All functions accept an ArrayGraph, a Network or a NetworkX-formatted network.
+"""
+import multiprocessing
+import numpy as np
+from array_graph import as_array_graph
+from structure import structural_index
+import tracing
+
+CHUNK_SIZE = 2**22 # maximum number of candidate triangles checked at once
+
+def triangles(G, processes=1):
+    """
+    Returns an integer array giving the number of triangles each node belongs to
+    (the equivalent of nx.triangles).
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    processes : the number of worker processes used to list the triangles
+    """
+    return(_triangle_counts(G, processes)[0])
+
+def edge_support(G, processes=1):
+    """
+    Returns an integer array giving the number of triangles each edge belongs to,
+    in the order of the edge array G.edges.
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    processes : the number of worker processes used to list the triangles
+    """
+    return(_triangle_counts(G, processes)[1])
+
+def number_of_triangles(G, processes=1):
+    """
+    Returns the number of triangles in the network.
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    processes : the number of worker processes used to list the triangles
+    """
+    return(int(triangles(G, processes).sum() // 3))
+
+def joint_degrees(G, processes=1):
+    """
+    Returns the joint degree sequence (s, t) of the network, as used by the configuration model:
+    t[i] is the number of triangles node i belongs to, and s[i] is the number of edges
+    of node i that do not belong to any triangle.
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    processes : the number of worker processes used to list the triangles
+    """
+    G = _array_graph(G)
+    node_triangles, support = _triangle_counts(G, processes)
+    independent = G.edges[support == 0]
+    s = np.bincount(independent.ravel(), minlength=G.N)
+    return(s, node_triangles)
+
+def local_clustering(G, processes=1):
+    """
+    Returns an array giving the local clustering coefficient of each node
+    (zero for nodes with degree less than two, as in nx.clustering).
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    processes : the number of worker processes used to list the triangles
+    """
+    G = _array_graph(G)
+    wedges = _wedges(_degrees(G))
+    clustering = np.zeros(G.N)
+    np.divide(triangles(G, processes), wedges, out=clustering, where=wedges > 0)
+    return(clustering)
+
+def average_clustering(G, samples=None, seed=None, processes=1):
+    """
+    Returns the average local clustering coefficient of the network (the equivalent of
+    nx.average_clustering).
+
+    If samples is given, the average is estimated from that many randomly chosen nodes,
+    by checking whether one random wedge centred at each node is closed (the standard
+    error is at most 0.5/sqrt(samples)).
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    samples : (optional) the number of sampled nodes, for an approximate result
+    seed : (optional) seed for the random sampling
+    processes : the number of worker processes used to list the triangles
+    """
+    G = _array_graph(G)
+    if samples is None:
+        return(float(local_clustering(G, processes).mean()) if G.N else 0.0)
+    rng = np.random.default_rng(seed)
+    centres = rng.integers(G.N, size=samples)
+    centres = centres[G.degrees()[centres] >= 2] # nodes with no wedges have clustering zero
+    return(float(np.sum(_sample_closed_wedges(G, centres, rng)))/samples)
+
+def transitivity(G, samples=None, seed=None, processes=1):
+    """
+    Returns the global clustering coefficient (transitivity) of the network,
+    3 x (number of triangles) / (number of wedges), the equivalent of nx.transitivity.
+
+    If samples is given, the transitivity is estimated as the fraction of closed wedges
+    among that many wedges sampled uniformly at random (the standard error is at most
+    0.5/sqrt(samples)).
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    samples : (optional) the number of sampled wedges, for an approximate result
+    seed : (optional) seed for the random sampling
+    processes : the number of worker processes used to list the triangles
+    """
+    G = _array_graph(G)
+    wedges = _wedges(_degrees(G))
+    total = wedges.sum()
+    if total == 0:
+        return(0.0)
+    if samples is None:
+        return(float(triangles(G, processes).sum()/total))
+    rng = np.random.default_rng(seed)
+    # choose wedge centres with probability proportional to their number of wedges
+    centres = np.searchsorted(np.cumsum(wedges), rng.random(samples)*total, side='right')
+    return(float(np.mean(_sample_closed_wedges(G, centres, rng))))
+
+def _array_graph(G):
+    # a Network stores its ArrayGraph as network.arrays
+    return(as_array_graph(getattr(G, 'arrays', G)))
+
+def _degrees(G):
+    # node degrees counted from the edge array (without building the CSR adjacency), shared via the structural index
+    return(structural_index(G).degrees)
+
+def _wedges(degrees):
+    degrees = degrees.astype(np.int64)
+    return(degrees*(degrees-1)//2)
+
+def _sample_closed_wedges(G, centres, rng):
+    # returns a boolean array saying whether a random wedge at each centre is closed
+    indptr, indices = G.indptr, G.indices
+    degrees = G.degrees()[centres]
+    first = (rng.random(len(centres))*degrees).astype(np.int64)
+    second = (rng.random(len(centres))*(degrees-1)).astype(np.int64)
+    second += second >= first # two distinct neighbours
+    u = indices[indptr[centres] + first]
+    v = indices[indptr[centres] + second]
+    # u and v are linked if v is in the (sorted) neighbour list of u
+    offset = _search_rows(indices, indptr[u], indptr[u+1], v)
+    position = np.minimum(indptr[u] + offset, len(indices)-1) # clamped for the array access only
+    return((offset < indptr[u+1] - indptr[u]) & (indices[position] == v))
+
+def _search_rows(indices, starts, ends, values):
+    # vectorised binary search for values[i] in the sorted slice indices[starts[i]:ends[i]]
+    low = np.zeros(len(values), dtype=np.int64)
+    high = (ends - starts).astype(np.int64)
+    while np.any(low < high):
+        middle = (low + high)//2
+        smaller = np.zeros(len(values), dtype=bool)
+        active = low < high
+        smaller[active] = indices[starts[active] + middle[active]] < values[active]
+        low = np.where(active & smaller, middle + 1, low)
+        high = np.where(active & ~smaller, middle, high)
+    return(low)
+
+def _triangle_counts(G, processes=1):
+    # returns (triangles per node, triangles per edge), cached with the network
+    G = _array_graph(G)
+    return(G.view('triangle_counts', lambda: _count_triangles(G, processes)))
+
+def _count_triangles(G, processes):
+    with tracing.span('metrics.triangles', N=G.N, processes=processes):
+        return(_list_triangles(G, processes))
+
+def _list_triangles(G, processes):
+    N, E = G.N, G.number_of_edges()
+    oriented = _orient(G)
+    keys, targets, order, out_indptr = oriented
+    # each directed edge a -> b is extended by the out-edges b -> c, giving wedges_per_edge[e] candidates
+    wedges_per_edge = np.diff(out_indptr)[targets]
+    bounds = _chunk_bounds(np.cumsum(wedges_per_edge), CHUNK_SIZE)
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+    if processes == 1 or len(chunks) <= 1:
+        results = [_chunk_triangles(oriented, chunk) for chunk in chunks]
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with context.Pool(processes, initializer=_share_oriented, initargs=(oriented,)) as pool:
+            results = pool.map(_chunk_triangles_shared, chunks)
+    triangle_edges = np.concatenate([np.zeros((0,3), dtype=np.int64)] + results)
+
+    # edges of each triangle are positions in the sorted directed edge list
+    edge_counts = np.bincount(triangle_edges.ravel(), minlength=E)
+    support = np.empty(E, dtype=np.int64)
+    support[order] = edge_counts
+    node_triangles = np.bincount(G.edges.ravel(), weights=np.repeat(support, 2), minlength=N)//2
+    return((node_triangles.astype(np.int64), support))
+
+def _orient(G):
+    # directs each edge from the endpoint of lower (degree, label) rank to the higher one, and sorts
+    # the directed edges by (source, target), returning (keys, targets, order, out_indptr)
+    N = G.N
+    rank = np.empty(N, dtype=np.int64)
+    rank[np.argsort(_degrees(G), kind='stable')] = np.arange(N)
+    u, v = G.edges[:,0].astype(np.int64), G.edges[:,1].astype(np.int64)
+    forward = rank[u] < rank[v]
+    sources = np.where(forward, u, v)
+    targets = np.where(forward, v, u)
+    keys = sources*N + targets
+    order = np.argsort(keys, kind='stable')
+    out_indptr = np.zeros(N+1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=N), out=out_indptr[1:])
+    return((keys[order], targets[order], order, out_indptr))
+
+def _chunk_bounds(cumulative, size):
+    # splits the directed edges into ranges with about size candidate triangles each
+    if len(cumulative) == 0:
+        return(np.array([0, 0]))
+    cuts = np.searchsorted(cumulative, np.arange(size, cumulative[-1], size), side='right')
+    return(np.unique(np.concatenate([[0], cuts, [len(cumulative)]])))
+
+def _chunk_triangles(oriented, chunk):
+    # returns the triangles closed by the candidate paths a -> b -> c starting with the directed
+    # edges in the given range, as an array of the positions of their edges (a,b), (b,c), (a,c)
+    keys, targets, order, out_indptr = oriented
+    N = len(out_indptr)-1
+    first, last = chunk
+    edges = np.arange(first, last)
+    b = targets[first:last]
+    counts = out_indptr[b+1] - out_indptr[b]
+    path = np.repeat(edges, counts) # position of edge a -> b
+    offsets = np.arange(len(path)) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = np.repeat(out_indptr[b], counts) + offsets # position of edge b -> c
+    closing = keys[path]//N*N + targets[second] # key of the edge a -> c
+    third = np.searchsorted(keys, closing)
+    closed = keys[np.minimum(third, len(keys)-1)] == closing
+    return(np.column_stack([path[closed], second[closed], third[closed]]))
+
+_shared_oriented = None # the directed edge list shared with worker processes
+
+def _share_oriented(oriented):
+    global _shared_oriented
+    _shared_oriented = oriented
+
+def _chunk_triangles_shared(chunk):
+    return(_chunk_triangles(_shared_oriented, chunk))
@@ -9,8 +9,17 @@ and provides methods for examining the community structure.
 """
 from network_generators import *
 from community_detection import *
-import matplotlib.pyplot as plt
+from backends import available_methods, share_matlab_engine
+from cache import NetworkCache
+from array_graph import load_array_graph, save_array_graph
+from partition import Partition
+from layout import compute_layout, RASTER_SIZE
+from structure import structural_index
+import tracing
 import itertools
+import multiprocessing
+import sys
+import time
 
 class Network:
     """
@@ -93,7 +102,7 @@ class Network:
 
     >>> network.communities_summary()
     """
-    def __init__(self, model, N, t):
+    def __init__(self, model, N, t, seed=None, cache=None):
         """
         Initialise a network with given parameters.
 
@@ -109,6 +118,21 @@ class Network:
             For the triadic closure model, 0 <= t <= 1 (acts as the parameter p).
             For the configuration model, 0 <= t <= 0.2 (acts as the parameter c).
 
+        Parameters (optional)
+        ----------
+        seed: random seed (integer)
+            Seed for the random number generator, so that the same network can be
+            generated again. If no seed is given, a random seed is drawn and stored
+            in network.seed.
+        cache: a NetworkCache (see cache.py)
+            If given, the network is loaded from the cache if it was generated before
+            (and saved to the cache otherwise), and get_communities() reuses cached
+            partitions in the same way.
+
+        The network is generated with the array-based version of the model
+        (triadic_closure_fast or configuration_fast) and stored as an ArrayGraph.
+        The NetworkX version of the network is only built if graph() is called.
+
         Examples
         ----------
         Create a triadic closure network with 1000 nodes and high clustering (p=1).
@@ -125,73 +149,180 @@ class Network:
         >>> network = Network(model=triadic_closure, N=1000, t=0)
         """
         # check input values
-        models = [triadic_closure, configuration]
-        if model not in models:
-            raise ValueError("Invalid model. Expected one of: triadic_closure, configuration")
-        if not (type(N)==int and N > 0):
-            raise ValueError("Invalid N. Expected an integer greater than zero")
-        if (model==triadic_closure and not 0 <= t <= 1) or (model==configuration and not 0 <= t <= 0.2):
-            if model==triadic_closure:
-                raise ValueError("Invalid t. Expected 0 <= t <= 1")
-            elif model==configuration:
-                raise ValueError("Invalid t. Expected 0 <= t <= 0.2")
+        check_parameters(model, N, t)
 
         # if all good, create network
         self.model = model
         self.N = N
         self.t = t
-        self.G = self.model(self.t, self.N)
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().generate_state(1)[0])
+        self.cache = cache
+        self.arrays = None
+        if self.cache is not None:
+            self.cache_key = self.cache.network_key(self.model, self.N, self.t, self.seed)
+            with tracing.span('cache.load_network', N=self.N):
+                self.arrays = self.cache.load_network(self.cache_key)
+        if self.arrays is None:
+            with tracing.span('generate', model=self.model.__name__, N=self.N, t=self.t):
+                self.arrays = array_generator(self.model)(self.t, self.N, seed=self.seed)
+            if self.cache is not None:
+                self.cache.save_network(self.cache_key, self.arrays, model=self.model.__name__, N=self.N, t=self.t, seed=self.seed)
+
+    @property
+    def G(self):
+        """
+        The NetworkX graph object for the generated network (built on first use).
+        """
+        return(self.arrays.view('networkx', self._build_networkx))
+
+    def _build_networkx(self):
+        with tracing.span('convert.networkx', N=self.N):
+            return(self.arrays.to_networkx())
+
+    @property
+    def structure(self):
+        """
+        The StructuralIndex of the network (see structure.py): its sparse adjacency matrix,
+        degrees and degree moments, connected components and triangle counts, each computed
+        on first use and shared by the community detection methods and metrics.
+        """
+        return(structural_index(self.arrays))
 
     def graph(self):
         """
         Return the NetworkX graph object for the generated network.
 
         NetworkX functions can be applied to this version of the graph.
+        The NetworkX graph is built from the network's ArrayGraph the first time
+        this function is called.
         """
         return self.G
 
-    def plot(self, filename, communities=None):
+    def save(self, filename):
+        """
+        Save the network in a compact binary format, together with its parameters
+        (model, N, t and seed), so that it can be loaded again with Network.load().
+
+        Parameters
+        ----------
+        filename: the file or directory name (as a string)
+            If the filename ends in '.npz' (e.g. 'network.npz'), the network is saved as a
+            single NumPy .npz file. Otherwise (e.g. 'network'), a directory is created with
+            the raw int32 edge array (edges.npy) and the parameters (meta.json), which can be
+            loaded memory-mapped.
+        """
+        save_array_graph(filename, self.arrays, model=self.model.__name__, N=self.N, t=self.t, seed=self.seed)
+
+    @classmethod
+    def load(cls, filename, mmap=True):
+        """
+        Load a network saved with save().
+
+        Parameters
+        ----------
+        filename: the file or directory name used with save()
+        mmap: (optional) if True, edges saved in a directory are memory-mapped (read-only)
+            rather than read into memory
+
+        Examples
+        ----------
+        >>> network.save('network.npz')
+        >>> network = Network.load('network.npz')
+        """
+        arrays, meta = load_array_graph(filename, mmap)
+        models = {model.__name__: model for model in [triadic_closure, configuration]}
+        return(cls._from_arrays(models[meta['model']], meta['N'], meta['t'], meta['seed'], arrays))
+
+    @classmethod
+    def _from_arrays(cls, model, N, t, seed, arrays):
+        # creates a network object for an already generated ArrayGraph
+        network = cls.__new__(cls)
+        network.model = model
+        network.N = N
+        network.t = t
+        network.seed = seed
+        network.cache = None
+        network.arrays = arrays
+        return(network)
+
+    def layout(self, method='auto', seed=None):
+        """
+        Return the positions of the network nodes for plotting, as an (N, 2) array.
+
+        The layout is computed the first time it is requested (see layout.py) and cached
+        with the network, so plotting the network several times (e.g. with and without
+        communities) reuses the same positions.
+
+        Parameters
+        ----------
+        method: (optional) the layout algorithm
+            'auto' (the default) uses igraph's grid-based Fruchterman-Reingold layout (or
+            nx.spring_layout if igraph is not installed). The options 'fr', 'drl' (igraph's
+            DrL layout) and 'spring' choose an algorithm.
+        seed: (optional) seed for the random initial positions, for reproducible layouts
+        """
+        return(self.arrays.view('layout.{}.{}'.format(method, seed), lambda: compute_layout(self.arrays, method, seed)))
+
+    def plot(self, filename, communities=None, layout='auto', seed=None, rasterized=None):
         """
         Plot the network and save the image for viewing.
 
         If communities are given, the nodes will be colour-coded according to the community structure.
         Otherwise, all nodes are coloured black.
 
+        The edges are drawn as a single matplotlib LineCollection and the nodes as a single
+        scatter plot, and for large networks both are rasterized, so that networks with
+        millions of edges can be plotted.
+
         Parameters
         ----------
         filename: (required) a filename for the network image
             The image is saved with the given filename, so that the user can open it for viewing.
             The filename is given as a string (e.g. 'network.png').
-        communities: (optional) a list of community assignments for each node
+        communities: (optional) the community assignment of each node (as a Partition or list)
             The communities are given in the form returned by the get_communities() function.
             The network nodes are then coloured according to their community assignment.
+        layout: (optional) the layout algorithm (see layout())
+            The positions are cached, so later plots of the network reuse them.
+        seed: (optional) seed for the layout
+        rasterized: (optional) if True, the edges and nodes are rasterized (drawn as an image
+            even in vector formats such as PDF), with thinner lines and smaller nodes
+            If not given, networks with more than 10^4 nodes are rasterized.
         """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection
+        positions = self.layout(layout, seed)
+        if rasterized is None:
+            rasterized = self.N > RASTER_SIZE
         fig, ax = plt.subplots()
-        pos = nx.spring_layout(self.G)
-        nx.draw_networkx_edges(self.G, pos, alpha=0.4)
-        
-        if communities==None:
-            nx.draw_networkx_nodes(self.G, pos, node_size=5, node_color='black')
+        ax.add_collection(LineCollection(positions[np.asarray(self.arrays.edges)], colors='black', alpha=0.4,
+                                         linewidths=0.1 if rasterized else 1.0, rasterized=rasterized))
+
+        if communities is None:
+            colours = 'black'
         else:
             numcom = get_number_communities(communities)
             cm = plt.get_cmap('rainbow')
-            colour_list = [cm(1.*i/numcom) for i in range(numcom)]
-            colours = [colour_list[communities[i]-1] for i in range(self.N)]
-            nx.draw_networkx_nodes(self.G, pos, node_size=5, node_color=colours)
+            colours = cm((np.asarray(communities)[:self.N]-1)/numcom) # one RGBA row per node
+        ax.scatter(positions[:,0], positions[:,1], s=0.5 if rasterized else 5, c=colours, linewidths=0,
+                   rasterized=rasterized, zorder=2)
 
+        ax.autoscale_view()
         ax.axis('off')
         ax.figure.savefig(filename, dpi=250)
+        plt.close(fig)
         print('Network plot saved as {}'.format(filename))
 
-    def get_communities(self, method):
+    def get_communities(self, method, **kwargs):
         """
         Runs a given community detection function on the network and returns the community partition.
 
-        A community partition is a list of integers, giving the community number of each network node.
+        A community partition is a Partition (see partition.py): an int32 array giving the community
+        number of each network node, which can be used like a list of integers.
 
         For example, a return value of the form
 
-        [1, 1, 2, 3, 1, 2, 3, 3 ...]
+        Partition([1, 1, 2, 3, 1, 2, 3, 3 ...])
 
         indicates that the 1st node is in community 1, the 2nd node is in community 1, and so on.
 
@@ -200,36 +331,97 @@ class Network:
         method: the community detection method to be used (as a string)
             Options are 'modularity', 'infomap', 'spectral' and 'sbm'.
             These correspond to the four methods used in the paper.
+            The Spectral method runs natively in Python; the original MATLAB
+            version is available as 'spectral_matlab'. The 'leiden' and 'multilevel'
+            methods are faster modularity methods for large networks.
+        **kwargs: (optional) further options for the community detection method
+            For example, network.get_communities('sbm', trials=10, processes=4)
+            (see the get_*_communities functions for the options of each method).
         """
-        methods = {
-            'modularity': get_modularity_communities,
-            'infomap': get_infomap_communities,
-            'spectral': get_spectral_communities,
-            'sbm': get_sbm_communities
-        }
+        methods = community_methods()
         # check input
         if method not in list(methods.keys()):
             raise ValueError("Invalid method. Expected one of: {}".format(list(methods.keys())))
 
-        return(methods[method](self.G))
-
-    def communities_summary(self):
+        if self.cache is not None:
+            communities = self.cache.load_partition(self.cache_key, method, kwargs)
+            if communities is not None:
+                return(Partition(communities))
+        with tracing.span('detect.' + method, N=self.N):
+            communities = methods[method](self.arrays, **kwargs)
+        if self.cache is not None:
+            self.cache.save_partition(self.cache_key, method, kwargs, communities)
+        return(communities)
+
+    def communities_summary(self, parallel=False, verbose=True, trace=False):
         """
-        Runs all four community detection methods on the network and prints a summary of the
-        number of communities detected and community similarity between different methods.
+        Runs all four community detection methods on the network and returns a summary of the
+        number of communities detected, community similarity between different methods, and
+        the time and memory used by each method.
+
+        If the network has a cache, the partitions found by earlier runs are loaded from it
+        and only the remaining methods are run.
+
+        The memory reported for each method is its peak memory: the highest resident memory
+        of the process while the method ran, minus the resident memory when it started (so
+        the network itself and the results of earlier methods are not counted). On Linux the
+        process's peak is reset before each method (via /proc/self/clear_refs). Elsewhere the
+        peak can only grow, so a method that stays below the peak of an earlier method in the
+        same process reports less than it used (0 at the least).
+
+        The summary is returned as a CommunitiesSummary object, and printed if verbose is True.
 
         Note: this function may take a while to run for large networks.
+
+        Parameters
+        ----------
+        parallel: (optional) if True, the methods run concurrently in separate worker processes
+            Each worker shares the network's arrays read-only (inherited from this process
+            where possible), so the summary takes about as long as the slowest method.
+        verbose: (optional) if True, the summary is printed
+        trace: (optional) if True, the time spent in each step (conversions, eigensolves,
+            SBM trials, similarity, ...) is traced (see tracing.py) and reported in the summary
         """
+        sink = tracing.StatsSink() if trace else None
+        with tracing.tracing(*([sink] if trace else [])):
+            summary = self._summarise(parallel, sink)
+        if verbose:
+            print(summary)
+        return(summary)
+
+    def _summarise(self, parallel, sink):
         methods = ['modularity', 'infomap', 'spectral', 'sbm']
         combinations = list(itertools.combinations(methods,2))
         communities = dict()
         number_communities = dict()
         similarity = dict()
-
-        # get communities
+        timings = dict()
+
+        # get communities, loading the partitions already in the cache
+        results = dict()
+        if self.cache is not None:
+            for method in methods:
+                cached = self.cache.load_partition(self.cache_key, method, {})
+                if cached is not None:
+                    results[method] = (Partition(cached), None)
+        missing = [method for method in methods if method not in results]
+        if parallel and missing:
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+            collect = tracing.enabled() # spans recorded in the workers are passed back to this process
+            with context.Pool(len(missing), initializer=_share_graph, initargs=(self.arrays,), maxtasksperchild=1) as pool:
+                detected = pool.map(_run_shared_method, [(method, collect) for method in missing], chunksize=1)
+            for method_communities, method_timings, records in detected:
+                tracing.replay(records)
+            detected = [result[:2] for result in detected]
+        else:
+            detected = [_run_method(self.arrays, method) for method in missing]
+        for method, result in zip(missing, detected):
+            results[method] = result
+            if self.cache is not None:
+                self.cache.save_partition(self.cache_key, method, {}, result[0])
         for method in methods:
-            communities[method] = self.get_communities(method)
-            number_communities[method] = get_number_communities(communities[method]) 
+            communities[method], timings[method] = results[method]
+            number_communities[method] = get_number_communities(communities[method])
 
         # get similarity between communities
         for combination in combinations:
@@ -237,19 +429,164 @@ class Network:
             method2 = combination[1]
             similarity[combination] = get_similarity(communities[method1], communities[method2])
 
-        print('\n########################\n')
-        print('Network model: {}'.format(self.model.__name__))
-        print('Network size: {}'.format(self.N))
-        print('Clustering parameter: {}'.format(self.t))
-        print('Clustering coefficient: {:.3f}'.format(nx.transitivity(self.G)))
-        print('\n########################\n')
+        return(CommunitiesSummary(self, self.structure.transitivity(), communities, number_communities, similarity, timings, sink))
 
-        print('NUMBER OF COMMUNITIES\n')
-        for method in methods:
-            print('{}: {}'.format(method,number_communities[method]))
-        print('\n########################\n')
-        
-        print('COMMUNITY SIMILARITY (AMI)\n')
-        for combination in combinations:
-            print('{}: {:.3f}'.format(combination[0] + '-' + combination[1],similarity[combination]))
-        print('\n########################\n')
+class CommunitiesSummary:
+    """
+    Results of Network.communities_summary().
+
+    Attributes
+    ----------
+    model: the name of the network generation model
+    N: the network size
+    t: the clustering parameter
+    clustering: the (global) clustering coefficient of the network
+    methods: the community detection methods, in the order they are reported
+    communities: dictionary giving the community partition found by each method
+    number_communities: dictionary giving the number of communities found by each method
+    similarity: dictionary giving the AMI between each pair of methods (keyed by (method1, method2))
+    timings: dictionary giving, for each method, a dictionary with the wall time and CPU time
+        (in seconds) and the peak memory (in MB) used by the method, i.e. the peak resident memory
+        while it ran above the resident memory when it started (see communities_summary()),
+        or None for a partition loaded from the network's cache
+    trace: the tracing.StatsSink with the spans recorded by communities_summary(trace=True), or None
+    """
+    def __init__(self, network, clustering, communities, number_communities, similarity, timings, trace=None):
+        self.model = network.model.__name__
+        self.N = network.N
+        self.t = network.t
+        self.clustering = clustering
+        self.methods = list(communities.keys())
+        self.communities = communities
+        self.number_communities = number_communities
+        self.similarity = similarity
+        self.timings = timings
+        self.trace = trace
+
+    def __str__(self):
+        divider = '\n########################\n'
+        lines = [divider]
+        lines.append('Network model: {}'.format(self.model))
+        lines.append('Network size: {}'.format(self.N))
+        lines.append('Clustering parameter: {}'.format(self.t))
+        lines.append('Clustering coefficient: {:.3f}'.format(self.clustering))
+        lines.append(divider)
+
+        lines.append('NUMBER OF COMMUNITIES\n')
+        for method in self.methods:
+            lines.append('{}: {}'.format(method,self.number_communities[method]))
+        lines.append(divider)
+
+        lines.append('COMMUNITY SIMILARITY (AMI)\n')
+        for combination in self.similarity:
+            lines.append('{}: {:.3f}'.format(combination[0] + '-' + combination[1],self.similarity[combination]))
+        lines.append(divider)
+
+        lines.append('TIMINGS (wall time, CPU time, peak memory)\n')
+        for method in self.methods:
+            timing = self.timings[method]
+            if timing is None:
+                lines.append('{}: cached'.format(method))
+                continue
+            lines.append('{}: {:.2f}s, {:.2f}s, {:.0f}MB'.format(method,timing['wall_time'],timing['cpu_time'],timing['peak_memory']))
+        lines.append(divider)
+
+        if self.trace is not None:
+            lines.append('TRACE\n')
+            lines.append(str(self.trace))
+            lines.append(divider)
+        return('\n'.join(lines))
+
+    def __repr__(self):
+        return('CommunitiesSummary(model={}, N={}, t={})'.format(self.model, self.N, self.t))
+
+def check_parameters(model, N, t):
+    """
+    Raises ValueError if the given network parameters are not accepted by Network().
+
+    Parameters
+    ----------
+    model : network generation model (triadic_closure or configuration)
+    N : network size
+    t : clustering parameter
+    """
+    models = [triadic_closure, configuration]
+    if model not in models:
+        raise ValueError("Invalid model. Expected one of: triadic_closure, configuration")
+    if not (type(N)==int and N > 0):
+        raise ValueError("Invalid N. Expected an integer greater than zero")
+    if (model==triadic_closure and not 0 <= t <= 1) or (model==configuration and not 0 <= t <= 0.2):
+        if model==triadic_closure:
+            raise ValueError("Invalid t. Expected 0 <= t <= 1")
+        elif model==configuration:
+            raise ValueError("Invalid t. Expected 0 <= t <= 0.2")
+
+def community_methods():
+    """
+    Returns a dictionary giving the community detection function for each method name
+    accepted by Network.get_communities().
+    """
+    return({
+        'modularity': get_modularity_communities,
+        'leiden': get_leiden_communities,
+        'multilevel': get_multilevel_communities,
+        'infomap': get_infomap_communities,
+        'spectral': get_spectral_communities,
+        'sbm': get_sbm_communities,
+        'spectral_matlab': get_spectral_matlab_communities
+    })
+
+def _run_method(graph, method):
+    # runs one community detection method and returns (communities, timings)
+    memory_start = _reset_peak_memory()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    with tracing.span('detect.' + method, N=graph.N):
+        communities = community_methods()[method](graph)
+    timings = {
+        'wall_time': time.perf_counter() - wall_start,
+        'cpu_time': time.process_time() - cpu_start,
+        'peak_memory': max(_peak_memory() - memory_start, 0.0)
+    }
+    return((communities, timings))
+
+_shared_graph = None # the network shared with worker processes by communities_summary(parallel=True)
+
+def _share_graph(graph):
+    global _shared_graph
+    _shared_graph = graph
+
+def _run_shared_method(task):
+    # returns (communities, timings, spans) for one method, with the spans recorded if collect is True
+    method, collect = task
+    if not collect:
+        return(_run_method(_shared_graph, method) + ([],))
+    with tracing.tracing(tracing.StatsSink()) as sink:
+        result = _run_method(_shared_graph, method)
+    return(result + (sink.records(),))
+
+def _reset_peak_memory():
+    # resets the peak resident memory of this process to its current resident memory where
+    # possible (Linux), and returns the peak (in MB) from which the next method is measured
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+    return(_peak_memory())
+
+def _peak_memory():
+    # peak resident memory of this process in MB (since the last reset on Linux)
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return(int(line.split()[1])/1024)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError: # not available on Windows
+        return(float('nan'))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(peak/1024**2 if sys.platform == 'darwin' else peak/1024)
@@ -11,6 +11,8 @@ import random as rand
 from random import randint
 import numpy as np
 import math
+import json
+from array_graph import ArrayGraph, canonical_edges
 
 def triadic_closure(p,N):
     """
@@ -62,6 +64,266 @@ def triadic_closure(p,N):
 
     return(G)
 
+def array_generator(model):
+    """
+    Returns the array-based generator function for a given network generation model,
+    i.e. triadic_closure_fast for triadic_closure and configuration_fast for configuration.
+
+    Parameters
+    ----------
+    model : network generation model (triadic_closure or configuration)
+    """
+    generators = {
+        triadic_closure: triadic_closure_fast,
+        configuration: configuration_fast
+    }
+    return(generators[model])
+
+def triadic_closure_fast(p, N, seed=None):
+    """
+    Array-based generator function for triadic closure model networks.
+
+    Generates networks from the same model as triadic_closure(), but stores the
+    network as flat arrays rather than a growing NetworkX graph, so that each new
+    node costs O(m) instead of O(N). Links to random nodes are chosen by rejection
+    sampling and all other random numbers are drawn in batches from a
+    numpy.random.Generator.
+
+    Returns an ArrayGraph (use its to_networkx() method if a NetworkX graph is required).
+    The network is the snapshot of size N of TriadicClosureGrowth(p, seed), so it is
+    also the first N nodes of any larger network generated with the same seed.
+
+    Parameters
+    ----------
+    p : the probability of triadic closure
+    N : the network size
+    seed : (optional) seed for numpy.random.default_rng, for reproducible networks
+    """
+    return(TriadicClosureGrowth(p, seed=seed).grow(N))
+
+class TriadicClosureGrowth:
+    """
+    Incremental growth of a triadic closure model network.
+
+    The triadic closure model is a growth process, so the first n nodes of a network
+    of size N form a network of size n generated by the same model. This class runs
+    a single growth process and returns snapshots of it at any requested size,
+    so that networks of several sizes (e.g. for finite-size scaling) are generated
+    in one pass rather than each from scratch. The growth state can be saved and
+    resumed later to reach larger sizes.
+
+    Each new node adds m edges to the end of the edge array, so a snapshot of size n
+    is an ArrayGraph whose edges are a view of the first m0 + m*(n-n0) rows (where the
+    seed network has n0 nodes and m0 edges), and no edges are copied.
+
+    Random numbers are drawn in blocks of a fixed size (BLOCK_SIZE time steps),
+    so the network does not depend on the sizes at which snapshots are taken or the
+    growth is saved: for a given p and seed, the snapshot of size n is always the
+    network triadic_closure_fast(p, n, seed).
+
+    Parameters
+    ----------
+    p : the probability of triadic closure
+    seed : (optional) seed for numpy.random.default_rng, for reproducible networks
+
+    Examples
+    ----------
+    >>> growth = TriadicClosureGrowth(p=0.5, seed=1)
+    >>> for G in growth.snapshots([10**3, 10**4, 10**5, 10**6]):
+    ...     print(G.number_of_nodes(), G.number_of_edges())
+    >>> growth.save('growth.npz')
+
+    Later, resume the same growth process to a larger size.
+
+    >>> growth = TriadicClosureGrowth.load('growth.npz')
+    >>> G = growth.grow(10**7)
+    """
+    BLOCK_SIZE = 2**16 # number of time steps per block of random numbers
+
+    def __init__(self, p, seed=None):
+        self.p = float(p)
+        self.m = 2 # can be changed, but we always use this value in the paper
+        self.rng = np.random.default_rng(seed)
+
+        # start with a small connected network of n0 >= m nodes and m0 >= m links
+        n0 = 1
+        while not(2*self.m <= n0*(n0-1) and n0 >= self.m): n0 = n0 + 1
+        seed_edges = np.asarray(_seed_network(n0, 0.3, self.m, self.rng), dtype=np.int32).reshape(-1,2)
+        self.n0 = n0
+        self.m0 = len(seed_edges)
+        self.n = n0
+        self._edges = seed_edges
+        self._adj = [[] for i in range(n0)]
+        self._block = None
+        self._position = 0
+        self._add_adjacency(seed_edges)
+
+    def number_of_nodes(self):
+        """
+        Return the number of nodes grown so far.
+        """
+        return(self.n)
+
+    def snapshot(self, N=None):
+        """
+        Returns the network of size N (by default, the current size) as an ArrayGraph,
+        whose edge array is a view of the growth's edge array.
+
+        Parameters
+        ----------
+        N : (optional) the network size, at most the current size
+        """
+        N = self.n if N is None else max(int(N), self.n0) # sizes may be NumPy integers
+        if N > self.n:
+            raise ValueError("Invalid N. Expected at most the current size {} (use grow() for larger networks)".format(self.n))
+        return(ArrayGraph(N, self._edges[:self.m0 + self.m*(N-self.n0)]))
+
+    def grow(self, N):
+        """
+        Grows the network (if necessary) until it has N nodes, and returns the snapshot of size N.
+
+        Parameters
+        ----------
+        N : the network size
+        """
+        N = max(int(N), self.n0) # sizes may be NumPy integers
+        if N <= self.n:
+            return(self.snapshot(N))
+        self._reserve(self.m0 + self.m*(N-self.n0))
+        while self.n < N:
+            if self._block is None or self._position == self.BLOCK_SIZE:
+                self._draw_block()
+            steps = min(N - self.n, self.BLOCK_SIZE - self._position)
+            targets = self._step(steps)
+            first = self.m0 + self.m*(self.n-self.n0)
+            self._edges[first:first + self.m*steps, 0] = targets
+            self._edges[first:first + self.m*steps, 1] = np.repeat(np.arange(self.n, self.n + steps), self.m)
+            self.n += steps
+            self._position += steps
+        return(self.snapshot(N))
+
+    def snapshots(self, sizes):
+        """
+        Grows the network through the given sizes (in increasing order), yielding
+        the snapshot at each size.
+
+        Parameters
+        ----------
+        sizes : list of network sizes
+        """
+        for N in sorted(sizes):
+            yield self.grow(N)
+
+    def save(self, filename):
+        """
+        Saves the growth state (the network so far, the random number generator and
+        the current block of random numbers) to a .npz file, to be resumed with load().
+
+        Parameters
+        ----------
+        filename : the file name (e.g. 'growth.npz')
+        """
+        state = {'p': self.p, 'm': self.m, 'n0': self.n0, 'm0': self.m0, 'n': self.n,
+                 'position': self._position, 'rng': self.rng.bit_generator.state}
+        block = self._block if self._block is not None else np.empty((0, 2*self.m-1))
+        np.savez(filename, edges=self.snapshot().edges, block=block, state=np.array(json.dumps(state)))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Returns the growth process saved in a .npz file by save().
+
+        Parameters
+        ----------
+        filename : the file name
+        """
+        with np.load(filename) as data:
+            state = json.loads(str(data['state']))
+            growth = cls.__new__(cls)
+            growth.p, growth.m, growth.n0, growth.m0, growth.n = [state[key] for key in ['p', 'm', 'n0', 'm0', 'n']]
+            growth.rng = np.random.default_rng()
+            growth.rng.bit_generator.state = state['rng']
+            growth._edges = data['edges'].astype(np.int32)
+            growth._block = data['block'] if len(data['block']) else None
+            growth._position = state['position']
+        # the adjacency lists are rebuilt in the order the edges were added
+        growth._adj = [[] for i in range(growth.n)]
+        growth._add_adjacency(growth._edges)
+        return(growth)
+
+    def _add_adjacency(self, edges):
+        adj = self._adj
+        for u, v in edges.tolist():
+            adj[u].append(v)
+            adj[v].append(u)
+
+    def _reserve(self, E):
+        # enlarge the edge array (keeping the edges so far) to hold E edges
+        if len(self._edges) < E:
+            edges = np.empty((E, 2), dtype=np.int32)
+            edges[:len(self._edges)] = self._edges
+            self._edges = edges
+        self._adj.extend([] for i in range(len(self._adj), self.n0 + (E-self.m0)//self.m))
+
+    def _draw_block(self):
+        # uniform random numbers for the next BLOCK_SIZE time steps: the first link,
+        # then the closure choice and the link for each of the remaining m-1 links
+        self._block = self.rng.random((self.BLOCK_SIZE, 2*self.m-1))
+        self._position = 0
+
+    def _step(self, steps):
+        # adds the next steps nodes, returning their link targets as a flat list
+        m, p, adj, rng = self.m, self.p, self._adj, self.rng
+        block = self._block[self._position:self._position + steps].tolist()
+        targets = []
+        # at each time step a new node is added to the network with m links
+        for step in range(steps):
+            new_node = self.n + step
+            draws = block[step]
+            node_neighbours = [int(draws[0]*new_node)] # attach the first of the m links to a random node of the network
+            for j in range(1,m):
+                if j == 1:
+                    link_neighbours = adj[node_neighbours[0]] # new_node is not yet in the adjacency lists
+                else:
+                    link_neighbours = list(set().union(*[adj[i] for i in node_neighbours]).difference(node_neighbours))
+                u = draws[2*j]
+                # with probability p, attach the jth link to a node chosen randomly among the existing neighbours of the new node
+                if draws[2*j-1] < p and link_neighbours:
+                    linkj = link_neighbours[int(u*len(link_neighbours))]
+                # with probability 1-p, attach the jth link to a random node in the network (not already linked)
+                else:
+                    linkj = int(u*new_node)
+                    while linkj in node_neighbours: linkj = int(rng.integers(new_node))
+                node_neighbours.append(linkj)
+            for i in node_neighbours:
+                adj[i].append(new_node)
+            adj[new_node] = node_neighbours
+            targets.extend(node_neighbours)
+        return(targets)
+
+def _seed_network(n0, p0, m, rng):
+    """
+    Returns the edges of a connected G(n0,p0) random network with at least m edges,
+    as used to start the triadic closure model.
+
+    Parameters
+    ----------
+    n0 : the number of nodes
+    p0 : the probability of each edge
+    m : the minimum number of edges
+    rng : a numpy.random.Generator
+    """
+    pairs = [(u, v) for u in range(n0) for v in range(u+1, n0)]
+    while True:
+        edges = [pair for pair in pairs if rng.random() < p0]
+        # check connectivity by merging the components of each edge
+        component = list(range(n0))
+        for u, v in edges:
+            cu, cv = component[u], component[v]
+            component = [cu if c == cv else c for c in component]
+        if len(edges) >= m and len(set(component)) == 1:
+            return(edges)
+
 def configuration(c,N):
     """
     Generator function for configuration model networks.
@@ -114,13 +376,69 @@ def configuration(c,N):
     # create network
     joint_degrees = zip(s,t)
     G = nx.random_clustered_graph(joint_degrees)
-    G = nx.Graph(G) # remove parallel edges
-    G.remove_edges_from(G.selfloop_edges()) # remove self loops
     #G = max(nx.connected_component_subgraphs(G), key=len) # if using largest connected component
-    G = fix_graph(G)
+    G = fix_graph(G) # also removes parallel edges and self loops
 
     return(G)
 
+def configuration_fast(c, N, seed=None):
+    """
+    Array-based generator function for configuration model networks.
+
+    Generates networks from the same model as configuration(), but samples the
+    joint degree sequence and pairs the stubs with NumPy array operations rather
+    than a probability table and nx.random_clustered_graph, so that networks with
+    millions of nodes can be generated.
+
+    Returns an ArrayGraph (use its to_networkx() method if a NetworkX graph is required).
+
+    Parameters
+    ----------
+    c: the (global) clustering coefficient
+    N : the network size
+    seed : (optional) seed for numpy.random.default_rng, for reproducible networks
+    """
+    rng = np.random.default_rng(seed)
+
+    # sample joint degree sequence (s,t) from doubly Poisson distribution,
+    # where t = number of triangles and s = number of independent links
+    k = 4 # the average degree used in all trials
+    s_avg = k*(c*k+c-1)/(c-1)
+    t_avg = -c*(k**2)/(2*(c-1))
+    s = rng.poisson(s_avg, N)
+    t = rng.poisson(t_avg, N)
+
+    # ensure conditions for multiples of 2 and 3 are met
+    _reduce_to_multiple(s, 2, rng)
+    _reduce_to_multiple(t, 3, rng)
+
+    # pair independent link stubs and triangle stubs with random permutations
+    istubs = rng.permutation(np.repeat(np.arange(N), s)).reshape(-1,2)
+    tstubs = rng.permutation(np.repeat(np.arange(N), t)).reshape(-1,3)
+    src = np.concatenate([istubs[:,0], tstubs[:,0], tstubs[:,1], tstubs[:,0]])
+    dst = np.concatenate([istubs[:,1], tstubs[:,1], tstubs[:,2], tstubs[:,2]])
+
+    # remove parallel edges and self loops
+    return(ArrayGraph(N, canonical_edges(src, dst, N)))
+
+def _reduce_to_multiple(degrees, multiple, rng):
+    """
+    Decrements randomly chosen nonzero entries of the degree sequence (in place)
+    until its sum is divisible by the given multiple.
+
+    Parameters
+    ----------
+    degrees : integer array of degrees
+    multiple : the required divisor of sum(degrees)
+    rng : a numpy.random.Generator
+    """
+    excess = int(degrees.sum() % multiple)
+    while excess:
+        nonzero = np.flatnonzero(degrees)
+        nodes = rng.choice(nonzero, min(excess, len(nonzero)), replace=False)
+        degrees[nodes] -= 1
+        excess -= len(nodes)
+
 def fix_graph(G):
     """
     Fixes a given network so that node labels are numbered consecutively.
@@ -128,15 +446,13 @@ def fix_graph(G):
     If nodes are not labelled consecutively, issues can arise when converting between
     the different network formats.
 
+    Nodes are relabelled in linear time with relabel_edges(), and any parallel edges
+    and self loops are removed (so G may be a multigraph).
+    To relabel without building a new NetworkX graph, use relabel_edges() or
+    ArrayGraph.from_networkx() instead.
+
     Parameters
     ----------
     G : NetworkX-formatted network
     """
-    gfix = nx.Graph()
-    edges = G.edges()
-    nodes = list(G.nodes())
-    num_nodes = len(nodes)
-    gfix.add_nodes_from(range(num_nodes))
-    for edge in edges:
-        gfix.add_edge(nodes.index(edge[0]), nodes.index(edge[1]))
-    return(gfix)
+    return(ArrayGraph.from_networkx(G).to_networkx())
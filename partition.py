@@ -0,0 +1,151 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Community partitions backed by NumPy arrays.
+
+A Partition stores the community of each node as an int32 array, with communities
+numbered from 1 as in the list format used throughout the code. It can be used
+wherever a list of community assignments was used before (indexing, iteration, len),
+and is passed to NumPy functions without copying (np.asarray(partition) returns the
+underlying array), so partitions of networks with millions of nodes are never
+converted to Python lists.
+"""
+import numpy as np
+
+class Partition:
+    """
+    A community partition, i.e. the community assignment of each node.
+
+    Parameters
+    ----------
+    labels : a list or integer array giving the community of each node
+        An int32 array is used directly, without copying.
+
+    Attributes
+    ----------
+    labels : int32 array giving the community of each node
+
+    Examples
+    ----------
+    >>> partition = Partition([3, 3, 7, 1])
+    >>> partition.relabel()
+    Partition([1, 1, 2, 3], N=4, communities=3)
+    >>> partition.relabel().sizes()
+    array([2, 1, 1])
+    """
+    def __init__(self, labels):
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+
+    @classmethod
+    def from_igraph(cls, clustering):
+        """
+        Returns the partition given by an igraph clustering (e.g. the result of
+        community_leiden()), with communities numbered from 1.
+
+        Parameters
+        ----------
+        clustering : an igraph VertexClustering
+        """
+        labels = np.array(clustering.membership, dtype=np.int32)
+        labels += 1
+        return(cls(labels))
+
+    @classmethod
+    def from_gt(cls, blocks):
+        """
+        Returns the partition given by graph-tool block labels, relabelled canonically
+        (graph-tool block labels are not necessarily consecutive).
+
+        Parameters
+        ----------
+        blocks : a graph-tool BlockState or vertex property map of block labels
+        """
+        if hasattr(blocks, 'get_blocks'):
+            blocks = blocks.get_blocks()
+        return(cls(blocks.a).relabel())
+
+    def __len__(self):
+        return(len(self.labels))
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return(int(self.labels[index]))
+        return(self.labels[index])
+
+    def __iter__(self):
+        return(iter(self.labels.tolist()))
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.labels.dtype:
+            return(self.labels.copy() if copy else self.labels)
+        return(self.labels.astype(dtype))
+
+    def __eq__(self, other):
+        if other is None:
+            return(False)
+        other = np.asarray(other)
+        return(other.shape == self.labels.shape and bool(np.all(self.labels == other)))
+
+    __hash__ = None
+
+    def tolist(self):
+        """
+        Returns the partition as a list of community assignments.
+        """
+        return(self.labels.tolist())
+
+    def number_of_communities(self):
+        """
+        Returns the number of communities (the largest community label).
+        """
+        return(int(self.labels.max()) if len(self.labels) else 0)
+
+    def sizes(self):
+        """
+        Returns an integer array giving the number of nodes in communities 1, 2, ..., K.
+        """
+        return(np.bincount(self.labels, minlength=self.number_of_communities()+1)[1:])
+
+    def relabel(self):
+        """
+        Returns the canonical form of the partition, with the communities numbered
+        1, 2, ..., K in the order of their first node. Two partitions that only differ
+        in the numbering of their communities have the same canonical form.
+        """
+        labels = consecutive_labels(self.labels)
+        N, K = len(labels), int(labels.max())+1 if len(labels) else 0
+        first = np.full(K, N, dtype=np.int64)
+        np.minimum.at(first, labels, np.arange(N, dtype=np.int64)) # first node of each community
+        rank = np.empty(K, dtype=np.int32)
+        rank[np.argsort(first)] = np.arange(1, K+1, dtype=np.int32)
+        return(Partition(rank[labels]))
+
+    def __repr__(self):
+        return('Partition({}, N={}, communities={})'.format(
+            np.array2string(self.labels, separator=', ', threshold=20, edgeitems=5), len(self), self.number_of_communities()))
+
+def consecutive_labels(labels):
+    """
+    Returns an int32 array with the given labels renumbered 0, 1, ..., K-1 in increasing
+    order of the original labels.
+
+    If the labels are integers whose range is at most a few times the number of labels,
+    this takes linear time with np.bincount (otherwise the labels are sorted with np.unique).
+
+    Parameters
+    ----------
+    labels : array of labels
+    """
+    labels = np.asarray(labels).ravel()
+    if len(labels) == 0:
+        return(np.zeros(0, dtype=np.int32))
+    if not np.issubdtype(labels.dtype, np.integer):
+        # e.g. float labels such as 1.0, 2.0 (or 0.5), which np.bincount does not accept
+        return(np.unique(labels, return_inverse=True)[1].ravel().astype(np.int32))
+    low, high = int(labels.min()), int(labels.max())
+    if high - low <= 4*len(labels) + 1024:
+        shifted = labels - low
+        rank = np.cumsum(np.bincount(shifted, minlength=high-low+1) > 0, dtype=np.int32) - 1
+        return(rank[shifted])
+    return(np.unique(labels, return_inverse=True)[1].ravel().astype(np.int32))
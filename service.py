@@ -0,0 +1,472 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+A long-lived local community detection service.
+
+Starting MATLAB, importing graph-tool and converting a network to each backend's
+format can take longer than the community detection itself for small networks. The
+service is a long-lived process whose workers keep the backends loaded (and the MATLAB
+engine running), and many short scripts, notebooks or CI jobs send it their networks over
+a Unix socket (or a localhost TCP port) instead of each paying the start-up cost.
+
+Jobs are queued separately for each backend, in order of priority (higher first,
+then in order of arrival), and each backend runs at most a given number of jobs at
+once (e.g. one for the MATLAB engine). Each backend has its own pool of worker
+processes (one per concurrent job) that keep the backend loaded, so the random
+number generator seeds and OpenMP settings that the methods set for the whole
+process are never shared by two running jobs, and a job with a given seed gives the
+same result however many jobs run at once. The workers are started with the
+'forkserver' (or 'spawn') method rather than forked from the multithreaded service.
+Each worker keeps its recently used networks, so the igraph and graph-tool versions
+of a network sent again are reused.
+
+Messages in both directions are a 4-byte (big-endian) header length, a JSON header,
+and a binary payload whose length is given by the header's 'payload' entry: for
+networks, an int32 (little-endian) edge array of shape (E, 2), and for partitions,
+int32 community labels. A client can send several requests on one connection, and
+the responses (tagged with the request 'id') are returned as the jobs finish.
+
+Usage:
+    python service.py --socket /tmp/mmm.sock --warm igraph graph_tool matlab
+
+Examples
+----------
+>>> with Client('/tmp/mmm.sock') as client:
+...     communities = client.get_communities(network, 'sbm', priority=1, trials=10)
+...     ami = client.get_similarity(communities, client.get_communities(network, 'spectral'))
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import numpy as np
+from array_graph import ArrayGraph, as_array_graph
+from partition import Partition
+from backends import BACKENDS, METHOD_BACKENDS, load, is_available, matlab_engine
+import tracing
+
+HEADER = struct.Struct('>I') # length of the JSON header
+DEFAULT_LIMITS = {'igraph': 4, 'graph_tool': 2, 'scipy': 2, 'infomap': 2, 'matlab': 1, 'numpy': 4} # concurrent jobs per backend
+GRAPHS = 16 # number of recently used networks kept by each worker process
+
+class DetectionService:
+    """
+    Community detection service that runs get_communities() and get_similarity()
+    jobs for clients, with warm backends.
+
+    Parameters
+    ----------
+    limits : (optional) dictionary giving the maximum number of concurrent jobs for
+        each backend (e.g. {'matlab': 1, 'graph_tool': 4}), updating DEFAULT_LIMITS
+        Similarity jobs count towards the 'numpy' limit.
+    warm : backends loaded when the service starts (e.g. ['igraph', 'graph_tool', 'matlab'];
+        'matlab' also starts the MATLAB engine)
+        The worker processes of the other backends are started by their first job.
+    graphs : the number of recently used networks kept (with their converted versions)
+        by each worker process
+    """
+    def __init__(self, limits=None, warm=(), graphs=GRAPHS):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.warm = list(warm)
+        self.graphs = graphs
+        self.counts = {'submitted': 0, 'finished': 0, 'failed': 0}
+        self._queues = dict()
+        self._running = {backend: 0 for backend in self.limits}
+        self._sequence = itertools.count()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._executors = {backend: concurrent.futures.ProcessPoolExecutor(max_workers=limit, mp_context=context,
+                                                                             initializer=_start_worker, initargs=(backend, graphs))
+                           for backend, limit in self.limits.items()}
+        self._consumers = []
+        self._server = None
+
+    async def start(self, path=None, host='127.0.0.1', port=None):
+        """
+        Loads the warm backends and starts listening on a Unix socket (if path is given)
+        or a TCP port on host.
+
+        Parameters
+        ----------
+        path : (optional) the Unix socket file name
+        host : the host name for TCP connections (localhost by default)
+        port : (optional) the TCP port
+        """
+        loop = asyncio.get_running_loop()
+        for backend in self.warm:
+            if backend in self._executors:
+                await loop.run_in_executor(self._executors[backend], _ready) # starts a worker, which loads the backend
+        for backend, limit in self.limits.items():
+            self._queues[backend] = asyncio.PriorityQueue()
+            self._consumers += [asyncio.ensure_future(self._consume(backend)) for i in range(limit)]
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path) # left behind by a previous service
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        return(self)
+
+    async def serve_forever(self):
+        """
+        Serves clients until the service is cancelled.
+        """
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stops taking jobs from the queues and shuts down the worker processes.
+        """
+        for consumer in self._consumers:
+            consumer.cancel()
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self):
+        """
+        Returns a dictionary with the number of queued and running jobs for each backend
+        and the number of submitted, finished and failed jobs.
+        """
+        return({'queued': {backend: queue.qsize() for backend, queue in self._queues.items()},
+                'running': dict(self._running), 'jobs': dict(self.counts)})
+
+    async def _handle(self, reader, writer):
+        # reads the requests of one client connection and starts a task for each
+        lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                try:
+                    header, payload = await _read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                task = asyncio.ensure_future(self._respond(header, payload, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for task in pending:
+                task.cancel() # the client has gone, so its queued jobs are dropped
+            writer.close()
+
+    async def _respond(self, header, payload, writer, lock):
+        # runs one request and writes its response
+        response, result = {'id': header.get('id')}, b''
+        try:
+            operation = header.get('op')
+            if operation == 'status':
+                response['status'] = self.status()
+            elif operation == 'communities':
+                labels = await self._submit(header, self._communities_job(header, payload))
+                result = labels.astype('<i4').tobytes()
+            elif operation == 'similarity':
+                N = header['N']
+                labels = np.frombuffer(payload, dtype='<i4')
+                response['ami'] = await self._submit(header, functools.partial(_similarity, labels[:N], labels[N:]), backend='numpy')
+            else:
+                raise ValueError("Invalid operation. Expected one of: ['communities', 'similarity', 'status']")
+            response['ok'] = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            response['ok'] = False
+            response['error'] = '{}: {}'.format(type(error).__name__, error)
+        async with lock:
+            writer.write(_encode_message(response, result))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    def _communities_job(self, header, payload):
+        # returns a function that runs get_communities() for the network in the request in a worker process
+        method = header.get('method')
+        if method not in METHOD_BACKENDS:
+            raise ValueError("Invalid method. Expected one of: {}".format(list(METHOD_BACKENDS.keys())))
+        header['backend'] = METHOD_BACKENDS[method][0]
+        return(functools.partial(_communities, method, header['N'], payload, header.get('options', dict())))
+
+    async def _submit(self, header, job, backend=None):
+        # queues a job for its backend and waits for the result
+        backend = backend or header['backend']
+        future = asyncio.get_running_loop().create_future()
+        self.counts['submitted'] += 1
+        await self._queues[backend].put((-header.get('priority', 0), next(self._sequence), job, future))
+        return(await future)
+
+    async def _consume(self, backend):
+        # runs the jobs queued for a backend, one at a time
+        loop = asyncio.get_running_loop()
+        queue = self._queues[backend]
+        while True:
+            priority, sequence, job, future = await queue.get()
+            if future.cancelled():
+                continue
+            self._running[backend] += 1
+            try:
+                result = await loop.run_in_executor(self._executors[backend], job)
+            except Exception as error:
+                self.counts['failed'] += 1
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                self.counts['finished'] += 1
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self._running[backend] -= 1
+
+_graphs = collections.OrderedDict() # network digest: ArrayGraph, for the networks recently used by a worker process
+_graph_limit = GRAPHS
+
+def _start_worker(backend, graphs):
+    # initialises a worker process: loads its backend (and starts the MATLAB engine), if it is installed
+    global _graph_limit
+    _graph_limit = graphs
+    if backend in BACKENDS and is_available(backend):
+        load(backend)
+        if backend == 'matlab':
+            matlab_engine()
+
+def _ready():
+    return(True)
+
+def _graph(N, payload):
+    # returns the ArrayGraph for an edge array, reusing a recently used network with the same edges
+    digest = hashlib.blake2b(payload, digest_size=16, key=str(N).encode()).hexdigest()
+    if digest in _graphs:
+        _graphs.move_to_end(digest)
+    else:
+        _graphs[digest] = ArrayGraph(N, np.frombuffer(payload, dtype='<i4').reshape(-1,2))
+        while len(_graphs) > _graph_limit:
+            _graphs.popitem(last=False)
+    return(_graphs[digest])
+
+def _communities(method, N, payload, options):
+    # runs get_communities() for a network in a worker process
+    from network import community_methods
+    graph = _graph(N, payload)
+    with tracing.span('service.' + method, N=N):
+        return(np.asarray(community_methods()[method](graph, **options), dtype=np.int32))
+
+def _similarity(labels1, labels2):
+    from community_detection import get_similarity
+    return(get_similarity(labels1, labels2))
+
+def run_service(path=None, host='127.0.0.1', port=None, limits=None, warm=()):
+    """
+    Runs the community detection service until it is interrupted.
+
+    Parameters
+    ----------
+    path : (optional) the Unix socket file name
+    host : the host name for TCP connections (localhost by default)
+    port : (optional) the TCP port (used if path is not given)
+    limits : (optional) dictionary giving the maximum number of concurrent jobs for each backend
+    warm : backends loaded when the service starts
+    """
+    async def main():
+        service = await DetectionService(limits, warm).start(path, host, port)
+        print('Community detection service listening on {}'.format(path or '{}:{}'.format(host, port)))
+        await service.serve_forever()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+async def _read_message(reader):
+    size = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+    header = json.loads(await reader.readexactly(size))
+    payload = await reader.readexactly(header.get('payload', 0))
+    return((header, payload))
+
+def _encode_message(header, payload=b''):
+    data = json.dumps(dict(header, payload=len(payload))).encode()
+    return(HEADER.pack(len(data)) + data + payload)
+
+def _communities_request(G, method, priority, options):
+    # returns the (header, payload) of a get_communities request for a network
+    G = as_array_graph(getattr(G, 'arrays', G)) # a Network stores its ArrayGraph as network.arrays
+    header = {'op': 'communities', 'method': method, 'N': G.N, 'priority': priority, 'options': options}
+    return((header, np.ascontiguousarray(G.edges, dtype='<i4').tobytes()))
+
+def _similarity_request(communities1, communities2, priority):
+    labels1 = np.asarray(communities1, dtype='<i4')
+    labels2 = np.asarray(communities2, dtype='<i4')
+    header = {'op': 'similarity', 'N': len(labels1), 'priority': priority}
+    return((header, labels1.tobytes() + labels2.tobytes()))
+
+def _result(header, payload):
+    # returns the result of a response, or raises the job's error
+    if not header['ok']:
+        raise RuntimeError(header['error'])
+    if 'ami' in header:
+        return(header['ami'])
+    if 'status' in header:
+        return(header['status'])
+    return(Partition(np.frombuffer(payload, dtype='<i4')))
+
+class Client:
+    """
+    Blocking client for the community detection service, which sends one request
+    at a time (see AsyncClient to run several jobs at once).
+
+    Parameters
+    ----------
+    path : (optional) the Unix socket file name of the service
+    host : the host name of the service (for TCP connections)
+    port : (optional) the TCP port of the service (used if path is not given)
+    """
+    def __init__(self, path=None, host='127.0.0.1', port=None):
+        if path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+        self._ids = itertools.count()
+
+    def get_communities(self, G, method, priority=0, **options):
+        """
+        Runs a community detection method on a network in the service and returns the Partition.
+
+        Parameters
+        ----------
+        G : Network, ArrayGraph or NetworkX-formatted network
+        method : the community detection method (as accepted by Network.get_communities)
+        priority : the priority of the job (jobs with a higher priority run first)
+        options : further options for the method (JSON serialisable values)
+        """
+        return(self._request(*_communities_request(G, method, priority, options)))
+
+    def get_similarity(self, communities1, communities2, priority=0):
+        """
+        Returns the AMI between two community partitions, computed in the service.
+        """
+        return(self._request(*_similarity_request(communities1, communities2, priority)))
+
+    def status(self):
+        """
+        Returns the status of the service (see DetectionService.status()).
+        """
+        return(self._request({'op': 'status'}, b''))
+
+    def _request(self, header, payload):
+        self._socket.sendall(_encode_message(dict(header, id=next(self._ids)), payload))
+        size = HEADER.unpack(self._receive(HEADER.size))[0]
+        response = json.loads(self._receive(size))
+        return(_result(response, self._receive(response['payload'])))
+
+    def _receive(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._socket.recv(min(size - len(data), 2**20))
+            if not chunk:
+                raise ConnectionError('The community detection service closed the connection')
+            data += chunk
+        return(bytes(data))
+
+    def close(self):
+        self._socket.close()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exception):
+        self.close()
+        return(False)
+
+class AsyncClient:
+    """
+    asyncio client for the community detection service, which can have many jobs
+    running at once on one connection (create it with await AsyncClient.connect()).
+
+    Examples
+    ----------
+    >>> client = await AsyncClient.connect('/tmp/mmm.sock')
+    >>> partitions = await asyncio.gather(*[client.get_communities(network, 'sbm') for network in networks])
+    >>> await client.close()
+    """
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._futures = dict()
+        self._listener = asyncio.ensure_future(self._listen())
+
+    @classmethod
+    async def connect(cls, path=None, host='127.0.0.1', port=None):
+        """
+        Connects to the service on a Unix socket (if path is given) or a TCP port.
+        """
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return(cls(reader, writer))
+
+    async def get_communities(self, G, method, priority=0, **options):
+        """
+        Runs a community detection method on a network in the service and returns the
+        Partition (see Client.get_communities()).
+        """
+        return(await self._request(*_communities_request(G, method, priority, options)))
+
+    async def get_similarity(self, communities1, communities2, priority=0):
+        """
+        Returns the AMI between two community partitions, computed in the service.
+        """
+        return(await self._request(*_similarity_request(communities1, communities2, priority)))
+
+    async def status(self):
+        """
+        Returns the status of the service (see DetectionService.status()).
+        """
+        return(await self._request({'op': 'status'}, b''))
+
+    async def _request(self, header, payload):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._futures[request_id] = future
+        self._writer.write(_encode_message(dict(header, id=request_id), payload))
+        await self._writer.drain()
+        return(_result(*(await future)))
+
+    async def _listen(self):
+        # passes each response to the future of its request
+        try:
+            while True:
+                header, payload = await _read_message(self._reader)
+                future = self._futures.pop(header['id'], None)
+                if future is not None and not future.cancelled():
+                    future.set_result((header, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('The community detection service closed the connection'))
+
+    async def close(self):
+        self._listener.cancel()
+        self._writer.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the community detection service.')
+    parser.add_argument('--socket', help='Unix socket file name')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port (used if --socket is not given)')
+    parser.add_argument('--warm', nargs='*', default=['igraph', 'graph_tool'], help='backends loaded at start-up (e.g. igraph graph_tool matlab)')
+    parser.add_argument('--limit', nargs='*', default=[], metavar='BACKEND=N', help='maximum number of concurrent jobs for a backend')
+    args = parser.parse_args()
+    limits = {backend: int(limit) for backend, limit in (item.split('=') for item in args.limit)}
+    run_service(args.socket, args.host, args.port, limits, args.warm)
@@ -0,0 +1,151 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Native NumPy implementation of the adjusted mutual information (AMI) between community partitions.
+
+This is a vectorised port of matlab/ami.m (the AMI_max variant, falling back to the NMI
+when the expected mutual information is negligible), so that partitions can be compared
+without MATLAB.
+
+Reference for AMI: N.X. Vinh, J. Epps, J. Bailey, Information theoretic
+measures for clusterings comparison: Variants, properties, normalization and
+correction for chance, Journal of Machine Learning Research, 11, 2837-2854 (2010).
+"""
+import numpy as np
+from partition import consecutive_labels
+
+CHUNK_SIZE = 2**22 # maximum number of hypergeometric terms evaluated at once
+
+def adjusted_mutual_information(communities1, communities2):
+    """
+    Returns the adjusted mutual information (AMI) between two community partitions.
+
+    Parameters
+    ----------
+    communities1 : the first community partition (list or array of community labels)
+    communities2 : the second community partition (list or array of community labels)
+    """
+    return(adjusted_mutual_information_many(communities1, [communities2])[0])
+
+def adjusted_mutual_information_many(communities, others):
+    """
+    Returns an array with the AMI between one community partition and each of several others.
+
+    Work that only depends on the first partition (its labels, entropy and the table of
+    log-factorials used for the expected mutual information) is done once for the batch.
+
+    Parameters
+    ----------
+    communities : the community partition to compare against (list or array of labels)
+    others : a list of community partitions (each a list or array of labels)
+    """
+    labels1, sizes1 = _relabel(communities)
+    N = len(labels1)
+    log_factorial = _log_factorials(N)
+    entropy1 = _entropy(sizes1, N)
+    ami = np.empty(len(others))
+    for i, other in enumerate(others):
+        labels2, sizes2 = _relabel(other)
+        if len(labels2) != N:
+            raise ValueError("Invalid partitions. Expected partitions of the same number of nodes")
+        ami[i] = _ami(labels1, sizes1, entropy1, labels2, sizes2, N, log_factorial)
+    return(ami)
+
+def contingency_table(labels1, labels2, R, C):
+    """
+    Returns the nonzero entries of the contingency table of two partitions as a tuple
+    (rows, columns, counts).
+
+    The table is built with np.bincount on the combined labels (or np.unique if the
+    full table would be much larger than the number of nodes).
+
+    Parameters
+    ----------
+    labels1 : array of labels 0, 1, ..., R-1
+    labels2 : array of labels 0, 1, ..., C-1
+    R : the number of communities in the first partition
+    C : the number of communities in the second partition
+    """
+    combined = labels1.astype(np.int64)*C + labels2
+    if R*C <= 4*len(combined) + 1024:
+        counts = np.bincount(combined, minlength=R*C)
+        cells = np.flatnonzero(counts)
+        counts = counts[cells]
+    else:
+        cells, counts = np.unique(combined, return_counts=True)
+    return(cells // C, cells % C, counts)
+
+def expected_mutual_information(sizes1, sizes2, N, log_factorial=None):
+    """
+    Returns the expected mutual information between two random partitions with the
+    given community sizes (under the hypergeometric model of randomness).
+
+    The sum over the hypergeometric support of every pair of community sizes is
+    evaluated in vectorised form with a table of log-factorials. Communities of equal
+    size contribute identical terms, so each distinct pair of sizes is only evaluated once.
+
+    Parameters
+    ----------
+    sizes1 : array of community sizes in the first partition
+    sizes2 : array of community sizes in the second partition
+    N : the number of nodes
+    log_factorial : (optional) table of log(k!) for k = 0, 1, ..., N
+    """
+    if log_factorial is None:
+        log_factorial = _log_factorials(N)
+    a, weight_a = np.unique(sizes1, return_counts=True)
+    b, weight_b = np.unique(sizes2, return_counts=True)
+    a, b = [x.ravel().astype(np.int64) for x in np.meshgrid(a, b, indexing='ij')]
+    weight = np.outer(weight_a, weight_b).ravel().astype(float)
+
+    # hypergeometric support max(1, a+b-N) <= nij <= min(a, b) of each pair of sizes
+    start = np.maximum(1, a+b-N)
+    length = np.maximum(np.minimum(a, b) - start + 1, 0)
+    ends = np.cumsum(length)
+
+    emi = 0.0
+    first = 0
+    while first < len(a):
+        # split the pairs into chunks of at most CHUNK_SIZE terms
+        offset = ends[first-1] if first else 0
+        last = max(np.searchsorted(ends, offset + CHUNK_SIZE, side='right'), first+1)
+        pair = np.repeat(np.arange(first, last), length[first:last])
+        nij = start[pair] + np.arange(len(pair)) - (np.cumsum(length[first:last]) - length[first:last])[pair - first]
+        ai, bj = a[pair], b[pair]
+        log_p = (log_factorial[ai] + log_factorial[bj] + log_factorial[N-ai] + log_factorial[N-bj]
+                 - log_factorial[N] - log_factorial[nij] - log_factorial[ai-nij] - log_factorial[bj-nij]
+                 - log_factorial[N-ai-bj+nij])
+        terms = nij/N*np.log(N*nij/(ai*bj.astype(float)))*np.exp(log_p)
+        emi += np.dot(weight[pair], terms)
+        first = last
+    return(emi)
+
+def _ami(labels1, sizes1, entropy1, labels2, sizes2, N, log_factorial):
+    entropy2 = _entropy(sizes2, N)
+    if entropy1 == 0 and entropy2 == 0:
+        return(1.0) # both partitions have a single community
+    rows, columns, counts = contingency_table(labels1, labels2, len(sizes1), len(sizes2))
+    mi = np.sum(counts/N*np.log(N*counts/(sizes1[rows]*sizes2[columns].astype(float))))
+    emi = expected_mutual_information(sizes1, sizes2, N, log_factorial)
+
+    # if expected mutual information negligible, use NMI (as in ami.m)
+    a, b = np.meshgrid(sizes1.astype(float), sizes2.astype(float), indexing='ij')
+    with np.errstate(divide='ignore'):
+        emi_bound = np.sum(a*b/N**2*np.log(N*(a-1)*(b-1)/(a*b*(N-1)) + N/(a*b)))
+    if abs(emi) > emi_bound:
+        return(mi/np.sqrt(entropy1*entropy2))
+    return((mi-emi)/(max(entropy1, entropy2)-emi))
+
+def _relabel(communities):
+    # returns labels numbered 0, 1, ..., R-1 and the size of each community
+    labels = consecutive_labels(communities)
+    return(labels, np.bincount(labels))
+
+def _entropy(sizes, N):
+    p = sizes/N
+    return(-np.sum(p*np.log(p)))
+
+def _log_factorials(N):
+    # log(k!) for k = 0, 1, ..., N
+    return(np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, N+1)))]))
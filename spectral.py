@@ -0,0 +1,319 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Native Python implementation of the Spectral (Bethe Hessian) community detection method.
+
+This is a SciPy port of matlab/spectral_method.m and the Bethe Hessian subroutines
+in matlab/spectral_subroutines, so that the Spectral method can be run without
+MATLAB or any intermediate files.
+
+Reference for Spectral method: A. Saade, F. Krzakala, L. Zdeborová,
+Spectral clustering of graphs with the Bethe Hessian, Advances in Neural
+Information Processing Systems, 406-414 (2014).
+"""
+import numpy as np
+import scipy.sparse as sparse
+import scipy.sparse.linalg as splinalg
+from structure import structural_index
+import tracing
+
+def adjacency_matrix(G):
+    """
+    Returns the sparse (CSR) adjacency matrix of a network (shared with the
+    network's structural index, see structure.py).
+
+    Parameters
+    ----------
+    G : ArrayGraph
+    """
+    return(structural_index(G).adjacency)
+
+def bethe_hessian(adj, r, degrees=None):
+    """
+    Returns the Bethe Hessian matrix H(r) = (r^2-1)I - rA + D as a sparse matrix.
+
+    Parameters
+    ----------
+    adj : sparse adjacency matrix A
+    r : the regularising parameter
+    degrees : (optional) array of node degrees (computed from adj if not given)
+    """
+    if degrees is None:
+        degrees = np.asarray(adj.sum(axis=1)).ravel()
+    return((sparse.diags(degrees + r**2 - 1) - r*adj).tocsr())
+
+def regulariser(degrees):
+    """
+    Returns the regularising parameter r = sqrt(<k^2>/<k> - 1) used by spectral_method.m.
+
+    Parameters
+    ----------
+    degrees : array of node degrees
+    """
+    degrees = np.asarray(degrees, dtype=float)
+    return(np.sqrt(max(np.mean(degrees**2)/np.mean(degrees) - 1, 0)))
+
+def bethe_radius(adj, guess, degrees=None, tol=1e-10, max_iter=10, seed=None):
+    """
+    Returns the value rho closest to guess at which the Bethe Hessian H(rho) is singular,
+    found by the iterations of iterateSlp.m. BH_cluster_real_world.m starts from
+    guess = <k^2>/<k> - 1 and uses r = sqrt(rho) to cluster the nodes.
+
+    Each iteration finds the eigenvalue mu of smallest magnitude of the generalised
+    problem H(rho)x = mu H'(rho)x, where H'(rho) = 2*rho*I - A, and sets rho = rho - mu,
+    until |mu| <= tol or after max_iter iterations.
+
+    Parameters
+    ----------
+    adj : sparse adjacency matrix A
+    guess : the starting value of rho
+    degrees : (optional) array of node degrees (computed from adj if not given)
+    tol : the tolerance on |mu|
+    max_iter : the maximum number of iterations
+    seed : (optional) seed for the ARPACK starting vector
+    """
+    N = adj.shape[0]
+    rng = np.random.default_rng(seed)
+    rho = float(guess)
+    for iteration in range(max_iter):
+        H = bethe_hessian(adj, rho, degrees)
+        H_prime = (2*rho*sparse.identity(N) - adj).tocsr()
+        if N < 3:
+            # ARPACK requires N > k+1, so small networks are solved densely
+            from scipy.linalg import eigvals
+            mus = eigvals(H.toarray(), H_prime.toarray())
+            mus = mus[np.isfinite(mus)]
+            if len(mus) == 0:
+                break
+            mu = float(np.real(mus[np.argmin(np.abs(mus))]))
+        else:
+            # mu is the reciprocal of the largest eigenvalue of H(rho)^-1 H'(rho)
+            try:
+                lu = splinalg.splu(H.tocsc(), permc_spec='MMD_AT_PLUS_A')
+            except RuntimeError: # H(rho) is exactly singular
+                break
+            operator = splinalg.LinearOperator((N, N), matvec=lambda x: lu.solve(H_prime @ x), dtype=np.float64)
+            try:
+                nu = splinalg.eigs(operator, k=1, which='LM', v0=rng.random(N), return_eigenvectors=False)
+            except splinalg.ArpackNoConvergence as error:
+                nu = error.eigenvalues
+            if len(nu) == 0 or nu[0] == 0:
+                break
+            mu = float(np.real(1/nu[0]))
+        rho -= mu
+        if abs(mu) <= tol:
+            break
+    return(rho)
+
+def count_negative_eigenvalues(H):
+    """
+    Returns the number of negative eigenvalues of a symmetric sparse matrix H,
+    or None if they could not be counted.
+
+    By Sylvester's law of inertia, this is the number of negative pivots of a
+    symmetric (unpivoted) LU factorisation of H, which is much cheaper than
+    computing the eigenvalues themselves.
+
+    Parameters
+    ----------
+    H : symmetric sparse matrix
+    """
+    try:
+        lu = splinalg.splu(H.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0,
+                           options=dict(SymmetricMode=True))
+    except RuntimeError: # exactly singular pivot
+        return(None)
+    if not np.array_equal(lu.perm_r, lu.perm_c):
+        return(None)
+    return(int(np.sum(lu.U.diagonal() < 0)))
+
+def smallest_eigenpairs(H, k, tol=1e-3, seed=None):
+    """
+    Returns the k smallest eigenvalues of a symmetric sparse matrix H and their eigenvectors,
+    as a tuple (eigenvalues, eigenvectors) sorted by eigenvalue.
+
+    Parameters
+    ----------
+    H : symmetric sparse matrix
+    k : the number of eigenpairs
+    tol : relative accuracy of the eigenvalues (as used by eigs in spectral_method.m)
+    seed : (optional) seed for the ARPACK starting vector
+    """
+    N = H.shape[0]
+    k = min(k, N)
+    if k >= N-1:
+        # ARPACK requires k < N, so small networks are solved densely
+        values, vectors = np.linalg.eigh(H.toarray())
+        return(values[:k], vectors[:,:k])
+    v0 = np.random.default_rng(seed).random(N)
+    try:
+        values, vectors = splinalg.eigsh(H, k=k, which='SA', tol=tol, v0=v0)
+    except splinalg.ArpackNoConvergence as error:
+        values, vectors = error.eigenvalues, error.eigenvectors
+    order = np.argsort(values)
+    return(values[order], vectors[:,order])
+
+def negative_eigenpairs(H, block_size=8, max_pairs=None, tol=1e-3, seed=None):
+    """
+    Returns (up to max_pairs of) the negative eigenvalues of a symmetric sparse matrix H
+    and their eigenvectors, as a tuple (eigenvalues, eigenvectors) sorted by eigenvalue.
+
+    Rather than computing all N eigenpairs (as in spectral_method.m), the smallest
+    eigenpairs are computed with ARPACK in blocks of increasing size until a
+    non-negative eigenvalue is found, so the cost depends on the number of
+    communities rather than the network size.
+
+    Parameters
+    ----------
+    H : symmetric sparse matrix
+    block_size : the number of eigenpairs requested in the first block (doubled each time)
+    max_pairs : (optional) the maximum number of eigenpairs to compute (defaults to N)
+    tol : relative accuracy of the eigenvalues (as used by eigs in spectral_method.m)
+    seed : (optional) seed for the ARPACK starting vector
+    """
+    N = H.shape[0]
+    max_pairs = N if max_pairs is None else min(max_pairs, N)
+    rng = np.random.default_rng(seed)
+    k = min(block_size, max_pairs)
+    while True:
+        values, vectors = smallest_eigenpairs(H, k, tol, rng)
+        if (len(values) and values[-1] >= 0) or k >= max_pairs or k >= N-1:
+            negative = values < 0
+            return(values[negative], vectors[:,negative])
+        k = min(2*k, max_pairs)
+
+def spectral_partition(G, block_size=8, max_eigenvectors=None, kmeans_trials=10, slp_iterations=0, seed=None):
+    """
+    Returns the community partition identified by the Spectral method as an integer
+    array, with communities numbered 1, 2, ..., q.
+
+    The number of communities q is the number of negative eigenvalues of the Bethe
+    Hessian H(r) with r = sqrt(<k^2>/<k> - 1), found from its smallest block_size
+    eigenvalues or, if these are all negative, counted from the inertia of H(r), as in
+    spectral_method.m. The nodes are then clustered using the eigenvectors of the q
+    smallest negative eigenvalues of H(r) and H(-r), with at most floor(sqrt(N))
+    eigenvectors of each matrix: for q = 2, by the sign of the second eigenvector, and
+    otherwise into q communities with k-means, as in BH_cluster_real_world.m.
+
+    This differs from BH_cluster_real_world.m in two ways (so the partitions can differ
+    from those of 'spectral_matlab'):
+
+    - By default, the eigenvectors are those of H(r) for the same r used to find q.
+      BH_cluster_real_world.m instead uses r = sqrt(rho), where rho is found from
+      <k^2>/<k> - 1 by 10 iterations of iterateSlp.m (see bethe_radius()). Each iteration
+      factorises H(rho), which takes minutes for networks with 2 x 10^4 nodes and low
+      clustering, so this is only done if slp_iterations > 0.
+    - k-means is run kmeans_trials times (10 by default) rather than 1000 times.
+
+    The cost grows with q: for example, a triadic closure network with N = 2 x 10^4
+    and p = 0.9 has q = 718 communities and takes about 2 minutes.
+
+    Parameters
+    ----------
+    G : ArrayGraph
+    block_size : the number of eigenpairs requested in the first eigensolver block
+    max_eigenvectors : (optional) the maximum number of eigenvectors of each matrix
+        used for clustering (defaults to floor(sqrt(N)))
+    kmeans_trials : the number of k-means runs (the run with the lowest distortion is kept)
+    slp_iterations : the number of iterateSlp.m iterations used to find r for clustering
+        (0 to use the same r as for finding q, or 10 as in BH_cluster_real_world.m)
+    seed : (optional) seed for the eigensolver starting vectors and k-means
+    """
+    rng = np.random.default_rng(seed)
+    if max_eigenvectors is None:
+        max_eigenvectors = int(np.floor(np.sqrt(G.N)))
+    index = structural_index(G)
+    adj = index.adjacency
+    r = index.regulariser()
+    H_plus = bethe_hessian(adj, r, index.degrees)
+    k = min(block_size, max_eigenvectors)
+    with tracing.span('spectral.eigensolve', N=G.N, matrix='H(r)'):
+        values_plus, vectors_plus = smallest_eigenpairs(H_plus, k, seed=rng)
+        q = int(np.sum(values_plus < 0))
+        if q == k:
+            # all eigenvalues in the first block are negative, so count them from the inertia
+            # of H(r) and then compute the eigenvectors in one call (or, if the factorisation
+            # fails, request eigenpairs in growing blocks until a non-negative one appears)
+            count = count_negative_eigenvalues(H_plus)
+            if count is None:
+                values_plus, vectors_plus = negative_eigenpairs(H_plus, 2*block_size, seed=rng)
+                q = len(values_plus)
+            else:
+                q = count
+                values_plus, vectors_plus = smallest_eigenpairs(H_plus, min(q, max_eigenvectors), seed=rng)
+    negative = values_plus < 0
+    values_plus, vectors_plus = values_plus[negative][:max_eigenvectors], vectors_plus[:,negative][:,:max_eigenvectors]
+
+    # workaround for issue with code crashing when spectral method detects only 1 community
+    if q <= 1:
+        return(np.ones(G.N, dtype=np.int32))
+
+    if slp_iterations > 0:
+        with tracing.span('spectral.slp', N=G.N, iterations=slp_iterations):
+            r = np.sqrt(max(bethe_radius(adj, r**2, index.degrees, max_iter=slp_iterations, seed=rng), 0))
+        with tracing.span('spectral.eigensolve', N=G.N, matrix='H(r)'):
+            values_plus, vectors_plus = negative_eigenpairs(bethe_hessian(adj, r, index.degrees), block_size, max_eigenvectors, seed=rng)
+
+    with tracing.span('spectral.eigensolve', N=G.N, matrix='H(-r)'):
+        values_minus, vectors_minus = negative_eigenpairs(bethe_hessian(adj, -r, index.degrees), block_size, max_eigenvectors, seed=rng)
+    values = np.concatenate([values_plus, values_minus])
+    vectors = np.hstack([vectors_plus, vectors_minus])[:,np.argsort(values)[:q]]
+    vectors = vectors/np.linalg.norm(vectors, axis=0) # normalising all eigenvectors to 1
+
+    if q == 2 and vectors.shape[1] == 2:
+        labels = (vectors[:,1] > 0).astype(np.int32) # the sign of the second eigenvector
+    else:
+        with tracing.span('spectral.kmeans', N=G.N, k=q):
+            labels = kmeans(vectors, q, kmeans_trials, seed=rng)
+    labels = np.unique(labels, return_inverse=True)[1] # number communities consecutively
+    return((labels + 1).astype(np.int32))
+
+def kmeans(data, k, trials=10, max_iter=100, seed=None):
+    """
+    Returns the cluster labels (0, 1, ..., k-1) of each row of data found by k-means.
+
+    Each trial uses k-means++ initialisation followed by Lloyd iterations, and the
+    trial with the lowest within-cluster sum of squares is kept. Distances are
+    computed with matrix products, so each iteration costs O(N*k*d).
+
+    Parameters
+    ----------
+    data : array of shape (N, d)
+    k : the number of clusters
+    trials : the number of k-means runs
+    max_iter : the maximum number of Lloyd iterations per run
+    seed : (optional) seed for the random initialisation
+    """
+    rng = np.random.default_rng(seed)
+    N = len(data)
+    k = min(k, N)
+    norms = np.einsum('ij,ij->i', data, data)
+    best = (np.inf, None)
+    for trial in range(trials):
+        # k-means++ initialisation
+        centres = np.empty((k, data.shape[1]))
+        centres[0] = data[rng.integers(N)]
+        closest = np.maximum(norms - 2*data@centres[0] + centres[0]@centres[0], 0)
+        for i in range(1, k):
+            total = closest.sum()
+            choice = rng.choice(N, p=closest/total) if total > 0 else rng.integers(N)
+            centres[i] = data[choice]
+            closest = np.minimum(closest, np.maximum(norms - 2*data@centres[i] + centres[i]@centres[i], 0))
+
+        # Lloyd iterations
+        labels = None
+        for iteration in range(max_iter):
+            distances = norms[:,None] - 2*data@centres.T + np.einsum('ij,ij->i', centres, centres)[None,:]
+            new_labels = np.argmin(distances, axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            counts = np.bincount(labels, minlength=k)
+            sums = sparse.csr_matrix((np.ones(N), (labels, np.arange(N))), shape=(k, N)) @ data
+            occupied = counts > 0
+            centres[occupied] = sums[occupied]/counts[occupied,None]
+        inertia = np.maximum(distances[np.arange(N), labels], 0).sum()
+        if inertia < best[0]:
+            best = (inertia, labels)
+    return(best[1])
@@ -0,0 +1,165 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Structural index of a network: basic structure shared by the community detection
+methods and metrics.
+
+The StructuralIndex of an ArrayGraph holds the sparse adjacency matrix, the degree
+vector and its moments (including the Bethe Hessian regulariser used by the Spectral
+method), the connected components and the triangle counts. Each quantity is computed
+the first time it is needed and then reused, so a summary or sweep that runs several
+methods on the same network computes it once. The index is cached with the ArrayGraph
+(see ArrayGraph.view()) and is discarded if the network's edges change.
+"""
+import numpy as np
+from array_graph import ArrayGraph, as_array_graph
+from backends import load
+
+def structural_index(G):
+    """
+    Returns the StructuralIndex of a network (created on first use and cached with the network).
+
+    Parameters
+    ----------
+    G : ArrayGraph, Network or NetworkX-formatted network
+    """
+    G = as_array_graph(getattr(G, 'arrays', G)) # a Network stores its ArrayGraph as network.arrays
+    return(G.view('structure', lambda: StructuralIndex(G)))
+
+class StructuralIndex:
+    """
+    Lazily computed structure of a network (use structural_index() to get the shared
+    index of a network rather than creating a new one).
+
+    Parameters
+    ----------
+    G : ArrayGraph
+
+    Examples
+    ----------
+    >>> index = structural_index(network)
+    >>> index.degree_moment(2)/index.degree_moment(1)
+    >>> largest, nodes = index.largest_component()
+    """
+    def __init__(self, G):
+        self.G = G
+        self._values = dict()
+
+    def _value(self, name, build):
+        # returns a cached quantity, computing it with build() on first use
+        if name not in self._values:
+            self._values[name] = build()
+        return(self._values[name])
+
+    @property
+    def degrees(self):
+        """
+        Integer array giving the degree of each node.
+        """
+        return(self._value('degrees', lambda: np.bincount(self.G.edges.ravel(), minlength=self.G.N)))
+
+    @property
+    def adjacency(self):
+        """
+        The sparse (CSR) adjacency matrix of the network, with float64 entries.
+        """
+        def build():
+            load('scipy')
+            from scipy import sparse
+            data = np.ones(len(self.G.indices))
+            return(sparse.csr_matrix((data, self.G.indices, self.G.indptr), shape=(self.G.N, self.G.N)))
+        return(self._value('adjacency', build))
+
+    def degree_moment(self, order):
+        """
+        Returns the mean of the degrees raised to the given power, <k^order>.
+
+        Parameters
+        ----------
+        order : the order of the moment (e.g. 1 for the mean degree)
+        """
+        if self.G.N == 0:
+            return(0.0)
+        return(self._value(('moment', order), lambda: float(np.mean(self.degrees.astype(np.float64)**order))))
+
+    def regulariser(self):
+        """
+        Returns the regularising parameter r = sqrt(<k^2>/<k> - 1) of the Bethe Hessian
+        (see spectral.py).
+        """
+        first, second = self.degree_moment(1), self.degree_moment(2)
+        return(float(np.sqrt(max(second/first - 1, 0))) if first > 0 else 0.0)
+
+    @property
+    def components(self):
+        """
+        Tuple (labels, sizes) of the connected components: labels gives the component of
+        each node, numbered 0, 1, ... in decreasing order of size, and sizes gives the
+        number of nodes in each component.
+        """
+        def build():
+            load('scipy')
+            from scipy.sparse.csgraph import connected_components
+            count, labels = connected_components(self.adjacency, directed=False)
+            sizes = np.bincount(labels, minlength=count)
+            order = np.argsort(-sizes, kind='stable')
+            rank = np.empty(count, dtype=np.int32)
+            rank[order] = np.arange(count, dtype=np.int32)
+            return((rank[labels], sizes[order]))
+        return(self._value('components', build))
+
+    def number_of_components(self):
+        """
+        Returns the number of connected components.
+        """
+        return(len(self.components[1]))
+
+    def largest_component(self):
+        """
+        Returns the largest connected component as a tuple (ArrayGraph, nodes), where the
+        nodes of the component are relabelled consecutively and nodes[i] is the original
+        label of node i.
+        """
+        def build():
+            labels = self.components[0]
+            keep = labels == 0
+            nodes = np.flatnonzero(keep)
+            if len(nodes) == self.G.N:
+                return((self.G, nodes))
+            relabel = np.cumsum(keep, dtype=np.int32) - 1 # relabelling preserves the order, so the edges stay sorted
+            edges = self.G.edges[keep[self.G.edges[:,0]]]
+            return((ArrayGraph(len(nodes), relabel[edges]), nodes))
+        return(self._value('largest_component', build))
+
+    @property
+    def triangles(self):
+        """
+        Integer array giving the number of triangles each node belongs to (see metrics.py).
+        """
+        import metrics
+        return(metrics.triangles(self.G))
+
+    @property
+    def edge_support(self):
+        """
+        Integer array giving the number of triangles each edge belongs to (see metrics.py).
+        """
+        import metrics
+        return(metrics.edge_support(self.G))
+
+    def number_of_triangles(self):
+        """
+        Returns the number of triangles in the network.
+        """
+        return(int(self.triangles.sum() // 3))
+
+    def transitivity(self):
+        """
+        Returns the global clustering coefficient (transitivity) of the network.
+        """
+        import metrics
+        return(self._value('transitivity', lambda: metrics.transitivity(self.G)))
+
+    def __repr__(self):
+        return('StructuralIndex(N={}, E={}, computed={})'.format(self.G.N, self.G.number_of_edges(), sorted(str(name) for name in self._values)))
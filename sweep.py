@@ -0,0 +1,229 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Parallel parameter sweeps over generated networks.
+
+The run_sweep function generates a network for every combination of model, network size,
+clustering parameter and replicate, runs the chosen community detection methods on it,
+and streams one row of results per network to a CSV file as each network is finished.
+"""
+import csv
+import functools
+import itertools
+import multiprocessing
+import os
+import time
+import numpy as np
+from network import Network, community_methods
+from network_generators import triadic_closure, configuration, triadic_closure_fast
+from backends import METHOD_BACKENDS, load
+from community_detection import get_number_communities, get_similarity
+import tracing
+
+KEY_COLUMNS = ['model', 'N', 't', 'replicate']
+WARMUP_SIZE = 100 # network size of the untimed warm-up run of each method in a worker
+_warm_methods = set() # methods already warmed up in this process
+
+def run_sweep(filename, models, Ns, ts, replicates=1, methods=('sbm',), seed=0, processes=None, resume=True, maxtasksperchild=10, trace=None):
+    """
+    Runs a parameter sweep and writes the results to a CSV file, with one row per network.
+
+    Each row gives the network parameters and seed, the clustering coefficient, the
+    generation time, and for each method the number of communities and the detection
+    time, followed by the AMI between each pair of methods.
+
+    Networks are processed in parallel by a pool of worker processes, and rows are
+    written as soon as each network is finished (in the order they finish). Each network
+    is generated with its own seed derived from (seed, model, N, t, replicate), so results
+    are reproducible regardless of the number of processes or the order of completion.
+
+    Parameters
+    ----------
+    filename : the CSV file for the results (e.g. 'sweep.csv')
+    models : list of network generation models (e.g. [triadic_closure, configuration])
+    Ns : list of network sizes
+    ts : list of clustering parameters, or a dictionary giving the list for each model
+    replicates : the number of networks generated for each (model, N, t)
+    methods : list of community detection methods (as accepted by Network.get_communities)
+    seed : base seed for the sweep
+    processes : the number of worker processes (defaults to the number of CPUs;
+        if 1, the sweep runs in the current process)
+    resume : if True and the file already exists, networks that already have results
+        are skipped and new rows are appended (networks whose row recorded an error are
+        run again, and the new row supersedes the old one)
+        The file must have been written with the same methods (i.e. the same columns),
+        otherwise a ValueError is raised.
+    maxtasksperchild : the number of networks processed by a worker before it is
+        replaced, which bounds the memory held by long-running workers
+    trace : (optional) a file name (e.g. 'sweep_trace.jsonl') for tracing the sweep
+        The spans recorded for each network (generation, conversions, each detection
+        method, similarity, ...; see tracing.py) are appended to the file as JSON lines,
+        labelled with the network's model, N, t and replicate.
+
+    Examples
+    ----------
+    >>> run_sweep('sweep.csv', models=[triadic_closure], Ns=[1000], ts=np.arange(0,1.1,0.1),
+    ...           replicates=10, methods=['modularity', 'sbm'])
+    """
+    methods = list(methods)
+    columns = sweep_columns(methods)
+    header = sweep_header(filename) if resume else None
+    if header is not None and header != columns:
+        raise ValueError("Cannot resume {}: it has the columns of a sweep with different methods. "
+                         "Use the same methods, another file, or resume=False to overwrite it".format(filename))
+    completed = completed_tasks(filename) if header is not None else set()
+    tasks = [task for task in sweep_tasks(models, Ns, ts, replicates, methods, seed)
+             if task_key(task) not in completed]
+
+    mode = 'a' if header is not None else 'w'
+    trace_sink = tracing.JSONLinesSink(trace) if trace else None
+    task_runner = functools.partial(run_task, trace=trace_sink is not None)
+    with open(filename, mode, newline='') as output:
+        writer = csv.DictWriter(output, fieldnames=columns)
+        if mode == 'w':
+            writer.writeheader()
+
+        def write(row):
+            spans = row.pop('spans', [])
+            if trace_sink is not None:
+                tracing.replay(spans, [trace_sink], **{key: row[key] for key in KEY_COLUMNS})
+            writer.writerow(row)
+            output.flush()
+
+        try:
+            if processes == 1:
+                for row in map(task_runner, tasks):
+                    write(row)
+            else:
+                with multiprocessing.Pool(processes, maxtasksperchild=maxtasksperchild) as pool:
+                    for row in pool.imap_unordered(task_runner, tasks):
+                        write(row)
+        finally:
+            if trace_sink is not None:
+                trace_sink.close()
+    return(len(tasks))
+
+def sweep_tasks(models, Ns, ts, replicates, methods, seed):
+    """
+    Returns the list of tasks (model, N, t, replicate, network seed, methods) for a sweep.
+
+    Parameters
+    ----------
+    models, Ns, ts, replicates, methods, seed : as for run_sweep()
+    """
+    tasks = []
+    for model in models:
+        model_ts = ts[model] if isinstance(ts, dict) else ts
+        for N, t, replicate in itertools.product(Ns, model_ts, range(replicates)):
+            t = float(t)
+            tasks.append((model, int(N), t, replicate, task_seed(seed, model, N, t, replicate), methods))
+    return(tasks)
+
+def task_seed(seed, model, N, t, replicate):
+    """
+    Returns the network seed for one task, derived from the sweep seed and the task parameters.
+
+    Parameters
+    ----------
+    seed : base seed for the sweep
+    model : network generation model
+    N : network size
+    t : clustering parameter
+    replicate : replicate number
+    """
+    model_index = [triadic_closure, configuration].index(model)
+    sequence = np.random.SeedSequence([seed, model_index, int(N), int(round(t*10**6)), replicate])
+    return(int(sequence.generate_state(1)[0]))
+
+def task_key(task):
+    """
+    Returns the (model name, N, t, replicate) key identifying a task.
+    """
+    model, N, t, replicate = task[:4]
+    return((model.__name__, int(N), round(float(t), 6), int(replicate)))
+
+def sweep_columns(methods):
+    """
+    Returns the CSV column names for a sweep with the given methods.
+    """
+    columns = KEY_COLUMNS + ['seed', 'transitivity', 'generation_time']
+    for method in methods:
+        columns += ['communities_' + method, 'time_' + method]
+    for method1, method2 in itertools.combinations(methods, 2):
+        columns.append('ami_{}_{}'.format(method1, method2))
+    return(columns + ['error'])
+
+def sweep_header(filename):
+    """
+    Returns the list of column names of an existing sweep file, or None if the file
+    does not exist or is empty.
+    """
+    if not os.path.exists(filename):
+        return(None)
+    with open(filename, newline='') as output:
+        return(next(csv.reader(output), None))
+
+def completed_tasks(filename):
+    """
+    Returns the set of task keys that already have (error-free) results in a sweep file.
+    """
+    if not os.path.exists(filename):
+        return(set())
+    with open(filename, newline='') as output:
+        return(set((row['model'], int(row['N']), round(float(row['t']), 6), int(row['replicate']))
+                   for row in csv.DictReader(output) if not row['error']))
+
+def warm_up(methods):
+    """
+    Loads the backends of the given methods and runs each method once on a small network,
+    unless this was already done in the current process, so that imports and other one-off
+    start-up costs are not included in the detection times of the first task of a worker.
+    """
+    for method in methods:
+        if method in _warm_methods:
+            continue
+        _warm_methods.add(method)
+        try:
+            for backend in METHOD_BACKENDS.get(method, []):
+                load(backend)
+            community_methods()[method](triadic_closure_fast(0.5, WARMUP_SIZE, seed=0))
+        except Exception:
+            pass # the error is recorded in the row of the task
+
+def run_task(task, trace=False):
+    """
+    Generates one network, runs the community detection methods on it and returns
+    the row of results as a dictionary.
+
+    Errors are recorded in the 'error' column (so that the task is retried when the
+    sweep is resumed) rather than stopping the sweep. If trace is True, the spans
+    recorded while processing the network are returned in row['spans'].
+    """
+    warm_up(task[5]) # before tracing, so the warm-up runs are not traced
+    if trace:
+        with tracing.tracing(tracing.StatsSink()) as sink:
+            row = run_task(task)
+        row['spans'] = sink.records()
+        return(row)
+    model, N, t, replicate, seed, methods = task
+    row = dict(zip(KEY_COLUMNS, task_key(task)))
+    row['seed'] = seed
+    row['error'] = ''
+    try:
+        start = time.perf_counter()
+        network = Network(model, N, t, seed=seed)
+        row['generation_time'] = time.perf_counter() - start
+        row['transitivity'] = network.structure.transitivity()
+
+        communities = dict()
+        for method in methods:
+            start = time.perf_counter()
+            communities[method] = network.get_communities(method)
+            row['time_' + method] = time.perf_counter() - start
+            row['communities_' + method] = get_number_communities(communities[method])
+        for method1, method2 in itertools.combinations(methods, 2):
+            row['ami_{}_{}'.format(method1, method2)] = get_similarity(communities[method1], communities[method2])
+    except Exception as error:
+        row['error'] = '{}: {}'.format(type(error).__name__, error)
+    return(row)
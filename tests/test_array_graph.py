@@ -0,0 +1,64 @@
+import networkx as nx
+import pytest
+from array_graph import ArrayGraph, canonical_edges, relabel_edges
+
+def test_relabel_edges_integer_labels():
+    G = nx.Graph([(3, 1), (1, 2), (2, 0)])
+    nodes, edges = relabel_edges(G)
+    assert [tuple(nodes[i] for i in edge) for edge in edges.tolist()] == list(G.edges())
+
+def test_relabel_edges_float_labels():
+    # float labels must not be truncated to integers
+    G = nx.Graph()
+    G.add_nodes_from([0.5, 1.5, 0.7, 2.2])
+    G.add_edges_from([(0.5, 1.5), (0.7, 2.2)])
+    nodes, edges = relabel_edges(G)
+    assert nodes == [0.5, 1.5, 0.7, 2.2]
+    assert edges.tolist() == [[0, 1], [2, 3]]
+
+def test_relabel_edges_bool_and_string_labels():
+    G = nx.Graph([(True, 'a'), ('a', False)])
+    nodes, edges = relabel_edges(G)
+    assert [tuple(nodes[i] for i in edge) for edge in edges.tolist()] == list(G.edges())
+
+def test_from_networkx_float_labels():
+    G = nx.Graph([(0.5, 1.5), (1.5, 0.7)])
+    A = ArrayGraph.from_networkx(G)
+    assert A.N == 3
+    assert A.number_of_edges() == 2
+
+def test_csr_adjacency_matches_networkx():
+    G = nx.powerlaw_cluster_graph(200, 3, 0.3, seed=1)
+    A = ArrayGraph.from_networkx(G)
+    assert A.N == 200 and A.number_of_edges() == G.number_of_edges()
+    for node in G.nodes():
+        assert A.neighbors(node).tolist() == sorted(G.neighbors(node))
+    assert A.degrees().tolist() == [G.degree(node) for node in range(200)]
+    assert nx.utils.graphs_equal(A.to_networkx(), G)
+
+def test_from_networkx_removes_self_loops_and_parallel_edges():
+    G = nx.MultiGraph([(0, 1), (1, 0), (1, 1), (1, 2)])
+    A = ArrayGraph.from_networkx(G)
+    assert A.edges.tolist() == [[0, 1], [1, 2]]
+
+def test_views_are_cached_until_the_edges_change():
+    A = ArrayGraph(3, [(0, 1), (1, 2)])
+    first = A.view('networkx', A.to_networkx)
+    assert A.view('networkx', A.to_networkx) is first
+    A.edges = [(0, 1)]
+    assert A.view('networkx', A.to_networkx) is not first
+    assert A.degrees().tolist() == [1, 1, 0]
+
+def test_igraph_conversion():
+    ig = pytest.importorskip('igraph')
+    from community_detection import convert_to_igraph
+    A = ArrayGraph.from_networkx(nx.karate_club_graph())
+    Gi = convert_to_igraph(A)
+    assert isinstance(Gi, ig.Graph)
+    assert Gi.vcount() == A.N
+    assert sorted(tuple(sorted(edge)) for edge in Gi.get_edgelist()) == sorted(map(tuple, A.edges.tolist()))
+    assert convert_to_igraph(A) is Gi # cached
+
+def test_canonical_edges():
+    edges = canonical_edges([2, 0, 1, 1, 3], [0, 2, 1, 3, 1], 4)
+    assert edges.tolist() == [[0, 2], [1, 3]]
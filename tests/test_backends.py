@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import pytest
+import backends
+
+def test_import_does_not_load_backends():
+    # importing the package must not import any detection backend or start MATLAB
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("import sys, network, community_detection\n"
+              "print(','.join(m for m in ['igraph', 'graph_tool', 'matlab', 'infomap'] if m in sys.modules))")
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=root)
+    assert output.decode().strip() == ''
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        backends.load('not_a_backend')
+
+def test_missing_backend(monkeypatch):
+    monkeypatch.setitem(backends.BACKENDS, 'missing', ('no_such_module_for_tests', 'http://example.org/'))
+    monkeypatch.setattr(backends, '_unavailable', dict())
+    with pytest.raises(backends.BackendUnavailable) as first:
+        backends.load('missing')
+    assert 'missing' in str(first.value)
+    with pytest.raises(backends.BackendUnavailable) as second:
+        backends.load('missing')
+    assert second.value is first.value # the failed import is not retried
+    assert not backends.is_available('missing')
+    assert isinstance(first.value, ImportError)
+
+def test_load_is_cached():
+    assert backends.load('scipy') is backends.load('scipy')
+    assert backends.is_available('scipy')
+
+def test_available_methods():
+    available = backends.available_methods()
+    assert set(available) == set(backends.METHOD_BACKENDS)
+    assert available['spectral'] == backends.is_available('scipy')
+    assert available['sbm'] == backends.is_available('graph_tool')
+
+def test_igraph_seed():
+    igraph = pytest.importorskip('igraph')
+    G = igraph.Graph.Erdos_Renyi(n=200, m=600)
+    with backends.igraph_seed(1):
+        first = G.community_leiden(objective_function='modularity').membership
+    with backends.igraph_seed(1):
+        second = G.community_leiden(objective_function='modularity').membership
+    assert first == second
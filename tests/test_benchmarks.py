@@ -0,0 +1,57 @@
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import run_benchmarks
+
+def result(case, N, wall_time, peak_memory=100.0, t=0.5, status='ok'):
+    return({'case': case, 'model': 'triadic_closure', 't': t, 'N': N, 'status': status,
+            'wall_time': wall_time, 'peak_memory': peak_memory})
+
+def test_scaling_exponents():
+    results = [result('generate', N, 1e-6*N**1.5) for N in [10**3, 10**4, 10**5]]
+    results += [result('generate', 10**6, None, status='timeout after 10s')]
+    exponents = run_benchmarks.scaling_exponents(results)
+    assert len(exponents) == 1
+    assert exponents[0]['case'] == 'generate'
+    assert np.isclose(exponents[0]['exponent'], 1.5)
+    assert exponents[0]['sizes'] == [10**3, 10**4, 10**5]
+
+def test_scaling_exponents_ignore_fast_sizes():
+    # times below min_time are dominated by overheads, so only the slower sizes are fitted
+    results = [result('spectral', 10**2, 0.001), result('spectral', 10**3, 0.001),
+               result('spectral', 10**4, 0.1), result('spectral', 10**5, 1.0)]
+    exponents = run_benchmarks.scaling_exponents(results, min_time=0.01)
+    assert np.isclose(exponents[0]['exponent'], 1.0)
+    assert exponents[0]['sizes'] == [10**4, 10**5]
+
+def test_compare():
+    baseline = {'results': [result('generate', 1000, 1.0), result('spectral', 1000, 1.0, peak_memory=100.0),
+                            result('leiden', 1000, 0.001), result('sbm', 1000, 1.0)]}
+    new = {'results': [result('generate', 1000, 1.2), result('spectral', 1000, 1.0, peak_memory=200.0),
+                       result('leiden', 1000, 0.005), result('sbm', 1000, None, status='timeout after 10s'),
+                       result('modularity', 1000, 5.0)]}
+    regressions = run_benchmarks.compare(new, baseline, tolerance=1.5)
+    assert [(regression['case'], regression['measure']) for regression in regressions] == [('spectral', 'peak_memory')]
+    assert regressions[0]['ratio'] == 2.0
+    assert [regression['case'] for regression in run_benchmarks.compare(new, baseline, tolerance=1.1)] == ['generate', 'spectral']
+
+def test_skipped_cases(monkeypatch):
+    monkeypatch.setattr(run_benchmarks, 'is_available', lambda backend: False)
+    results = run_benchmarks.run_benchmarks(['sbm', 'generate_original'], [10**5], {'triadic_closure': [0.5]})
+    statuses = [measurement['status'] for measurement in results['results']]
+    assert statuses == ['skipped: graph_tool not installed', 'skipped: N > 10000']
+    assert results['scaling'] == []
+
+def test_measurement():
+    results = run_benchmarks.run_benchmarks(['generate'], [200, 400], {'configuration': [0.1]})
+    for measurement in results['results']:
+        assert measurement['status'] == 'ok'
+        assert measurement['wall_time'] > 0 and measurement['peak_memory'] > 0
+    assert [exponent['case'] for exponent in results['scaling']] == ['generate']
+
+@pytest.mark.parametrize('case', ['fix_graph', 'transitivity', 'similarity'])
+def test_cases_run(case):
+    setup, backends, max_N = run_benchmarks.CASES[case]
+    setup('triadic_closure', 100, 0.5, 0)()
@@ -0,0 +1,73 @@
+import numpy as np
+import network
+from cache import NetworkCache
+from network import Network, triadic_closure
+from partition import Partition
+
+def counting_methods(calls):
+    # community detection functions that record which methods were run
+    def method(name):
+        def detect(G, **kwargs):
+            calls.append(name)
+            return(Partition(np.arange(G.N) % 3 + 1))
+        return(detect)
+    return(lambda: {name: method(name) for name in ['modularity', 'infomap', 'spectral', 'sbm']})
+
+def test_summary_loads_cached_partitions(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(network, 'community_methods', counting_methods(calls))
+    cache = NetworkCache(str(tmp_path))
+    first = Network(triadic_closure, 200, 0.5, seed=1, cache=cache).communities_summary(verbose=False)
+    assert sorted(calls) == ['infomap', 'modularity', 'sbm', 'spectral']
+
+    del calls[:]
+    second = Network(triadic_closure, 200, 0.5, seed=1, cache=cache).communities_summary(verbose=False)
+    assert calls == []
+    for method in first.methods:
+        assert second.communities[method] == first.communities[method]
+        assert second.timings[method] is None
+    assert 'modularity: cached' in str(second)
+
+def test_summary_runs_only_missing_methods(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(network, 'community_methods', counting_methods(calls))
+    net = Network(triadic_closure, 200, 0.5, seed=1, cache=NetworkCache(str(tmp_path)))
+    net.get_communities('spectral')
+    del calls[:]
+    summary = net.communities_summary(verbose=False)
+    assert sorted(calls) == ['infomap', 'modularity', 'sbm']
+    assert summary.timings['spectral'] is None
+
+def test_network_is_memory_mapped_from_the_cache(tmp_path):
+    first = Network(triadic_closure, 300, 0.5, seed=2, cache=NetworkCache(str(tmp_path)))
+    # a new cache object has an empty in-memory tier, so the network is loaded from disk
+    second = Network(triadic_closure, 300, 0.5, seed=2, cache=NetworkCache(str(tmp_path)))
+    assert not second.arrays.edges.flags.writeable # memory-mapped read-only
+    assert np.array_equal(second.arrays.edges, first.arrays.edges)
+    assert second.arrays.N == 300
+
+def test_partitions_are_keyed_by_method_and_options(tmp_path):
+    cache = NetworkCache(str(tmp_path))
+    net = Network(triadic_closure, 100, 0.5, seed=1, cache=cache)
+    cache.save_partition(net.cache_key, 'sbm', {'trials': 3}, [1, 2, 2])
+    reloaded = NetworkCache(str(tmp_path))
+    assert reloaded.load_partition(net.cache_key, 'sbm', {'trials': 3}).tolist() == [1, 2, 2]
+    assert reloaded.load_partition(net.cache_key, 'sbm', {'trials': 4}) is None
+    assert reloaded.load_partition(net.cache_key, 'spectral', {'trials': 3}) is None
+    reloaded.clear()
+    assert NetworkCache(str(tmp_path)).load_partition(net.cache_key, 'sbm', {'trials': 3}) is None
+
+def test_least_recently_used_networks_are_evicted(tmp_path):
+    import os
+    cache = NetworkCache(str(tmp_path), memory_items=0)
+    keys = [Network(triadic_closure, 1000, 0.5, seed=seed, cache=cache).cache_key for seed in range(3)]
+    size = sum(os.path.getsize(os.path.join(str(tmp_path), keys[0], name)) for name in os.listdir(os.path.join(str(tmp_path), keys[0])))
+    for age, key in enumerate(keys):
+        os.utime(os.path.join(str(tmp_path), key), (1000 + age, 1000 + age))
+    cache.load_network(keys[0]) # the first network is now the most recently used
+
+    cache.max_bytes = int(3.5*size) # room for three of the four networks
+    Network(triadic_closure, 1000, 0.5, seed=3, cache=cache)
+    assert cache.load_network(keys[0]) is not None
+    assert cache.load_network(keys[1]) is None
+    assert cache.load_network(keys[2]) is not None
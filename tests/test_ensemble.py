@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import metrics
+from ensemble import Ensemble, generate_ensemble
+from network import Network, configuration, triadic_closure
+
+@pytest.mark.parametrize('model, t', [(triadic_closure, 0.5), (configuration, 0.1)])
+def test_replicates_match_single_networks(model, t):
+    ensemble = generate_ensemble(model, 200, t, R=5, seed=1)
+    assert len(ensemble) == 5
+    assert len(set(ensemble.seeds)) == 5 # independent seeds
+    for r, G in enumerate(ensemble):
+        assert G.N == 200
+        assert np.array_equal(G.edges, Network(model, 200, t, seed=ensemble.seeds[r]).arrays.edges)
+        assert np.shares_memory(G.edges, ensemble.edges) # a view of the concatenated edges
+    assert np.array_equal(ensemble.number_of_edges(), [G.number_of_edges() for G in ensemble])
+
+def test_reproducible_and_independent_of_processes():
+    serial = generate_ensemble(triadic_closure, 200, 0.5, R=6, seed=2)
+    parallel = generate_ensemble(triadic_closure, 200, 0.5, R=6, seed=2, processes=2)
+    assert serial.seeds == parallel.seeds
+    assert np.array_equal(serial.offsets, parallel.offsets)
+    assert np.array_equal(serial.edges, parallel.edges)
+    assert generate_ensemble(triadic_closure, 200, 0.5, R=6, seed=3).seeds != serial.seeds
+
+def test_random_seed_is_stored():
+    ensemble = generate_ensemble(triadic_closure, 100, 0.5, R=2)
+    again = generate_ensemble(triadic_closure, 100, 0.5, R=2, seed=ensemble.seed)
+    assert np.array_equal(ensemble.edges, again.edges)
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        generate_ensemble(triadic_closure, 100, 0.5, R=0)
+    with pytest.raises(ValueError):
+        generate_ensemble(configuration, 100, 0.5, R=2)
+
+def test_indexing_and_network():
+    ensemble = generate_ensemble(triadic_closure, 100, 0.5, R=3, seed=4)
+    assert np.array_equal(ensemble[-1].edges, ensemble[2].edges)
+    with pytest.raises(IndexError):
+        ensemble[3]
+    network = ensemble.network(1)
+    assert (network.model, network.N, network.t, network.seed) == (triadic_closure, 100, 0.5, ensemble.seeds[1])
+    assert np.array_equal(network.arrays.edges, ensemble[1].edges)
+
+def test_map():
+    ensemble = generate_ensemble(triadic_closure, 200, 0.5, R=4, seed=5)
+    expected = [metrics.transitivity(G) for G in ensemble]
+    assert ensemble.map(metrics.transitivity) == expected
+    assert ensemble.map(metrics.transitivity, processes=2) == expected
+
+@pytest.mark.parametrize('name', ['ensemble.npz', 'ensemble'])
+def test_save_and_load(tmp_path, name):
+    ensemble = generate_ensemble(configuration, 150, 0.1, R=3, seed=6)
+    filename = str(tmp_path / name)
+    ensemble.save(filename)
+    loaded = Ensemble.load(filename)
+    assert (loaded.model, loaded.N, loaded.t, loaded.seed) == (configuration, 150, 0.1, 6)
+    assert loaded.seeds == ensemble.seeds
+    assert np.array_equal(loaded.offsets, ensemble.offsets)
+    for G, H in zip(loaded, ensemble):
+        assert np.array_equal(G.edges, H.edges)
@@ -0,0 +1,51 @@
+import os
+import numpy as np
+import pytest
+from array_graph import ArrayGraph, load_array_graph, save_array_graph
+from network import Network, configuration, triadic_closure
+
+def example_graph():
+    rng = np.random.default_rng(0)
+    edges = np.unique(np.sort(rng.integers(50, size=(200, 2)), axis=1), axis=0)
+    return(ArrayGraph(60, edges[edges[:,0] != edges[:,1]]))
+
+@pytest.mark.parametrize('name', ['graph.npz', 'graph'])
+def test_array_graph_round_trip(tmp_path, name):
+    graph = example_graph()
+    filename = str(tmp_path / name)
+    save_array_graph(filename, graph, model='triadic_closure', t=np.float64(0.5), seed=np.int64(3))
+    loaded, meta = load_array_graph(filename)
+    assert loaded.N == graph.N == 60 # isolated nodes are kept
+    assert loaded.edges.dtype == np.int32
+    assert np.array_equal(loaded.edges, graph.edges)
+    assert meta == {'model': 'triadic_closure', 't': 0.5, 'seed': 3, 'N': 60}
+
+def test_directory_is_memory_mapped(tmp_path):
+    filename = str(tmp_path / 'graph')
+    save_array_graph(filename, example_graph())
+    assert sorted(os.listdir(filename)) == ['edges.npy', 'meta.json']
+    mapped, _ = load_array_graph(filename)
+    assert not mapped.edges.flags.writeable
+    loaded, _ = load_array_graph(filename, mmap=False)
+    assert loaded.edges.flags.writeable
+    assert np.array_equal(mapped.edges, loaded.edges)
+
+def test_incomplete_directory_is_missing(tmp_path):
+    # meta.json is written last, so a directory without it is not a saved network
+    filename = str(tmp_path / 'graph')
+    os.makedirs(filename)
+    np.save(os.path.join(filename, 'edges.npy'), example_graph().edges)
+    with pytest.raises(FileNotFoundError):
+        load_array_graph(filename)
+
+@pytest.mark.parametrize('model, t', [(triadic_closure, 0.5), (configuration, 0.1)])
+@pytest.mark.parametrize('name', ['network.npz', 'network'])
+def test_network_save_and_load(tmp_path, model, t, name):
+    network = Network(model, 300, t, seed=4)
+    filename = str(tmp_path / name)
+    network.save(filename)
+    loaded = Network.load(filename)
+    assert loaded.model is model
+    assert (loaded.N, loaded.t, loaded.seed) == (300, t, 4)
+    assert np.array_equal(loaded.arrays.edges, network.arrays.edges)
+    assert sorted(loaded.graph().edges()) == sorted(network.graph().edges())
@@ -0,0 +1,55 @@
+import networkx as nx
+import numpy as np
+import pytest
+from array_graph import ArrayGraph
+from partition import Partition
+from similarity import adjusted_mutual_information
+
+pytest.importorskip('igraph')
+from community_detection import get_infomap_communities, infomap_trials
+
+def planted_graph():
+    return(ArrayGraph.from_networkx(nx.planted_partition_graph(4, 40, 0.4, 0.01, seed=3)))
+
+def test_best_trial():
+    result = infomap_trials(planted_graph(), trials=5, seed=1)
+    assert len(result.partitions) == len(result.seeds) == len(result.timings) == 5
+    assert len(set(result.seeds)) == 5
+    assert result.codelengths.shape == (5,)
+    assert result.codelengths[result.best] == result.codelengths.min()
+    assert result.partition is result.partitions[result.best]
+    assert all(timing['wall_time'] >= 0 for timing in result.timings)
+    planted = [node//40 + 1 for node in range(160)]
+    assert adjusted_mutual_information(result.partition, planted) > 0.95
+
+def test_parallel_trials_match_serial():
+    G = planted_graph()
+    serial = infomap_trials(G, trials=4, seed=2)
+    parallel = infomap_trials(G, trials=4, processes=2, seed=2)
+    assert parallel.seeds == serial.seeds
+    assert np.array_equal(parallel.codelengths, serial.codelengths)
+    assert all(p == s for p, s in zip(parallel.partitions, serial.partitions))
+
+def test_reproducible_with_seed():
+    G = planted_graph()
+    first = get_infomap_communities(G, trials=3, seed=4)
+    assert isinstance(first, Partition)
+    assert first == get_infomap_communities(G, trials=3, seed=4)
+
+def test_consensus():
+    G = planted_graph()
+    result = infomap_trials(G, trials=4, seed=5)
+    co_assignment = result.co_assignment()
+    assert co_assignment.shape == (G.number_of_edges(),)
+    assert np.all((0 <= co_assignment) & (co_assignment <= 1))
+    consensus = get_infomap_communities(G, trials=4, seed=5, consensus=True)
+    assert consensus == result.consensus()
+    assert consensus == consensus.relabel()
+    # nodes joined by edges that every trial co-assigns are in the same consensus community
+    u, v = G.edges[co_assignment == 1].T
+    assert np.array_equal(consensus[u], consensus[v])
+
+def test_flow_model_requires_infomap():
+    pytest.importorskip('infomap')
+    result = infomap_trials(planted_graph(), trials=2, seed=6, flow_model='undirected')
+    assert len(result.partition) == 160
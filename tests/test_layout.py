@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+import pytest
+import layout
+import network
+from array_graph import ArrayGraph
+from network import Network, triadic_closure
+
+def test_invalid_layout():
+    with pytest.raises(ValueError):
+        layout.compute_layout(ArrayGraph.from_networkx(nx.path_graph(5)), method='circle')
+
+@pytest.mark.parametrize('method', ['spring', 'fr', 'drl'])
+def test_positions(method):
+    if method != 'spring':
+        pytest.importorskip('igraph')
+    G = ArrayGraph.from_networkx(nx.karate_club_graph())
+    positions = layout.compute_layout(G, method, seed=1)
+    assert positions.shape == (34, 2)
+    assert np.all(np.isfinite(positions))
+    assert np.array_equal(positions, layout.compute_layout(G, method, seed=1))
+
+def test_isolated_nodes_have_positions():
+    G = ArrayGraph(10, np.array([[0, 1], [1, 2]], dtype=np.int32))
+    assert layout.compute_layout(G, 'spring', seed=1).shape == (10, 2)
+
+def test_network_layout_is_cached(monkeypatch):
+    calls = []
+    def compute_layout(G, method, seed):
+        calls.append((method, seed))
+        return(np.zeros((G.N, 2)))
+    monkeypatch.setattr(network, 'compute_layout', compute_layout)
+    net = Network(triadic_closure, 50, 0.5, seed=1)
+    first = net.layout('spring', seed=2)
+    assert net.layout('spring', seed=2) is first
+    net.layout('spring', seed=3)
+    assert calls == [('spring', 2), ('spring', 3)]
+
+@pytest.mark.parametrize('rasterized', [None, True])
+def test_plot(tmp_path, rasterized):
+    pytest.importorskip('matplotlib')
+    net = Network(triadic_closure, 100, 0.5, seed=1)
+    filename = str(tmp_path / 'network.pdf')
+    net.plot(filename, communities=[node % 3 + 1 for node in range(100)], layout='spring', seed=1, rasterized=rasterized)
+    assert (tmp_path / 'network.pdf').stat().st_size > 0
+    # the second plot reuses the cached layout
+    net.plot(str(tmp_path / 'plain.png'), layout='spring', seed=1)
+    assert (tmp_path / 'plain.png').stat().st_size > 0
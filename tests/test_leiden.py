@@ -0,0 +1,45 @@
+import networkx as nx
+import pytest
+from array_graph import ArrayGraph
+from network import Network, triadic_closure
+from partition import Partition
+from similarity import adjusted_mutual_information
+
+pytest.importorskip('igraph')
+from community_detection import get_leiden_communities, get_multilevel_communities
+
+def planted_graph():
+    return(ArrayGraph.from_networkx(nx.planted_partition_graph(4, 50, 0.3, 0.005, seed=2)))
+
+def planted_labels():
+    return([node//50 + 1 for node in range(200)])
+
+@pytest.mark.parametrize('detect', [get_leiden_communities, get_multilevel_communities])
+def test_finds_planted_communities(detect):
+    communities = detect(planted_graph(), seed=1)
+    assert isinstance(communities, Partition)
+    assert len(communities) == 200
+    assert min(communities) == 1 # numbered from 1, like the other methods
+    assert adjusted_mutual_information(communities, planted_labels()) > 0.95
+
+@pytest.mark.parametrize('detect', [get_leiden_communities, get_multilevel_communities])
+def test_reproducible_with_seed(detect):
+    G = Network(triadic_closure, 500, 0.5, seed=3).arrays
+    assert detect(G, seed=7) == detect(G, seed=7)
+
+def test_accepts_networkx_graphs():
+    G = nx.planted_partition_graph(4, 50, 0.3, 0.005, seed=2)
+    assert get_leiden_communities(G, seed=1) == get_leiden_communities(planted_graph(), seed=1)
+
+@pytest.mark.parametrize('detect', [get_leiden_communities, get_multilevel_communities])
+def test_resolution(detect):
+    # higher resolutions give smaller (so more) communities
+    G = Network(triadic_closure, 500, 0.5, seed=3).arrays
+    coarse = detect(G, resolution=0.2, seed=1).number_of_communities()
+    fine = detect(G, resolution=5.0, seed=1).number_of_communities()
+    assert coarse < fine
+
+def test_network_method():
+    network = Network(triadic_closure, 300, 0.5, seed=1)
+    communities = network.get_communities('leiden', seed=1)
+    assert communities == get_leiden_communities(network.arrays, seed=1)
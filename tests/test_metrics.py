@@ -0,0 +1,49 @@
+import networkx as nx
+import numpy as np
+import pytest
+import metrics
+from array_graph import ArrayGraph
+
+def arrays(G, seed=None):
+    # the ArrayGraph of G with the nodes labelled 0, 1, ..., N-1 (in a random order if seed is given)
+    nodes = list(G.nodes())
+    if seed is not None:
+        np.random.default_rng(seed).shuffle(nodes)
+    label = {node: i for i, node in enumerate(nodes)}
+    return(ArrayGraph(len(nodes), [(label[u], label[v]) for u, v in G.edges()]))
+
+TRIANGLE_FREE = [
+    nx.Graph([(0, 1), (0, 3), (2, 3)]),
+    nx.path_graph(50),
+    nx.star_graph(20),
+    nx.cycle_graph(30),
+    nx.grid_2d_graph(10, 10),
+    nx.complete_bipartite_graph(5, 7),
+]
+
+def test_sampled_clustering_of_triangle_free_graphs():
+    for G in TRIANGLE_FREE:
+        for seed in [None, 1, 2]:
+            A = arrays(G, seed)
+            assert metrics.number_of_triangles(A) == 0
+            assert metrics.transitivity(A, samples=2000, seed=0) == 0.0
+            assert metrics.average_clustering(A, samples=2000, seed=0) == 0.0
+
+@pytest.mark.parametrize('G', [nx.complete_graph(6), nx.karate_club_graph(), nx.les_miserables_graph(),
+                               nx.powerlaw_cluster_graph(300, 3, 0.5, seed=1)])
+def test_clustering_matches_networkx(G):
+    A = arrays(G, seed=1)
+    assert metrics.number_of_triangles(A) == sum(nx.triangles(G).values())//3
+    assert metrics.transitivity(A) == pytest.approx(nx.transitivity(G))
+    assert metrics.average_clustering(A) == pytest.approx(nx.average_clustering(G))
+
+    # sampled estimates are within a few standard errors (at most 0.5/sqrt(samples) = 0.005)
+    samples = 10**4
+    assert metrics.transitivity(A, samples=samples, seed=0) == pytest.approx(nx.transitivity(G), abs=0.025)
+    assert metrics.average_clustering(A, samples=samples, seed=0) == pytest.approx(nx.average_clustering(G), abs=0.025)
+
+def test_joint_degrees():
+    G = nx.Graph([(0, 1), (1, 2), (2, 0), (2, 3)])
+    s, t = metrics.joint_degrees(arrays(G))
+    assert s.tolist() == [0, 0, 1, 1]
+    assert t.tolist() == [1, 1, 1, 0]
@@ -0,0 +1,27 @@
+import mmap
+import sys
+import numpy as np
+import pytest
+import network
+from network import Network, triadic_closure
+from partition import Partition
+
+def memory_methods():
+    # 'modularity' temporarily uses about 80MB, and the other methods almost nothing
+    # (the memory is mapped afresh, as freed memory that is still resident would not raise the peak)
+    def detect(size):
+        def method(G, **kwargs):
+            block = mmap.mmap(-1, size)
+            np.frombuffer(block, dtype=np.uint8)[::mmap.PAGESIZE] = 1 # touch every page
+            block.close()
+            return(Partition(np.ones(G.N)))
+        return(method)
+    return({'modularity': detect(80*2**20), 'infomap': detect(2**12), 'spectral': detect(2**12), 'sbm': detect(2**12)})
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='the peak memory is reset via /proc')
+def test_peak_memory_is_measured_per_method(monkeypatch):
+    monkeypatch.setattr(network, 'community_methods', memory_methods)
+    summary = Network(triadic_closure, 100, 0.5, seed=1).communities_summary(verbose=False)
+    assert 70 < summary.timings['modularity']['peak_memory'] < 120
+    for method in ['infomap', 'spectral', 'sbm']:
+        assert summary.timings[method]['peak_memory'] < 10
@@ -0,0 +1,88 @@
+import networkx as nx
+import numpy as np
+import pytest
+import metrics
+from network_generators import (TriadicClosureGrowth, array_generator, configuration, configuration_fast,
+                                fix_graph, triadic_closure, triadic_closure_fast)
+from structure import structural_index
+
+def test_growth_save_and_load_with_numpy_sizes(tmp_path):
+    filename = str(tmp_path / 'growth.npz')
+    growth = TriadicClosureGrowth(p=np.float64(0.5), seed=1)
+    sizes = np.array([100, 500])
+    snapshots = [G.edges.copy() for G in growth.snapshots(sizes)]
+    growth.grow(np.int64(1000))
+    growth.save(filename)
+
+    resumed = TriadicClosureGrowth.load(filename)
+    assert resumed.number_of_nodes() == 1000
+    assert np.array_equal(resumed.snapshot(np.int64(500)).edges, snapshots[1])
+    G = resumed.grow(np.int64(2000))
+    assert G.N == 2000
+
+    # resuming gives the same network as growing in one pass
+    assert np.array_equal(G.edges, triadic_closure_fast(0.5, 2000, seed=1).edges)
+
+def test_snapshots_do_not_depend_on_sizes():
+    G = TriadicClosureGrowth(p=0.3, seed=2).grow(700)
+    growth = TriadicClosureGrowth(p=0.3, seed=2)
+    for N in [10, 300, 700]:
+        assert np.array_equal(growth.grow(N).edges, G.edges[:len(growth.snapshot(N).edges)])
+
+def simple_graph_checks(G):
+    # no self loops or parallel edges, and every node label is in range
+    edges = np.sort(G.edges, axis=1)
+    assert np.all(edges[:,0] != edges[:,1])
+    assert len(np.unique(edges, axis=0)) == len(edges)
+    assert edges.min() >= 0 and edges.max() < G.N
+
+def test_triadic_closure_fast():
+    G = triadic_closure_fast(0.5, 1000, seed=1)
+    simple_graph_checks(G)
+    assert G.N == 1000
+    assert G.degrees().mean() == pytest.approx(4, abs=0.05) # m = 2 links per new node
+    assert structural_index(G).number_of_components() == 1
+    assert np.array_equal(G.edges, triadic_closure_fast(0.5, 1000, seed=1).edges)
+    assert not np.array_equal(G.edges, triadic_closure_fast(0.5, 1000, seed=2).edges)
+
+def test_triadic_closure_fast_matches_the_original_model():
+    # mean transitivity of the original triadic_closure() generator for N = 1000
+    for p, expected in [(0, 0.008), (0.5, 0.155), (1, 0.25)]:
+        clustering = np.mean([metrics.transitivity(triadic_closure_fast(p, 1000, seed=seed)) for seed in range(5)])
+        assert clustering == pytest.approx(expected, abs=0.02)
+
+def test_configuration_fast():
+    for c in [0, 0.1, 0.2]:
+        G = configuration_fast(c, 5000, seed=1)
+        simple_graph_checks(G)
+        assert G.N == 5000
+        assert G.degrees().mean() == pytest.approx(4, abs=0.15)
+        assert metrics.transitivity(G) == pytest.approx(c, abs=0.01)
+    assert np.array_equal(configuration_fast(0.1, 500, seed=3).edges, configuration_fast(0.1, 500, seed=3).edges)
+
+def test_array_generator():
+    assert array_generator(triadic_closure) is triadic_closure_fast
+    assert array_generator(configuration) is configuration_fast
+
+def consecutive_reference(G):
+    # the original relabelling: node i of G becomes node i, in the order of G.nodes()
+    return(nx.relabel_nodes(nx.Graph(G), {node: i for i, node in enumerate(G.nodes())}))
+
+@pytest.mark.parametrize('labels', ['shuffled', 'strings'])
+def test_fix_graph(labels):
+    rng = np.random.default_rng(0)
+    edges = configuration_fast(0.1, 300, seed=1).edges.tolist()
+    names = rng.permutation(300).tolist() if labels == 'shuffled' else ['node{}'.format(i) for i in rng.permutation(300)]
+    G = nx.Graph()
+    G.add_nodes_from(names)
+    G.add_edges_from((names[u], names[v]) for u, v in edges)
+    fixed = fix_graph(G)
+    assert list(fixed.nodes()) == list(range(300))
+    assert nx.utils.edges_equal(fixed.edges(), consecutive_reference(G).edges())
+
+def test_fix_graph_multigraph():
+    # parallel edges and self loops are removed
+    G = nx.MultiGraph([(5, 7), (7, 5), (7, 7), (7, 9)])
+    fixed = fix_graph(G)
+    assert type(fixed) is nx.Graph
+    assert sorted(fixed.edges()) == [(0, 1), (1, 2)]
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from partition import Partition, consecutive_labels
+
+def test_list_behaviour():
+    partition = Partition([3, 3, 7, 1])
+    assert len(partition) == 4
+    assert partition[2] == 7 and isinstance(partition[2], int)
+    assert list(partition) == [3, 3, 7, 1]
+    assert partition.tolist() == [3, 3, 7, 1]
+    assert partition[1:3].tolist() == [3, 7]
+    assert partition.number_of_communities() == 7
+
+def test_array_is_not_copied():
+    labels = np.array([1, 2, 2], dtype=np.int32)
+    partition = Partition(labels)
+    assert np.shares_memory(partition.labels, labels)
+    assert np.asarray(partition) is partition.labels
+    assert np.asarray(partition, dtype=np.float64).tolist() == [1.0, 2.0, 2.0]
+
+def test_relabel():
+    partition = Partition([3, 3, 7, 1, 7, 9])
+    relabelled = partition.relabel()
+    assert relabelled.tolist() == [1, 1, 2, 3, 2, 4]
+    assert relabelled.sizes().tolist() == [2, 2, 1, 1]
+    # partitions that only differ in the numbering of their communities have the same canonical form
+    assert Partition([5, 5, 2, 8, 2, 0]).relabel() == relabelled
+    assert relabelled.relabel() == relabelled
+
+def test_relabel_sparse_labels():
+    labels = np.array([10**9, 5, 10**9, -3])
+    assert Partition(labels).relabel().tolist() == [1, 2, 1, 3]
+
+def test_equality():
+    partition = Partition([1, 2, 2])
+    assert partition == [1, 2, 2]
+    assert partition == Partition(np.array([1, 2, 2]))
+    assert partition != [1, 2, 1]
+    assert partition != [1, 2]
+    assert partition != None
+    with pytest.raises(TypeError):
+        hash(partition)
+
+def test_consecutive_labels():
+    assert consecutive_labels([4, 2, 4, 9]).tolist() == [1, 0, 1, 2]
+    assert consecutive_labels([2.0, 1.0, 2.0]).tolist() == [1, 0, 1]
+    assert consecutive_labels([0.5, 0.7, 0.5]).tolist() == [0, 1, 0]
+    assert consecutive_labels([]).tolist() == []
+
+def test_empty_partition():
+    partition = Partition([])
+    assert len(partition) == 0
+    assert partition.number_of_communities() == 0
+    assert partition.relabel().tolist() == []
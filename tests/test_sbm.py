@@ -0,0 +1,16 @@
+import networkx as nx
+import pytest
+from community_detection import get_sbm_communities
+
+graph_tool = pytest.importorskip('graph_tool')
+
+def test_early_stopping_does_not_depend_on_processes():
+    G = nx.karate_club_graph()
+    serial = get_sbm_communities(G, trials=6, processes=1, tol=1.0, seed=3)
+    parallel = get_sbm_communities(G, trials=6, processes=3, tol=1.0, seed=3)
+    assert serial == parallel
+
+def test_omp_threads_are_restored():
+    threads = graph_tool.openmp_get_num_threads()
+    get_sbm_communities(nx.karate_club_graph(), trials=1, seed=0, omp_threads=1)
+    assert graph_tool.openmp_get_num_threads() == threads
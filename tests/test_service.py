@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from community_detection import get_leiden_communities, get_similarity
+from network_generators import triadic_closure_fast
+from service import AsyncClient, Client, DetectionService
+
+pytest.importorskip('igraph')
+
+def run(path, client_main):
+    # runs a service on a Unix socket, and client_main(client) with an AsyncClient connected to it
+    async def main():
+        service = await DetectionService(limits={'igraph': 2}).start(path)
+        try:
+            client = await AsyncClient.connect(path)
+            try:
+                return(await client_main(client))
+            finally:
+                await client.close()
+        finally:
+            service.close()
+    return(asyncio.run(main()))
+
+def test_seeded_jobs_are_reproducible(tmp_path):
+    G = triadic_closure_fast(0.5, 2000, seed=1)
+    async def client_main(client):
+        return(await asyncio.gather(*[client.get_communities(G, 'leiden', seed=seed) for seed in [1, 2]*4]))
+    partitions = run(str(tmp_path / 'service.sock'), client_main)
+    for seed, partition in zip([1, 2]*4, partitions):
+        assert partition == get_leiden_communities(G, seed=seed)
+
+def test_similarity_and_errors(tmp_path):
+    G = triadic_closure_fast(0.5, 500, seed=1)
+    async def client_main(client):
+        first = await client.get_communities(G, 'leiden', seed=1)
+        second = await client.get_communities(G, 'multilevel', seed=1)
+        ami = await client.get_similarity(first, second)
+        with pytest.raises(RuntimeError, match='Invalid method'):
+            await client.get_communities(G, 'unknown')
+        with pytest.raises(RuntimeError, match='TypeError'):
+            await client.get_communities(G, 'leiden', unknown_option=1)
+        status = await client.status()
+        return(first, second, ami, status)
+    first, second, ami, status = run(str(tmp_path / 'service.sock'), client_main)
+    assert ami == pytest.approx(get_similarity(first, second))
+    assert status['jobs'] == {'submitted': 4, 'finished': 3, 'failed': 1}
+
+def test_blocking_client(tmp_path):
+    path = str(tmp_path / 'service.sock')
+    G = triadic_closure_fast(0.5, 500, seed=1)
+    async def client_main(client):
+        loop = asyncio.get_running_loop()
+        def blocking():
+            with Client(path) as blocking_client:
+                return(blocking_client.get_communities(G, 'leiden', seed=3))
+        return(await loop.run_in_executor(None, blocking))
+    assert run(path, client_main) == get_leiden_communities(G, seed=3)
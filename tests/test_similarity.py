@@ -0,0 +1,48 @@
+import math
+import numpy as np
+import pytest
+from similarity import adjusted_mutual_information, adjusted_mutual_information_many, expected_mutual_information
+
+def reference_emi(sizes1, sizes2, N):
+    # the expected mutual information summed term by term, as in ami.m
+    emi = 0.0
+    for a in sizes1:
+        for b in sizes2:
+            for nij in range(max(1, a+b-N), min(a, b)+1):
+                p = math.comb(b, nij)*math.comb(N-b, a-nij)/math.comb(N, a)
+                emi += nij/N*math.log(N*nij/(a*b))*p
+    return(emi)
+
+def random_partitions(seed):
+    rng = np.random.default_rng(seed)
+    N = int(rng.integers(20, 300))
+    return(rng.integers(int(rng.integers(1, 10)), size=N) + 1, rng.integers(int(rng.integers(2, 20)), size=N) + 1)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_expected_mutual_information(seed):
+    labels1, labels2 = random_partitions(seed)
+    sizes1, sizes2 = np.bincount(labels1)[1:], np.bincount(labels2)[1:]
+    sizes1, sizes2 = sizes1[sizes1 > 0], sizes2[sizes2 > 0]
+    assert expected_mutual_information(sizes1, sizes2, len(labels1)) == pytest.approx(reference_emi(sizes1, sizes2, len(labels1)))
+
+@pytest.mark.parametrize('seed', range(10))
+def test_ami_matches_scikit_learn(seed):
+    metrics = pytest.importorskip('sklearn.metrics')
+    labels1, labels2 = random_partitions(seed)
+    labels2[:len(labels2)//2] = labels1[:len(labels1)//2] # partly similar partitions
+    expected = metrics.adjusted_mutual_info_score(labels1, labels2, average_method='max')
+    assert adjusted_mutual_information(labels1, labels2) == pytest.approx(expected, abs=1e-10)
+
+def test_ami_properties():
+    labels = np.repeat(np.arange(5), 20)
+    assert adjusted_mutual_information(labels, labels) == pytest.approx(1.0)
+    assert adjusted_mutual_information(labels, labels*7 + 3) == pytest.approx(1.0) # invariant to relabelling
+    assert adjusted_mutual_information(np.ones(10), np.ones(10)) == 1.0
+    with pytest.raises(ValueError):
+        adjusted_mutual_information(labels, labels[:-1])
+
+def test_ami_many():
+    labels1, labels2 = random_partitions(1)
+    others = [labels2, labels1, np.roll(labels2, 3)]
+    many = adjusted_mutual_information_many(labels1, others)
+    assert many == pytest.approx([adjusted_mutual_information(labels1, other) for other in others])
@@ -0,0 +1,19 @@
+import networkx as nx
+import numpy as np
+from array_graph import ArrayGraph
+from spectral import bethe_hessian, bethe_radius, spectral_partition
+from structure import structural_index
+
+def test_bethe_radius_is_a_root():
+    # iterateSlp.m converges to a value rho at which H(rho) is singular
+    index = structural_index(ArrayGraph.from_networkx(nx.karate_club_graph()))
+    rho = bethe_radius(index.adjacency, index.regulariser()**2, index.degrees, seed=0)
+    H = bethe_hessian(index.adjacency, rho, index.degrees).toarray()
+    assert np.abs(np.linalg.eigvalsh(H)).min() < 1e-8
+
+def test_two_communities_split_by_sign():
+    G = ArrayGraph.from_networkx(nx.planted_partition_graph(2, 50, 0.3, 0.01, seed=1))
+    for slp_iterations in (0, 10):
+        labels = spectral_partition(G, seed=0, slp_iterations=slp_iterations)
+        assert set(labels.tolist()) == {1, 2}
+        assert len(set(labels[:50].tolist())) == 1 and len(set(labels[50:].tolist())) == 1
@@ -0,0 +1,67 @@
+import networkx as nx
+import numpy as np
+import metrics
+from array_graph import ArrayGraph
+from network import Network, triadic_closure
+from structure import StructuralIndex, structural_index
+
+def two_components():
+    # a triangle with a pendant node (nodes 3-6), a path (nodes 0-2) and an isolated node (7)
+    edges = np.array([[0, 1], [1, 2], [3, 4], [3, 5], [4, 5], [5, 6]], dtype=np.int32)
+    return(ArrayGraph(8, edges))
+
+def test_degrees_and_moments():
+    G = ArrayGraph.from_networkx(nx.karate_club_graph())
+    index = StructuralIndex(G)
+    degrees = np.array([degree for node, degree in nx.karate_club_graph().degree()])
+    assert np.array_equal(index.degrees, degrees)
+    assert np.isclose(index.degree_moment(1), degrees.mean())
+    assert np.isclose(index.degree_moment(2), np.mean(degrees**2))
+    assert np.isclose(index.regulariser(), np.sqrt(np.mean(degrees**2)/degrees.mean() - 1))
+    assert np.array_equal(index.adjacency.toarray(), nx.to_numpy_array(nx.karate_club_graph(), weight=None))
+
+def test_empty_network():
+    index = StructuralIndex(ArrayGraph(3, np.zeros((0, 2), dtype=np.int32)))
+    assert index.degree_moment(1) == 0.0
+    assert index.regulariser() == 0.0
+    assert index.number_of_components() == 3
+
+def test_components():
+    index = StructuralIndex(two_components())
+    labels, sizes = index.components
+    assert sizes.tolist() == [4, 3, 1] # in decreasing order of size
+    assert labels.tolist() == [1, 1, 1, 0, 0, 0, 0, 2]
+    assert index.number_of_components() == 3
+
+def test_largest_component():
+    largest, nodes = StructuralIndex(two_components()).largest_component()
+    assert nodes.tolist() == [3, 4, 5, 6]
+    assert largest.N == 4
+    assert largest.edges.tolist() == [[0, 1], [0, 2], [1, 2], [2, 3]]
+    connected = Network(triadic_closure, 100, 0.5, seed=1).arrays # triadic closure networks are connected
+    assert structural_index(connected).largest_component()[0] is connected
+
+def test_triangles():
+    index = StructuralIndex(two_components())
+    assert index.triangles.tolist() == [0, 0, 0, 1, 1, 1, 0, 0]
+    assert index.edge_support.tolist() == [0, 0, 1, 1, 1, 0]
+    assert index.number_of_triangles() == 1
+    assert np.isclose(index.transitivity(), nx.transitivity(two_components().to_networkx()))
+
+def test_shared_and_cached():
+    network = Network(triadic_closure, 200, 0.5, seed=1)
+    index = structural_index(network)
+    assert structural_index(network.arrays) is index
+    assert index.degrees is index.degrees
+    assert index.components is index.components
+    assert metrics._degrees(network) is index.degrees # metrics reuse the index
+
+def test_discarded_when_edges_change():
+    G = two_components()
+    index = structural_index(G)
+    assert index.number_of_components() == 3
+    G.edges = np.concatenate([G.edges, [[2, 3], [6, 7]]])
+    updated = structural_index(G)
+    assert updated is not index
+    assert updated.number_of_components() == 1
+    assert updated.degrees.tolist() == [1, 2, 2, 3, 2, 3, 2, 1]
@@ -0,0 +1,28 @@
+import csv
+import pytest
+from network import triadic_closure
+from sweep import run_sweep, sweep_columns
+
+def read_rows(filename):
+    with open(filename, newline='') as output:
+        return(list(csv.DictReader(output)))
+
+def test_resume_skips_completed_networks(tmp_path):
+    filename = str(tmp_path / 'sweep.csv')
+    assert run_sweep(filename, [triadic_closure], [100], [0.5], replicates=2, methods=['modularity', 'leiden'], processes=1) == 2
+    assert run_sweep(filename, [triadic_closure], [100], [0.5], replicates=3, methods=['modularity', 'leiden'], processes=1) == 1
+    rows = read_rows(filename)
+    assert sorted(int(row['replicate']) for row in rows) == [0, 1, 2]
+    assert all(not row['error'] for row in rows)
+
+def test_resume_with_different_methods(tmp_path):
+    filename = str(tmp_path / 'sweep.csv')
+    run_sweep(filename, [triadic_closure], [100], [0.5], methods=['modularity'], processes=1)
+    with pytest.raises(ValueError):
+        run_sweep(filename, [triadic_closure], [100], [0.5], methods=['modularity', 'leiden'], processes=1)
+    assert len(read_rows(filename)) == 1
+
+    # without resuming, the file is overwritten with the new columns
+    assert run_sweep(filename, [triadic_closure], [100], [0.5], methods=['modularity', 'leiden'], processes=1, resume=False) == 1
+    with open(filename, newline='') as output:
+        assert next(csv.reader(output)) == sweep_columns(['modularity', 'leiden'])
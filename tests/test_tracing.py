@@ -0,0 +1,73 @@
+import json
+import tracing
+from network import Network, triadic_closure
+from tracing import JSONLinesSink, ProfileSink, StatsSink
+
+def test_disabled_spans_do_nothing():
+    assert not tracing.enabled()
+    with tracing.span('step', N=10) as span:
+        pass
+    assert not isinstance(span, tracing.Span)
+
+def test_nested_spans():
+    with tracing.tracing(StatsSink()) as stats:
+        assert tracing.enabled()
+        with tracing.span('outer', N=10):
+            with tracing.span('inner', k=2):
+                pass
+            with tracing.span('inner', k=3):
+                pass
+    assert not tracing.enabled()
+    assert [span.name for span in stats.spans] == ['inner', 'inner', 'outer']
+    inner, _, outer = stats.spans
+    assert (inner.parent, inner.depth, inner.attributes) == ('outer', 1, {'k': 2})
+    assert (outer.parent, outer.depth, outer.attributes) == (None, 0, {'N': 10})
+    assert outer.wall_time >= inner.wall_time >= 0
+    entry = stats.stats()['inner']
+    assert entry['count'] == 2
+    assert entry['min_wall_time'] <= entry['max_wall_time']
+    assert 'inner' in str(stats)
+
+def test_traced_decorator():
+    @tracing.traced('add')
+    def add(a, b):
+        return(a + b)
+    assert add(1, 2) == 3 # untraced
+    with tracing.tracing(StatsSink()) as stats:
+        assert add(2, 3) == 5
+    assert [span.name for span in stats.spans] == ['add']
+    assert add.__name__ == 'add'
+
+def test_json_lines_sink_and_replay(tmp_path):
+    filename = str(tmp_path / 'trace.jsonl')
+    with tracing.tracing(JSONLinesSink(filename)):
+        with tracing.span('outer'):
+            with tracing.span('inner', N=5):
+                pass
+    with open(filename) as trace:
+        records = [json.loads(line) for line in trace]
+    assert [record['name'] for record in records] == ['inner', 'outer']
+    assert records[0]['parent'] == 'outer'
+    assert records[0]['attributes'] == {'N': 5}
+
+    # spans recorded elsewhere (e.g. in a worker process) can be passed to other sinks
+    stats = StatsSink()
+    tracing.replay(records, sinks=[stats], worker=1)
+    assert stats.records()[0] == dict(records[0], attributes={'N': 5, 'worker': 1})
+    assert stats.spans[1].wall_time == records[1]['wall_time']
+
+def test_profile_sink():
+    with tracing.tracing(ProfileSink(names=['profiled'])) as profiles:
+        with tracing.span('other'):
+            pass
+        with tracing.span('profiled'):
+            sum(range(1000))
+    assert [span.name for span, _ in profiles.profiles] == ['profiled']
+
+def test_pipeline_spans():
+    with tracing.tracing(StatsSink()) as stats:
+        network = Network(triadic_closure, 200, 0.5, seed=1)
+        network.graph()
+    names = [span.name for span in stats.spans]
+    assert 'generate' in names
+    assert 'convert.networkx' in names
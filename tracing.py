@@ -0,0 +1,336 @@
+# Copyright (C) 2019 by
+# Sophie Wharrie <sophie_wharrie@outlook.com>
+# The University of Sydney, School of Mathematics and Statistics
+"""
+Profiling and tracing hooks for the network pipeline.
+
+The pipeline is instrumented with named spans (e.g. 'generate', 'convert.igraph',
+'detect.sbm', 'spectral.eigensolve', 'similarity'), which record the wall time and
+CPU time of each step. Finished spans are passed to the active sinks:
+
+- StatsSink keeps the spans in memory and summarises the time spent in each step,
+- JSONLinesSink writes each span as a line of JSON to a file,
+- ProfileSink captures a cProfile profile of each span (or of chosen spans).
+
+Tracing is disabled unless a sink has been added, and a disabled span does no work
+other than checking whether any sinks are active.
+
+Examples
+----------
+>>> stats = StatsSink()
+>>> with tracing(stats):
+...     network = Network(model=triadic_closure, N=100000, t=0.5)
+...     communities = network.get_communities('spectral')
+>>> print(stats)
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+
+_sinks = [] # the active sinks
+_local = threading.local() # the stack of open spans in each thread
+
+class Span:
+    """
+    A named step of the pipeline and its duration.
+
+    Attributes
+    ----------
+    name : the span name (e.g. 'detect.sbm')
+    attributes : dictionary of further information about the step (e.g. the network size)
+    parent : the name of the enclosing span (or None)
+    depth : the number of enclosing spans
+    start : the start time (seconds since the epoch)
+    wall_time : the wall time in seconds
+    cpu_time : the CPU time of this process in seconds
+    pid : the process that ran the step
+    """
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.depth = 0
+        self.start = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.pid = os.getpid()
+
+    def __enter__(self):
+        stack = _stack()
+        if stack:
+            self.parent = stack[-1].name
+            self.depth = len(stack)
+        stack.append(self)
+        self.start = time.time()
+        for sink in _sinks:
+            sink.start(self)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return(self)
+
+    def __exit__(self, *exception):
+        self.wall_time = time.perf_counter() - self._wall_start
+        self.cpu_time = time.process_time() - self._cpu_start
+        _stack().pop()
+        for sink in _sinks:
+            sink.finish(self)
+        return(False)
+
+    def to_dict(self):
+        """
+        Returns the span as a JSON serialisable dictionary.
+        """
+        return({'name': self.name, 'parent': self.parent, 'depth': self.depth, 'start': self.start,
+                'wall_time': self.wall_time, 'cpu_time': self.cpu_time, 'pid': self.pid,
+                'attributes': self.attributes})
+
+    @classmethod
+    def from_dict(cls, record):
+        """
+        Returns a finished span from a dictionary created by to_dict().
+        """
+        span = cls(record['name'], record['attributes'])
+        for key in ['parent', 'depth', 'start', 'wall_time', 'cpu_time', 'pid']:
+            setattr(span, key, record[key])
+        return(span)
+
+    def __repr__(self):
+        return('Span(name={}, wall_time={})'.format(self.name, self.wall_time))
+
+class _NullSpan:
+    # the span returned while tracing is disabled
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exception):
+        return(False)
+
+_NULL_SPAN = _NullSpan()
+
+def span(name, **attributes):
+    """
+    Returns a context manager that records the enclosed step as a span with the given name.
+
+    Parameters
+    ----------
+    name : the span name (e.g. 'generate')
+    attributes : further information about the step (JSON serialisable values)
+    """
+    if not _sinks:
+        return(_NULL_SPAN)
+    return(Span(name, attributes))
+
+def traced(name):
+    """
+    Decorator that records each call of a function as a span with the given name.
+
+    Parameters
+    ----------
+    name : the span name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return(function(*args, **kwargs))
+            with Span(name, dict()):
+                return(function(*args, **kwargs))
+        return(wrapper)
+    return(decorator)
+
+def enabled():
+    """
+    Returns True if any sinks are active.
+    """
+    return(bool(_sinks))
+
+def add_sink(sink):
+    """
+    Activates a sink, so that it receives every span finished from now on.
+    """
+    _sinks.append(sink)
+
+def remove_sink(sink):
+    """
+    Deactivates a sink.
+    """
+    _sinks.remove(sink)
+
+class tracing:
+    """
+    Context manager that activates the given sinks for the enclosed code.
+
+    Parameters
+    ----------
+    sinks : the sinks (e.g. StatsSink(), JSONLinesSink('trace.jsonl'))
+    """
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def __enter__(self):
+        for sink in self.sinks:
+            add_sink(sink)
+        return(self.sinks[0] if len(self.sinks) == 1 else self.sinks)
+
+    def __exit__(self, *exception):
+        for sink in self.sinks:
+            remove_sink(sink)
+            sink.close()
+        return(False)
+
+def replay(records, sinks=None, **attributes):
+    """
+    Passes spans recorded elsewhere (e.g. in a worker process, as dictionaries created
+    by Span.to_dict()) to the given sinks or, by default, to the active sinks.
+
+    Parameters
+    ----------
+    records : list of span dictionaries
+    sinks : (optional) list of sinks
+    attributes : further attributes added to each span
+    """
+    for record in records:
+        finished = Span.from_dict(record)
+        finished.attributes = dict(finished.attributes, **attributes)
+        for sink in (_sinks if sinks is None else sinks):
+            sink.finish(finished)
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return(_local.stack)
+
+class Sink:
+    """
+    Base class for sinks. Subclasses override finish() (and start() if they need to
+    act when a span starts).
+    """
+    def start(self, span):
+        pass
+
+    def finish(self, span):
+        pass
+
+    def close(self):
+        pass
+
+class StatsSink(Sink):
+    """
+    Keeps finished spans in memory and summarises the time spent in each step.
+
+    Attributes
+    ----------
+    spans : list of finished spans, in the order they finished
+    """
+    def __init__(self):
+        self.spans = []
+
+    def finish(self, span):
+        self.spans.append(span)
+
+    def stats(self):
+        """
+        Returns a dictionary giving, for each span name, a dictionary with the number of
+        spans ('count') and their total, minimum and maximum wall time and total CPU time.
+        """
+        stats = dict()
+        for span in self.spans:
+            entry = stats.setdefault(span.name, {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0,
+                                                 'min_wall_time': float('inf'), 'max_wall_time': 0.0})
+            entry['count'] += 1
+            entry['wall_time'] += span.wall_time
+            entry['cpu_time'] += span.cpu_time
+            entry['min_wall_time'] = min(entry['min_wall_time'], span.wall_time)
+            entry['max_wall_time'] = max(entry['max_wall_time'], span.wall_time)
+        return(stats)
+
+    def records(self):
+        """
+        Returns the finished spans as a list of dictionaries (see Span.to_dict()).
+        """
+        return([span.to_dict() for span in self.spans])
+
+    def __str__(self):
+        lines = ['{:<24} {:>6} {:>10} {:>10}'.format('span', 'count', 'wall (s)', 'CPU (s)')]
+        for name, entry in sorted(self.stats().items(), key=lambda item: -item[1]['wall_time']):
+            lines.append('{:<24} {:>6} {:>10.3f} {:>10.3f}'.format(name, entry['count'], entry['wall_time'], entry['cpu_time']))
+        return('\n'.join(lines))
+
+class JSONLinesSink(Sink):
+    """
+    Writes each finished span as a line of JSON (see Span.to_dict()) to a file.
+
+    Parameters
+    ----------
+    filename : the file name (spans are appended if the file exists)
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'a')
+
+    def finish(self, span):
+        self._file.write(json.dumps(span.to_dict(), default=str) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class ProfileSink(Sink):
+    """
+    Captures a cProfile profile of each span (or of the spans with the given names).
+
+    Profiles cannot be nested, so spans that start while another span is being
+    profiled are included in the enclosing span's profile.
+
+    Parameters
+    ----------
+    names : (optional) list of the span names to profile (defaults to all spans)
+    directory : (optional) if given, each profile is also saved in this directory as
+        '<span name>-<number>.prof' (e.g. for viewing with snakeviz)
+
+    Attributes
+    ----------
+    profiles : list of (span, pstats.Stats) pairs
+    """
+    def __init__(self, names=None, directory=None):
+        self.names = names
+        self.directory = directory
+        self.profiles = []
+        self._profiled = None
+        self._profiler = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, span):
+        if self._profiled is None and (self.names is None or span.name in self.names):
+            self._profiled = span
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self, span):
+        if span is self._profiled:
+            self._profiler.disable()
+            if self.directory is not None:
+                self._profiler.dump_stats(os.path.join(self.directory, '{}-{}.prof'.format(span.name, len(self.profiles))))
+            self.profiles.append((span, pstats.Stats(self._profiler)))
+            self._profiled = None
+            self._profiler = None
+
+    def print_stats(self, name=None, sort='cumulative', limit=20):
+        """
+        Prints the profiles (or the profiles of the spans with the given name).
+
+        Parameters
+        ----------
+        name : (optional) the span name
+        sort : the pstats sort key
+        limit : the number of functions printed per profile
+        """
+        for span, stats in self.profiles:
+            if name is None or span.name == name:
+                print('Profile of {} ({:.3f}s)'.format(span.name, span.wall_time))
+                stats.sort_stats(sort).print_stats(limit)